@@ -0,0 +1,93 @@
+"""Benchmark split-tunnel AllowedIPs computation for large exclusion lists.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_allowed_ips [--sizes 100,1000,10000] [--configs 5000]
+
+For each exclusion list size this measures:
+
+- ``ipaddress``: repeated ``address_exclude`` plus ``collapse_addresses``
+  (skipped above ``--reference-limit`` exclusions, as it grows quickly)
+- ``interval``: the interval algorithm on a cold cache
+- ``cached``: the per-config cost once the exclusion set is cached
+"""
+import argparse
+import ipaddress
+import random
+import time
+
+from utils.allowed_ips_utils import split_tunnel_allowed_ips, _split_tunnel, _split_tunnel_normalized
+
+ALLOWED = ['0.0.0.0/0', '::/0']
+
+
+def random_exclusions(count, rng):
+    excluded = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            excluded.append(str(ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(12, 30)), strict=False)))
+        else:
+            excluded.append(str(ipaddress.IPv6Network((rng.getrandbits(128), rng.randint(16, 64)), strict=False)))
+    return excluded
+
+
+def reference(allowed, excluded):
+    result = []
+    for version in (4, 6):
+        remaining = [ipaddress.ip_network(n) for n in allowed if ipaddress.ip_network(n).version == version]
+        for hole in (ipaddress.ip_network(n) for n in excluded):
+            if hole.version != version:
+                continue
+            next_remaining = []
+            for network in remaining:
+                if hole.supernet_of(network):
+                    continue
+                if network.overlaps(hole):
+                    next_remaining.extend(network.address_exclude(hole))
+                else:
+                    next_remaining.append(network)
+            remaining = next_remaining
+        result.extend(str(n) for n in ipaddress.collapse_addresses(remaining))
+    return result
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated exclusion list sizes')
+    parser.add_argument('--configs', type=int, default=5000, help='Configs sharing one exclusion set (default: 5000)')
+    parser.add_argument('--reference-limit', type=int, default=1000,
+                        help='Largest size timed with the ipaddress reference (default: 1000)')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'exclusions':>10}{'networks':>10}{'ipaddress s':>14}{'interval s':>12}{'cached us':>12}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        excluded = random_exclusions(size, rng)
+        _split_tunnel.cache_clear()
+        _split_tunnel_normalized.cache_clear()
+
+        interval_time, result = timed(split_tunnel_allowed_ips, ALLOWED, excluded)
+
+        started = time.perf_counter()
+        for _ in range(args.configs):
+            split_tunnel_allowed_ips(ALLOWED, excluded)
+        cached_time = (time.perf_counter() - started) / args.configs
+
+        if size <= args.reference_limit:
+            reference_time, expected = timed(reference, ALLOWED, excluded)
+            assert result == expected, 'interval result differs from ipaddress'
+            reference_column = f"{reference_time:>14.4f}"
+        else:
+            reference_column = f"{'-':>14}"
+
+        print(f"{size:>10}{len(result):>10}{reference_column}{interval_time:>12.4f}{cached_time * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
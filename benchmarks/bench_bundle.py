@@ -0,0 +1,104 @@
+"""Benchmark the config bundle against a plain directory and a zip file.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_bundle [--servers 1000] [--block-size 4096]
+
+For each format this reports the bytes stored (for the directory, both
+the file contents and the space used once every file is rounded up to a
+filesystem block) and the time to materialize one config and all configs.
+"""
+import argparse
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from generate_configs import render_configs
+from tests.fake_upstream import make_servers
+from utils.bundle_utils import Bundle, write_bundle
+from utils.config_utils import compile_template
+from utils.output_utils import QUIET, Output
+
+TEMPLATE = """[Interface]
+PrivateKey = yAnz5TF+lXXJte14tji3zlMNq+hd2rYUIgJBgB3fBmk=
+Address = 172.16.254.254/32
+DNS = 10.8.8.8
+
+[Peer]
+PublicKey = xTIBA5rboUvnH4htodjb6e697QjLERt1NAB4mZqp8Dg=
+AllowedIPs = 0.0.0.0/0
+Endpoint = ca-01.jumptoserver.com:51820
+"""
+
+
+def timed(function, *args, repeat=5):
+    """Return the best time of ``repeat`` calls."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=1000, help='Number of servers (default: 1000)')
+    parser.add_argument('--block-size', type=int, default=4096, help='Filesystem block size (default: 4096)')
+    args = parser.parse_args()
+
+    configs = list(render_configs(TEMPLATE, make_servers(args.servers), Output(level=QUIET)))
+    target = configs[len(configs) // 2][0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        directory = tmp / 'plain'
+        directory.mkdir()
+        for filename, content, _ in configs:
+            (directory / filename).write_text(content)
+
+        zip_path = tmp / 'configs.zip'
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for filename, content, _ in configs:
+                archive.writestr(filename, content)
+
+        bundle_path = tmp / 'configs.fvb'
+        write_bundle(bundle_path, compile_template(TEMPLATE), [(f, s['hostname']) for f, _, s in configs])
+
+        content_bytes = sum(p.stat().st_size for p in directory.iterdir())
+        block_bytes = sum(-(-p.stat().st_size // args.block_size) * args.block_size for p in directory.iterdir())
+
+        def directory_one():
+            (directory / target).read_text()
+
+        def zip_one():
+            with zipfile.ZipFile(zip_path) as archive:
+                archive.read(target)
+
+        def zip_all():
+            with zipfile.ZipFile(zip_path) as archive:
+                archive.extractall(tmp / 'zip-out')
+
+        def bundle_one():
+            Bundle.load(bundle_path).render(target)
+
+        def bundle_all():
+            Bundle.load(bundle_path).expand_all(tmp / 'bundle-out')
+
+        rows = [
+            ('directory', f"{content_bytes} ({block_bytes} on disk)", timed(directory_one), None),
+            ('zip', str(zip_path.stat().st_size), timed(zip_one), timed(zip_all)),
+            ('bundle', str(bundle_path.stat().st_size), timed(bundle_one), timed(bundle_all)),
+        ]
+
+    print(f"{len(configs)} configs, {len(TEMPLATE)} byte template")
+    print(f"{'format':<10}{'bytes':>26}{'one config ms':>16}{'all configs ms':>16}")
+    for name, size, one, everything in rows:
+        everything = f"{everything * 1e3:>16.2f}" if everything is not None else f"{'-':>16}"
+        print(f"{name:<10}{size:>26}{one * 1e3:>16.3f}{everything}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark getting one config against generating every config.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_get [--servers 2000] [--repeat 10]
+
+A fresh catalog of ``--servers`` udp servers is cached in a temporary
+directory, so nothing touches the network. This reports interpreter
+startup with and without importing get_config, the end-to-end time of
+``get_config.py`` as a command (with the filename index cold and warm),
+and in-process times of get_config.main() and of generate_configs.main()
+rendering and writing the whole catalog.
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import generate_configs
+import get_config
+from fetch_vpn_servers import cache_name
+from tests.fake_upstream import make_servers
+from utils.cache_utils import CatalogCache
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TEMPLATE = """[Interface]
+PrivateKey = yAnz5TF+lXXJte14tji3zlMNq+hd2rYUIgJBgB3fBmk=
+Address = 172.16.254.254/32
+DNS = 10.8.8.8
+
+[Peer]
+PublicKey = xTIBA5rboUvnH4htodjb6e697QjLERt1NAB4mZqp8Dg=
+AllowedIPs = 0.0.0.0/0
+Endpoint = ca-01.jumptoserver.com:51820
+"""
+
+
+def timed(function, repeat, before=None):
+    """Return the best time of ``repeat`` calls, running ``before`` untimed first."""
+    best = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def command(*args):
+    """Return a function running a Python command silently."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+
+    def run():
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL, env=env)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=2000, help='Number of udp servers (default: 2000)')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per measurement, best kept (default: 10)')
+    args = parser.parse_args()
+
+    servers = make_servers(args.servers)
+    target = servers[len(servers) // 2]['hostname'].split('.')[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache_dir = tmp / 'cache'
+        CatalogCache(cache_dir).get(cache_name('udp'), lambda: servers)
+        index_path = cache_dir / 'index-udp.json'
+        (tmp / 'fastestvpn.conf').write_text(TEMPLATE)
+        get_args = [target, '--cache-dir', str(cache_dir), '-q']
+
+        def drop_index():
+            with contextlib.suppress(FileNotFoundError):
+                index_path.unlink()
+
+        def get_in_process():
+            with contextlib.redirect_stdout(io.StringIO()):
+                get_config.main(get_args)
+
+        def generate_in_process():
+            generate_configs.main(['--cache-dir', str(cache_dir), '--max-age', '3600', '-q'])
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            script = str(ROOT / 'get_config.py')
+            rows = [
+                ('python startup', timed(command('-c', 'pass'), args.repeat)),
+                ('import get_config', timed(command('-c', 'import get_config'), args.repeat)),
+                ('get command, cold index', timed(command(script, *get_args), args.repeat, drop_index)),
+                ('get command, warm index', timed(command(script, *get_args), args.repeat)),
+                ('get main(), cold index', timed(get_in_process, args.repeat, drop_index)),
+                ('get main(), warm index', timed(get_in_process, args.repeat)),
+                ('generate all main()', timed(generate_in_process, max(1, args.repeat // 5))),
+            ]
+        finally:
+            os.chdir(cwd)
+
+    print(f"{args.servers} cached udp servers, getting {target}")
+    print(f"{'measurement':<26}{'ms':>10}")
+    for name, seconds in rows:
+        print(f"{name:<26}{seconds * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark the probe history ranking engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ranking [--servers 10000] [--samples 1000]
+
+This fills a history with random RTTs (with some lost probes) and
+measures:
+
+- ``record``: recording one round of probes for every server
+- ``summary``: p50, p95, EWMA, availability and score for all servers
+- ``python``: the same statistics with a loop over per-server lists, timed on
+  ``--reference-servers`` servers and scaled to the full catalog
+- ``select``: picking the top ``--top`` servers per country
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from utils.ranking_utils import ProbeHistory, select_top
+
+COUNTRIES = 60
+
+
+def python_summary(samples, alpha):
+    """Per-server statistics from a list of RTTs (None for lost probes)."""
+    received = sorted(value for value in samples if value is not None)
+    if not received:
+        return None
+    quantiles = statistics.quantiles(received, n=100, method='inclusive') if len(received) > 1 else received * 99
+    ewma = None
+    for value in samples:
+        if value is not None:
+            ewma = value if ewma is None else alpha * value + (1 - alpha) * ewma
+    p50, p95 = quantiles[49], quantiles[94]
+    availability = len(received) / len(samples)
+    return (ewma + p95 - p50) / availability
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=10000, help='Number of servers (default: 10000)')
+    parser.add_argument('--samples', type=int, default=1000, help='Samples per server (default: 1000)')
+    parser.add_argument('--reference-servers', type=int, default=500,
+                        help='Servers timed with the Python loop (default: 500)')
+    parser.add_argument('--top', type=int, default=3, help='Servers kept per country (default: 3)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    hostnames = [f"s{i:05d}.jumptoserver.com" for i in range(args.servers)]
+    history = ProbeHistory(capacity=args.samples)
+    base = rng.gamma(4, 10, args.servers)
+
+    started = time.perf_counter()
+    for _ in range(args.samples):
+        rtts = base * rng.lognormal(0, 0.2, args.servers)
+        rtts[rng.random(args.servers) < 0.02] = np.nan
+        history.record_many(hostnames, rtts.tolist())
+    record_time = (time.perf_counter() - started) / args.samples
+
+    started = time.perf_counter()
+    history.summary()
+    summary_time = time.perf_counter() - started
+
+    reference = [
+        [None if np.isnan(v) else float(v) for v in np.roll(history.rtt[row], -history.positions[row])]
+        for row in range(args.reference_servers)
+    ]
+    started = time.perf_counter()
+    for samples in reference:
+        python_summary(samples, 0.1)
+    python_time = (time.perf_counter() - started) * args.servers / args.reference_servers
+
+    servers = [{'country': f"country-{i % COUNTRIES}", 'hostname': hostname} for i, hostname in enumerate(hostnames)]
+    started = time.perf_counter()
+    selected = select_top(servers, history, args.top)
+    select_time = time.perf_counter() - started
+
+    print(f"{args.servers} servers x {args.samples} samples ({history.rtt.nbytes / 2**20:.0f} MiB of samples)")
+    print(f"{'record round':<16}{record_time * 1e3:>10.2f} ms")
+    print(f"{'summary':<16}{summary_time * 1e3:>10.2f} ms")
+    print(f"{'python':<16}{python_time * 1e3:>10.2f} ms (estimated from {args.reference_servers} servers)")
+    print(f"{'select top':<16}{select_time * 1e3:>10.2f} ms ({len(selected)} servers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare fetch transports against local stand-ins with simulated latency.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transport [--servers N] [--rtt SECONDS] [--rounds N]
+
+Three strategies fetch all three protocols:
+
+- ``requests-per-protocol``: the previous behaviour, one new session (and
+  connection, warmup GET and POST) per protocol.
+- ``requests-shared``: one keep-alive session, one warmup, sequential POSTs.
+- ``http2``: one HTTP/2 connection, one warmup, multiplexed POSTs.
+
+A new connection costs two round trips (TCP + TLS) and every request one.
+"""
+import argparse
+import time
+
+import fetch_vpn_servers
+from fetch_vpn_servers import allowed_protocols, fetch_catalog, warm_up
+from tests.fake_upstream import FakeUpstream, make_servers
+from utils.transport_utils import Http2Transport, RequestsTransport
+
+
+def per_protocol():
+    for protocol in allowed_protocols:
+        fetch_vpn_servers.fetch_vpn_servers(protocol)
+
+
+def shared(transport_factory):
+    def run():
+        with transport_factory() as transport:
+            warm_up(transport)
+            catalog = fetch_catalog(allowed_protocols, transport)
+            if catalog['errors']:
+                raise RuntimeError(catalog['errors'])
+    return run
+
+
+def measure(upstream, run, rounds):
+    fetch_vpn_servers.url = upstream.url
+    fetch_vpn_servers.referer_url = upstream.referer_url
+    upstream.connections = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    elapsed = (time.perf_counter() - started) / rounds
+    return elapsed, upstream.connections / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=500, help='Servers per protocol (default: 500)')
+    parser.add_argument('--rtt', type=float, default=0.05, help='Simulated round trip in seconds (default: 0.05)')
+    parser.add_argument('--rounds', type=int, default=5, help='Rounds per strategy (default: 5)')
+    args = parser.parse_args()
+
+    servers = make_servers(args.servers)
+    options = dict(servers=servers, latency=args.rtt, connect_latency=2 * args.rtt)
+
+    results = []
+    with FakeUpstream(**options) as upstream:
+        results.append(('requests-per-protocol', *measure(upstream, per_protocol, args.rounds)))
+        results.append(('requests-shared', *measure(upstream, shared(RequestsTransport), args.rounds)))
+
+    try:
+        from benchmarks.h2_upstream import H2Upstream
+    except ImportError:
+        print("h2 is not installed, skipping http2 (pip install 'httpx[http2]')")
+    else:
+        with H2Upstream(**options) as upstream:
+            results.append(('http2', *measure(upstream, shared(lambda: Http2Transport(http1=False)), args.rounds)))
+
+    print(f"{args.servers} servers per protocol, rtt {args.rtt * 1000:.0f} ms, {args.rounds} rounds")
+    print(f"{'strategy':<24}{'seconds':>10}{'connections':>14}")
+    for name, elapsed, connections in results:
+        print(f"{name:<24}{elapsed:>10.3f}{connections:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
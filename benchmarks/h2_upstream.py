@@ -0,0 +1,113 @@
+"""HTTP/2 (prior knowledge, cleartext) stand-in for the upstream site.
+
+Serves the same responses as tests.fake_upstream.FakeUpstream, but over
+HTTP/2 so the multiplexing transport can be compared locally. Requires the
+``h2`` package (installed with ``httpx[http2]``).
+"""
+import asyncio
+import threading
+
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import ConnectionTerminated, DataReceived, RequestReceived, StreamEnded, WindowUpdated
+
+from tests.fake_upstream import FakeUpstream
+
+
+class _H2Protocol(asyncio.Protocol):
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.conn = H2Connection(H2Configuration(client_side=False, header_encoding='utf-8'))
+        self.requests = {}
+        self.pending = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.upstream.record_connection()
+        # Simulate the handshake round trips before the server answers
+        transport.pause_reading()
+        asyncio.get_running_loop().call_later(self.upstream.connect_latency, self._start)
+
+    def _start(self):
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+        self.transport.resume_reading()
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, RequestReceived):
+                self.requests[event.stream_id] = [dict(event.headers), bytearray()]
+            elif isinstance(event, DataReceived):
+                self.requests[event.stream_id][1] += event.data
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, StreamEnded):
+                asyncio.get_running_loop().call_later(self.upstream.latency, self._respond, event.stream_id)
+            elif isinstance(event, WindowUpdated):
+                self._send_pending()
+            elif isinstance(event, ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    def _respond(self, stream_id):
+        headers, body = self.requests.pop(stream_id)
+        method = headers[':method']
+        self.upstream.record(method, bytes(body))
+        status, response_headers, payload = self.upstream.respond(method, headers[':path'], bytes(body))
+        self.conn.send_headers(stream_id, [
+            (':status', str(status)),
+            ('content-length', str(len(payload))),
+            *((name.lower(), value) for name, value in response_headers.items()),
+        ])
+        self.pending[stream_id] = memoryview(payload)
+        self._send_pending()
+
+    def _send_pending(self):
+        for stream_id, data in list(self.pending.items()):
+            while data:
+                window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                if window <= 0:
+                    break
+                self.conn.send_data(stream_id, bytes(data[:window]))
+                data = data[window:]
+            if data:
+                self.pending[stream_id] = data
+            else:
+                self.conn.end_stream(stream_id)
+                del self.pending[stream_id]
+        self.transport.write(self.conn.data_to_send())
+
+
+class H2Upstream(FakeUpstream):
+    """FakeUpstream variant served over HTTP/2 on an asyncio thread."""
+
+    def __init__(self, servers=None, latency=0.0, connect_latency=0.0):
+        super().__init__(servers, latency, connect_latency)
+        # The HTTP/1.1 listener is not used; HTTP/2 binds its own port
+        self._server.server_close()
+        self._loop = asyncio.new_event_loop()
+        self._h2_server = self._loop.run_until_complete(
+            self._loop.create_server(lambda: _H2Protocol(self), '127.0.0.1', 0)
+        )
+
+    @property
+    def base_url(self):
+        host, port = self._h2_server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record(self, method, body):
+        self._record(method, body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._h2_server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,95 @@
+import argparse
+from pathlib import Path
+from utils.deploy_utils import deploy_routers, load_routers, summarize
+from utils.output_utils import add_output_arguments, output_from_args
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Push generated configs to OpenWrt routers over ubus JSON-RPC')
+    parser.add_argument(
+        'routers',
+        type=Path,
+        help='JSON file listing the routers to deploy to'
+    )
+    parser.add_argument(
+        '--config-dir',
+        type=Path,
+        default=Path('output'),
+        help="Directory with the generated configs (default: output)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Routers deployed concurrently (default: 8)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=10,
+        help='Per-request timeout in seconds (default: 10)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only report which configs would be pushed'
+    )
+    add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def report_router(output, report, dry_run):
+    name = report['router']
+    if report['error']:
+        output.error('router_error', f"{name}: error: {report['error']}", router=name, error=report['error'])
+        return
+
+    verb = 'would push' if dry_run else 'pushed'
+    for filename in report['pushed']:
+        output.verbose('pushed', f"  {name}: {verb} {filename}", router=name, filename=filename)
+    for filename, error in report['failed'].items():
+        output.error('push_error', f"  {name}: error pushing {filename}: {error}",
+                     router=name, filename=filename, error=error)
+    output.summary(
+        'router_done',
+        f"{name}: {len(report['pushed'])} {verb}, {len(report['unchanged'])} unchanged, "
+        f"{len(report['failed'])} failed ({report['seconds']:.2f}s)",
+        router=name,
+        pushed=len(report['pushed']),
+        unchanged=len(report['unchanged']),
+        failed=len(report['failed']),
+        seconds=report['seconds'],
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with output_from_args(args) as output:
+        try:
+            routers = load_routers(args.routers)
+        except (OSError, ValueError) as e:
+            output.error('error', f"Error loading routers: {e}", error=str(e))
+            return 1
+
+        done = 0
+
+        def on_report(report):
+            nonlocal done
+            done += 1
+            report_router(output, report, args.dry_run)
+            output.progress(done, len(routers))
+
+        reports = deploy_routers(routers, args.config_dir, args.workers, args.dry_run, args.timeout, on_report)
+        totals = summarize(reports)
+
+        output.summary(
+            'done',
+            f"\nDeployed to {totals['routers']} routers ({totals['routers_failed']} with errors): "
+            f"{totals['pushed']} pushed, {totals['unchanged']} unchanged, {totals['failed']} failed",
+            **totals,
+        )
+        return 1 if totals['routers_failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
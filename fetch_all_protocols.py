@@ -1,53 +1,152 @@
+import argparse
 import json
-from fetch_vpn_servers import fetch_vpn_servers
+import sys
+from fetch_vpn_servers import allowed_protocols, cached_catalog, fetch_protocol_pages, iter_servers
+from utils.cache_utils import add_cache_arguments, cache_from_args
+from utils.filter_utils import add_filter_arguments, filter_from_args, filter_servers, ServerFilter
+from utils.output_utils import add_output_arguments, output_from_args, Output
+from utils.profile_utils import add_profile_arguments, profiler_from_args
+from utils.stream_utils import unique_servers, write_ndjson
+from utils.transport_utils import add_transport_argument, create_transport, report_transfers
 
 
-def fetch_all_protocols():
-    """
-    Fetch VPN servers for all available protocols (tcp, udp, ikev2)
-    and return a deduplicated list based on hostname.
+def iter_protocol_servers(output, transport, server_filter, cache=None, errors=None):
+    """Yield matching servers of every protocol, including duplicates, as rows are parsed.
+
+    Protocols excluded by the filter are not fetched at all. With a
+    ``cache``, the catalog is fetched by at most one process at a time and
+    filtered after loading. A failed protocol is reported and skipped; pass
+    an ``errors`` dict to also collect {protocol: error message}.
     """
-    protocols = ['tcp', 'udp', 'ikev2']
-    all_servers = []
+    if errors is None:
+        errors = {}
+    protocols = server_filter.protocols_to_fetch(allowed_protocols)
+    if not protocols:
+        return
 
-    # Fetch servers for each protocol
     for protocol in protocols:
-        print(f"Fetching servers for protocol: {protocol}")
+        output.summary('fetch_start', f"Fetching servers for protocol: {protocol}", protocol=protocol)
+
+    if cache is not None:
+        yield from iter_cached_servers(output, transport, server_filter, cache, protocols, errors)
+        return
+
+    # Fetch servers for each protocol
+    try:
+        pages = fetch_protocol_pages(protocols, transport)
+    except Exception as e:
+        pages = [e] * len(protocols)
+
+    for protocol, page in zip(protocols, pages):
         try:
-            servers = fetch_vpn_servers(protocol)
-            print(f"  Found {len(servers)} servers")
-            all_servers.extend(servers)
+            if isinstance(page, Exception):
+                raise page
+            count = 0
+            for server in iter_servers(page, server_filter):
+                count += 1
+                yield server
+            output.summary('fetch_done', f"  Found {count} servers", protocol=protocol, count=count)
         except Exception as e:
-            print(f"  Error fetching {protocol} servers: {e}")
+            errors[protocol] = str(e)
+            output.error('error', f"  Error fetching {protocol} servers: {e}", protocol=protocol, error=str(e))
+
+
+def iter_cached_servers(output, transport, server_filter, cache, protocols, errors):
+    try:
+        catalog = cached_catalog(protocols, cache, transport)
+    except Exception as e:
+        catalog = {'servers': {}, 'errors': {protocol: str(e) for protocol in protocols}}
+
+    for protocol in protocols:
+        if protocol in catalog['errors']:
+            error = errors[protocol] = catalog['errors'][protocol]
+            output.error('error', f"  Error fetching {protocol} servers: {error}", protocol=protocol, error=error)
+            continue
+        count = 0
+        for server in filter_servers(catalog['servers'][protocol], server_filter):
+            count += 1
+            yield server
+        output.summary('fetch_done', f"  Found {count} servers", protocol=protocol, count=count)
+
+
+def iter_all_protocols(output=None, transport=None, server_filter=None, cache=None, errors=None):
+    """
+    Yield VPN servers for all available protocols (tcp, udp, ikev2),
+    deduplicated by hostname, as each response is parsed.
+
+    All protocols are fetched through one transport, warmed up once. When
+    no transport is given, the default one is created and closed here.
+    ``server_filter`` is pushed down into the row parser, and the number
+    of pruned rows is reported at the end. With a ``cache``, concurrent
+    processes share a single refresh; see cached_catalog(). Protocols that
+    failed are collected in ``errors``; see iter_protocol_servers().
+    """
+    output = output or Output()
+    server_filter = server_filter or ServerFilter()
+
+    if transport is None:
+        with create_transport() as transport:
+            yield from iter_all_protocols(output, transport, server_filter, cache, errors)
+        return
 
     # Remove duplicates based on hostname
-    seen_hostnames = set()
-    unique_servers = []
+    yield from unique_servers(iter_protocol_servers(output, transport, server_filter, cache, errors))
+    if server_filter.filters_rows:
+        output.summary('pruned', f"  Rows pruned by filters: {server_filter.pruned}", pruned=server_filter.pruned)
+    output.flush()
 
-    for server in all_servers:
-        hostname = server['hostname']
-        if hostname not in seen_hostnames:
-            seen_hostnames.add(hostname)
-            unique_servers.append(server)
 
-    return unique_servers
+def fetch_all_protocols(output=None, transport=None, server_filter=None, cache=None):
+    """
+    Fetch VPN servers for all available protocols (tcp, udp, ikev2)
+    and return a deduplicated list based on hostname.
+    """
+    return list(iter_all_protocols(output, transport, server_filter, cache))
 
 
 if __name__ == "__main__":
-    try:
-        print("Fetching VPN servers for all protocols...\n")
-        servers = fetch_all_protocols()
+    parser = argparse.ArgumentParser(description='Fetch FastestVPN servers for all protocols')
+    add_transport_argument(parser)
+    parser.add_argument(
+        '--ndjson',
+        action='store_true',
+        help='Stream one server JSON object per line to stdout instead of saving a file (messages go to stderr)'
+    )
+    add_filter_arguments(parser, protocols=allowed_protocols)
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    server_filter = filter_from_args(args)
+    cache = cache_from_args(args)
 
-        print(f"\nTotal unique servers: {len(servers)}")
-        print("\nUnique servers list:")
-        print(json.dumps(servers, indent=2))
+    with output_from_args(args) as output, profiler_from_args(args, output):
+        if args.ndjson:
+            output.stream = sys.stderr
+        try:
+            output.summary('start', "Fetching VPN servers for all protocols...\n")
+            with create_transport(args.transport) as transport:
+                servers = iter_all_protocols(output, transport, server_filter, cache)
 
-        # Optionally save to file
-        output_file = 'all_unique_servers.json'
-        with open(output_file, 'w') as f:
-            json.dump(servers, f, indent=2)
-        print(f"\nResults saved to {output_file}")
+                if args.ndjson:
+                    count = write_ndjson(servers, sys.stdout)
+                    sys.stdout.flush()
+                    output.summary('total', f"\nTotal unique servers: {count}", count=count)
+                else:
+                    servers = list(servers)
+                    output.summary('total', f"\nTotal unique servers: {len(servers)}", count=len(servers))
+                    if output.json_lines:
+                        for server in servers:
+                            output.summary('server', **server)
+                    else:
+                        output.summary('servers', "\nUnique servers list:\n" + json.dumps(servers, indent=2))
 
-    except Exception as e:
-        print(f"Error: {e}")
+                    # Optionally save to file
+                    output_file = 'all_unique_servers.json'
+                    with open(output_file, 'w') as f:
+                        json.dump(servers, f, indent=2)
+                    output.summary('saved', f"\nResults saved to {output_file}", path=output_file)
+            report_transfers(transport, output)
 
+        except Exception as e:
+            output.error('error', f"Error: {e}", error=str(e))
@@ -1,83 +1,309 @@
-import requests
 import json
 import argparse
-from bs4 import BeautifulSoup
+import importlib.util
+import sys
+from html.parser import HTMLParser
+from utils.cache_utils import add_cache_arguments, cache_from_args
+from utils.filter_utils import add_filter_arguments, filter_from_args, filter_servers
+from utils.output_utils import add_output_arguments, output_from_args
+from utils.profile_utils import add_profile_arguments, profiler_from_args
+from utils.stream_utils import write_ndjson
+from utils.transport_utils import add_transport_argument, create_transport, report_transfers
 
 url = 'https://support.fastestvpn.com/wp-admin/admin-ajax.php'
 referer_url = 'https://support.fastestvpn.com/vpn-servers/'
 
-def fetch_vpn_servers(protocol='udp'):
-    # Validate protocol parameter
-    allowed_protocols = ['tcp', 'udp', 'ikev2']
+allowed_protocols = ['tcp', 'udp', 'ikev2']
+
+warmup_headers = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:144.0) Gecko/20100101 Firefox/144.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Sec-GPC': '1',
+    'Priority': 'u=0',
+}
+
+ajax_headers = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:144.0) Gecko/20100101 Firefox/144.0',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Origin': 'https://support.fastestvpn.com',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Referer': 'https://support.fastestvpn.com/vpn-servers/',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+    'Sec-GPC': '1',
+    'Priority': 'u=0',
+    'Pragma': 'no-cache',
+    'Cache-Control': 'no-cache'
+}
+
+
+def validate_protocol(protocol):
     if protocol not in allowed_protocols:
         raise ValueError(f"Invalid protocol '{protocol}'. Must be one of: {', '.join(allowed_protocols)}")
 
-    session = requests.Session()
-
-    # Visit the referer to obtain necessary cookies
-    session.get(referer_url, headers={
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:144.0) Gecko/20100101 Firefox/144.0',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate, br, zstd',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-        'Sec-GPC': '1',
-        'Priority': 'u=0',
-    }, timeout=15)
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:144.0) Gecko/20100101 Firefox/144.0',
-        'Accept': '*/*',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-        'X-Requested-With': 'XMLHttpRequest',
-        'Origin': 'https://support.fastestvpn.com',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Referer': 'https://support.fastestvpn.com/vpn-servers/',
-        'Sec-Fetch-Dest': 'empty',
-        'Sec-Fetch-Mode': 'cors',
-        'Sec-Fetch-Site': 'same-origin',
-        'Sec-GPC': '1',
-        'Priority': 'u=0',
-        'Pragma': 'no-cache',
-        'Cache-Control': 'no-cache'
-    }
 
-    data = {
+def warm_up(transport):
+    """Visit the referer once per transport to obtain necessary cookies."""
+    if getattr(transport, 'warmed_up', False):
+        return
+    transport.get(referer_url, warmup_headers)
+    transport.warmed_up = True
+
+
+def protocol_payload(protocol):
+    return {
         'action': 'vpn_servers',
         'protocol': protocol
     }
 
-    response = session.post(url, headers=headers, data=data, timeout=15)
-    response.raise_for_status()  # Raises HTTPError for bad status codes
 
-    # Use response.text which handles decoding automatically
-    data = response.text
+class ServerTableParser(HTMLParser):
+    """Incremental parser collecting the cell texts of table rows.
+
+    Feed it any number of chunks; completed rows accumulate in ``rows`` as
+    lists of cell texts, extracted like BeautifulSoup's
+    ``get_text(strip=True)``. Only the current row is kept otherwise, so
+    memory does not grow with the size of the document.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._cells = None  # cells of the current row
+        self._text = None  # stripped text nodes of the current cell
+        self._data = []  # pieces of the current text node, which may span chunks
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text()
+        if tag == 'tr':
+            self._end_row()
+            self._cells = []
+        elif tag == 'td' and self._cells is not None:
+            self._end_cell()
+            self._text = []
+
+    def handle_endtag(self, tag):
+        self._end_text()
+        if tag == 'td':
+            self._end_cell()
+        elif tag in ('tr', 'table'):
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._data.append(data)
+
+    def close(self):
+        super().close()
+        self._end_row()
+
+    def _end_text(self):
+        if self._data:
+            text = ''.join(self._data).strip()
+            if text:
+                self._text.append(text)
+            self._data = []
+
+    def _end_cell(self):
+        self._end_text()
+        if self._text is not None:
+            self._cells.append(''.join(self._text))
+            self._text = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._cells is not None:
+            self.rows.append(self._cells)
+            self._cells = None
+
+
+def iter_table_rows(chunks):
+    """Yield the cell texts of each table row, parsing text chunks incrementally."""
+    parser = ServerTableParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.rows
+        parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+
+def _bs4_table_rows(data):
+    from bs4 import BeautifulSoup
 
     try:
-        soup = BeautifulSoup(data, 'html.parser')
-        rows = soup.find_all('tr')
-
-        servers = []
-        for row in rows:
-            cells = row.find_all('td')
-            if len(cells) >= 3:
-                server = {
-                    'country': cells[0].get_text(strip=True),
-                    'city': cells[1].get_text(strip=True),
-                    'hostname': cells[2].get_text(strip=True)
-                }
-                servers.append(server)
-        return servers
+        rows = BeautifulSoup(data, 'html.parser').find_all('tr')
     except Exception as e:
         raise ValueError(f"Error parsing content: {e}\nRaw response data:\n{data}")
+
+    for row in rows:
+        cells = row.find_all('td')
+        yield [cell.get_text(strip=True) for cell in cells[:3]] if len(cells) >= 3 else []
+
+
+def iter_servers(data, server_filter=None):
+    """Yield one server dict per table row of an admin-ajax response.
+
+    ``data`` is the response text, parsed with BeautifulSoup when it is
+    installed, or an iterable of text chunks, parsed incrementally with the
+    standard library as they arrive. Rows rejected by ``server_filter`` are
+    skipped before a dict is built.
+    """
+    if isinstance(data, str):
+        rows = _bs4_table_rows(data) if importlib.util.find_spec('bs4') else iter_table_rows([data])
+    else:
+        rows = iter_table_rows(data)
+
+    for cells in rows:
+        if len(cells) >= 3:
+            country, city, hostname = cells[:3]
+            if server_filter is not None and not server_filter.accepts(country, city, hostname):
+                continue
+            yield {
+                'country': country,
+                'city': city,
+                'hostname': hostname
+            }
+
+
+def parse_servers(data):
+    return list(iter_servers(data))
+
+
+def iter_vpn_servers(protocol='udp', transport=None, server_filter=None, cache=None):
+    """Yield the servers for one protocol as rows are parsed.
+
+    The transport is warmed up on first use; without one, a default
+    transport is created and closed here. Rows not matching
+    ``server_filter`` are skipped by the parser. With a ``cache``, the
+    catalog is shared with concurrent processes instead.
+    """
+    # Validate protocol parameter
+    validate_protocol(protocol)
+
+    if cache is not None:
+        catalog = cached_catalog([protocol], cache, transport)
+        if protocol in catalog['errors']:
+            raise ValueError(catalog['errors'][protocol])
+        servers = catalog['servers'][protocol]
+        yield from filter_servers(servers, server_filter) if server_filter is not None else servers
+        return
+
+    if transport is None:
+        with create_transport() as transport:
+            yield from iter_vpn_servers(protocol, transport, server_filter)
+        return
+
+    warm_up(transport)
+    if hasattr(transport, 'post_chunks'):
+        # Parse the response while it downloads
+        data = transport.post_chunks(url, ajax_headers, protocol_payload(protocol))
+    else:
+        data = transport.post(url, ajax_headers, protocol_payload(protocol))
+    yield from iter_servers(data, server_filter)
+
+
+def fetch_vpn_servers(protocol='udp', transport=None, server_filter=None, cache=None):
+    """Fetch the server list for one protocol; see iter_vpn_servers()."""
+    return list(iter_vpn_servers(protocol, transport, server_filter, cache))
+
+
+def fetch_protocol_pages(protocols, transport):
+    """Fetch the raw responses for several protocols over one transport.
+
+    Transports that support it send the requests concurrently. Returns a
+    list in protocol order holding either the response text or the
+    exception raised for that protocol. Streaming transports return lazy
+    text chunk iterators instead: each request is only sent when its
+    chunks are iterated, and errors are raised then.
+    """
+    for protocol in protocols:
+        validate_protocol(protocol)
+
+    warm_up(transport)
+    if hasattr(transport, 'post_chunks'):
+        return [transport.post_chunks(url, ajax_headers, protocol_payload(p)) for p in protocols]
+    return transport.post_many(url, ajax_headers, [protocol_payload(p) for p in protocols])
+
+
+def cache_name(protocol):
+    """Return the cache entry holding the servers of one protocol."""
+    return f"servers-{protocol}"
+
+
+def fetch_catalog(protocols, transport):
+    """Fetch and parse the full server lists of several protocols.
+
+    Returns a JSON-serializable catalog: ``servers`` maps each protocol to
+    its servers and ``errors`` maps failed protocols to their error message.
+    """
+    catalog = {'servers': {}, 'errors': {}}
+    for protocol, page in zip(protocols, fetch_protocol_pages(protocols, transport)):
+        try:
+            if isinstance(page, Exception):
+                raise page
+            catalog['servers'][protocol] = parse_servers(page)
+        except Exception as e:
+            catalog['errors'][protocol] = str(e)
+    return catalog
+
+
+def cached_catalog(protocols, cache, transport=None, fetch=None):
+    """Return the catalog for ``protocols`` through a single-flight cache.
+
+    Each protocol is cached on its own, so callers asking for overlapping
+    protocol sets share refreshes: only one process at a time fetches a
+    protocol, and concurrent callers wait and reuse what it published.
+    The stale protocols of a caller are fetched together by
+    ``fetch(protocols)``, which returns a catalog; by default through
+    ``transport``, or a default transport created here. Failed or empty
+    protocols are reported in ``errors`` but never published, so the next
+    caller fetches them again.
+    """
+    def fetch_default(stale):
+        if transport is not None:
+            return fetch_catalog(stale, transport)
+        with create_transport() as own_transport:
+            return fetch_catalog(stale, own_transport)
+
+    def refresh(names):
+        stale = [protocol for protocol in protocols if cache_name(protocol) in names]
+        fetched = (fetch or fetch_default)(stale)
+        results = {}
+        for protocol in stale:
+            servers = fetched['servers'].get(protocol)
+            if protocol in fetched['errors']:
+                results[cache_name(protocol)] = ValueError(fetched['errors'][protocol])
+            elif not servers:
+                results[cache_name(protocol)] = ValueError(f"No {protocol} servers found")
+            else:
+                results[cache_name(protocol)] = servers
+        return results
+
+    values = cache.get_many([cache_name(protocol) for protocol in protocols], refresh)
+    catalog = {'servers': {}, 'errors': {}}
+    for protocol in protocols:
+        value = values[cache_name(protocol)]
+        if isinstance(value, Exception):
+            catalog['errors'][protocol] = str(value)
+        else:
+            catalog['servers'][protocol] = value
+    return catalog
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Fetch FastestVPN server list')
     parser.add_argument(
@@ -85,15 +311,43 @@ if __name__ == "__main__":
         nargs='?',
         type=str,
         default='udp',
-        choices=['tcp', 'udp', 'ikev2'],
+        choices=allowed_protocols,
         help='VPN protocol to fetch servers for (default: udp)'
     )
+    add_transport_argument(parser)
+    parser.add_argument(
+        '--ndjson',
+        action='store_true',
+        help='Stream one server JSON object per line to stdout (messages go to stderr)'
+    )
+    add_filter_arguments(parser)
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    server_filter = filter_from_args(args)
+    cache = cache_from_args(args)
 
-    try:
-        servers = fetch_vpn_servers(protocol=args.protocol)
-        print(json.dumps(servers, indent=2))
-        print(f"Total servers fetched: {len(servers)}")
-    except ValueError as e:
-        print(e)
\ No newline at end of file
+    with output_from_args(args) as output, profiler_from_args(args, output):
+        if args.ndjson:
+            output.stream = sys.stderr
+        try:
+            with create_transport(args.transport) as transport:
+                if args.ndjson:
+                    count = write_ndjson(iter_vpn_servers(args.protocol, transport, server_filter, cache), sys.stdout)
+                    sys.stdout.flush()
+                else:
+                    servers = fetch_vpn_servers(args.protocol, transport, server_filter, cache)
+                    count = len(servers)
+                    if output.json_lines:
+                        for server in servers:
+                            output.summary('server', **server)
+                    else:
+                        output.summary('servers', json.dumps(servers, indent=2))
+            report_transfers(transport, output)
+            output.summary('done', f"Total servers fetched: {count}", count=count)
+            if server_filter.filters_rows:
+                output.summary('pruned', f"Rows pruned by filters: {server_filter.pruned}", pruned=server_filter.pruned)
+        except (ValueError, RuntimeError) as e:
+            output.error('error', str(e), error=str(e))
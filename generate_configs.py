@@ -1,64 +1,321 @@
+import argparse
+import os
+import sys
 from pathlib import Path
-from fetch_vpn_servers import fetch_vpn_servers
-from utils.filename_utils import generate_filename
-from utils.config_utils import generate_config
+from fetch_vpn_servers import allowed_protocols
+from fetch_all_protocols import iter_all_protocols
+from utils.filename_utils import name_configs
+from utils.bundle_utils import write_bundle
+from utils.config_utils import compile_template, generate_config, set_allowed_ips
+from utils.allowed_ips_utils import LAN_RANGES, parse_allowed_ips, split_tunnel_allowed_ips
+from utils.cache_utils import add_cache_arguments, cache_from_args
+from utils.filter_utils import add_filter_arguments, filter_from_args, filter_servers
+from utils.output_utils import add_output_arguments, output_from_args
+from utils.profile_utils import add_profile_arguments, profiler_from_args
+from utils.qr_utils import QR_KINDS, QrExporter, require_segno
+from utils.ranking_utils import ProbeHistory, select_top
+from utils.stream_utils import read_ndjson
+from utils.transport_utils import add_transport_argument, create_transport, report_transfers
 
-def main():
-    # Create output directory if it doesn't exist
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate WireGuard configs for all FastestVPN servers')
+    add_transport_argument(parser)
+    parser.add_argument(
+        '--stdin',
+        action='store_true',
+        help='Read servers as NDJSON from stdin instead of fetching them'
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=[],
+        metavar='CIDR[,CIDR...]',
+        help='Route these networks outside the tunnel (repeatable)'
+    )
+    parser.add_argument(
+        '--exclude-lan',
+        action='store_true',
+        help='Route private, link-local and multicast networks outside the tunnel'
+    )
+    add_filter_arguments(parser, protocols=allowed_protocols)
+    parser.add_argument(
+        '--bundle',
+        type=Path,
+        metavar='FILE',
+        help='Write all configs to one compact bundle file instead of the output directory'
+    )
+    parser.add_argument(
+        '--qr',
+        choices=QR_KINDS,
+        help='Also render a QR code per config for mobile import, with an index.html'
+    )
+    parser.add_argument(
+        '--qr-dir',
+        type=Path,
+        default=Path('output') / 'qr',
+        metavar='DIR',
+        help='Directory for QR codes (default: output/qr)'
+    )
+    parser.add_argument(
+        '--qr-cache',
+        type=Path,
+        metavar='DIR',
+        help='Cache of rendered QR codes by config content (default: QR_DIR/.cache)'
+    )
+    parser.add_argument(
+        '--qr-workers',
+        type=int,
+        metavar='N',
+        help='Processes rendering QR codes (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--history',
+        type=Path,
+        metavar='FILE',
+        help='Rank servers within each country using this probe history (see rank_servers.py)'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        metavar='N',
+        help='Only keep the N best-ranked servers per country (requires --history)'
+    )
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.top is not None and args.history is None:
+        parser.error('--top requires --history')
+    if args.qr and args.bundle:
+        parser.error('--qr cannot be combined with --bundle')
+    if args.bundle and not args.bundle.parent.is_dir():
+        parser.error(f"--bundle directory '{args.bundle.parent}' does not exist")
+    if args.stdin and args.protocol:
+        parser.error('--protocol cannot be combined with --stdin (NDJSON servers carry no protocol)')
+    return args
+
+
+def excluded_networks(args):
+    """Collect the networks excluded by --exclude and --exclude-lan."""
+    excluded = list(LAN_RANGES) if args.exclude_lan else []
+    for value in args.exclude:
+        excluded.extend(part.strip() for part in value.split(',') if part.strip())
+    return excluded
+
+
+def render_configs(template_content, servers, output):
+    """Yield (filename, config content, server) for each server.
+
+    Servers are consumed lazily, so rendering starts before the input is
+    exhausted. Servers that fail to render are reported and skipped.
+    """
+    for filename, server in name_configs(servers, output):
+        try:
+            # Generate the configuration content
+            config_content = generate_config(template_content, server)
+        except Exception as e:
+            output.error(
+                'error',
+                f"Error generating config for {server.get('hostname', 'unknown')}: {e}",
+                hostname=server.get('hostname'),
+                error=str(e),
+            )
+            continue
+
+        yield filename, config_content, server
+
+
+def write_configs(configs, output_dir, output, total=None):
+    """Write rendered configs to output_dir and return how many were written."""
+    generated_count = 0
+    index = 0
+
+    for index, (filename, config_content, server) in enumerate(configs, 1):
+        try:
+            # Write the config file; os.path keeps pathlib from interning
+            # every filename for the rest of the run
+            with open(os.path.join(output_dir, filename), 'w') as f:
+                f.write(config_content)
+
+            output.verbose(
+                'generated',
+                f"Generated: {filename} ({server.get('country')} - {server.get('city') or 'N/A'} - {server['hostname']})",
+                filename=filename,
+                hostname=server['hostname'],
+            )
+            generated_count += 1
+
+        except Exception as e:
+            output.error(
+                'error',
+                f"Error generating config for {server.get('hostname', 'unknown')}: {e}",
+                hostname=server.get('hostname'),
+                error=str(e),
+            )
+
+        output.progress(index, total)
+
+    # Force the final update, which may have been rate limited
+    if index and index != total:
+        output.progress(index, index)
+    return generated_count
+
+
+def bundle_entries(servers, output):
+    """Return the (filename, hostname) bundle entries of all servers."""
+    entries = []
+    for filename, server in name_configs(servers, output):
+        entries.append((filename, server['hostname']))
+        output.verbose('generated', f"Bundled: {filename}", filename=filename, hostname=server['hostname'])
+        output.progress(len(entries), None)
+    if entries:
+        output.progress(len(entries), len(entries))
+    return entries
+
+
+def report_qr_stats(stats, qr_dir, output):
+    output.summary(
+        'qr_done',
+        f"QR codes: {stats['configs'] - stats['failed']} in '{qr_dir}' ({stats['cached']} cached, "
+        f"{stats['rendered']} rendered at {stats['per_second']:.0f}/s), cache hit rate {stats['hit_rate']:.0%}",
+        **stats,
+    )
+
+
+def run(args, output):
+    """Generate the configs requested by the parsed command line options.
+
+    Returns the exit status: 1 when nothing could be generated, else 0.
+    """
     output_dir = Path('output')
-    output_dir.mkdir(exist_ok=True)
 
     # Read the template file
     template_path = Path('fastestvpn.conf')
     if not template_path.exists():
-        print(f"Error: Template file '{template_path}' not found!")
-        return
+        output.error('error', f"Error: Template file '{template_path}' not found!", path=str(template_path))
+        return 1
 
     template_content = template_path.read_text()
 
-    # Fetch VPN servers
-    print("Fetching VPN servers...")
-    try:
-        servers = fetch_vpn_servers()
-        print(f"Found {len(servers)} servers")
-    except Exception as e:
-        print(f"Error fetching servers: {e}")
-        return
+    # Split tunnel: compute AllowedIPs once and apply it to the template
+    excluded = excluded_networks(args)
+    if excluded:
+        allowed = parse_allowed_ips(template_content)
+        if not allowed:
+            output.error('error', f"Error: Template file '{template_path}' has no AllowedIPs line to split",
+                         path=str(template_path))
+            return 1
+        try:
+            allowed_ips = split_tunnel_allowed_ips(allowed, excluded)
+        except ValueError as e:
+            output.error('error', f"Error computing split tunnel: {e}", error=str(e))
+            return 1
+        template_content = set_allowed_ips(template_content, allowed_ips)
+        output.summary('allowed_ips', f"AllowedIPs: {len(allowed_ips)} networks", count=len(allowed_ips))
 
-    # Generate config files
-    generated_count = 0
-    filename_counter = {}  # Track duplicate filenames
+    history = None
+    if args.history:
+        try:
+            history = ProbeHistory.load(args.history)
+        except (OSError, ValueError, RuntimeError) as e:
+            output.error('error', f"Error loading probe history: {e}", error=str(e))
+            return 1
 
-    for server in servers:
+    if args.qr:
         try:
-            # Generate the configuration content
-            config_content = generate_config(template_content, server)
+            require_segno()
+        except RuntimeError as e:
+            output.error('error', f"Error: {e}", error=str(e))
+            return 1
 
-            # Generate the base filename
-            base_filename = generate_filename(server)
+    # The bundle and QR images are written once every server is in
+    bundled = []
+    exporter = QrExporter(args.qr_dir, args.qr, args.qr_cache, args.qr_workers) if args.qr else None
 
-            # Handle duplicate filenames by adding a counter
-            if base_filename in filename_counter:
-                filename_counter[base_filename] += 1
-                # Insert counter before .conf extension
-                name_without_ext = base_filename[:-5]  # Remove .conf
-                filename = f"{name_without_ext}-{filename_counter[base_filename]}.conf"
-            else:
-                filename_counter[base_filename] = 1
-                filename = base_filename
+    def generate(servers):
+        if history is not None:
+            servers = select_top(servers, history, args.top)
+            output.summary('ranked', f"Ranked {len(servers)} servers by probe history", count=len(servers))
+        if args.bundle:
+            bundled.extend(bundle_entries(servers, output))
+            return len(bundled)
+        # Create output directory if it doesn't exist
+        output_dir.mkdir(exist_ok=True)
+        configs = render_configs(template_content, servers, output)
+        if exporter is not None:
+            # QR codes are rendered on a process pool while configs are written
+            configs = exporter.tap(configs)
+        return write_configs(configs, output_dir, output)
 
-            # Write the config file
-            output_path = output_dir / filename
-            output_path.write_text(config_content)
+    # Without --protocol, only udp servers are fetched
+    server_filter = filter_from_args(args, default_protocols=None if args.stdin else ['udp'])
 
-            print(f"Generated: {filename} ({server['country']} - {server['city'] or 'N/A'} - {server['hostname']})")
-            generated_count += 1
+    action = 'reading' if args.stdin else 'fetching'
+    errors = {}
+    try:
+        if args.stdin:
+            servers = filter_servers(read_ndjson(sys.stdin), server_filter)
+            generated_count = generate(servers)
+            if server_filter.filters_rows:
+                output.summary('pruned', f"Rows pruned by filters: {server_filter.pruned}", pruned=server_filter.pruned)
+        else:
+            # Fetch VPN servers, writing configs while rows are parsed; rows
+            # not matching the filters are skipped inside the parser
+            output.summary('fetch_start', "Fetching VPN servers...")
+            with create_transport(args.transport) as transport:
+                servers = iter_all_protocols(output, transport, server_filter, cache_from_args(args), errors)
+                generated_count = generate(servers)
+            report_transfers(transport, output)
+    except Exception as e:
+        output.error('error', f"Error {action} servers: {e}", error=str(e))
+        return 1
+    finally:
+        if exporter is not None:
+            # Waits for the queued renders
+            exporter.close()
+
+    if errors:
+        failed = ', '.join(errors)
+        if len(errors) == len(server_filter.protocols_to_fetch(allowed_protocols)):
+            output.error('failed', f"\nFailed to fetch servers for {failed}; no configurations generated",
+                         protocols=list(errors))
+            return 1
+        output.error('partial', f"\nWarning: failed to fetch servers for {failed}; their configurations are missing",
+                     protocols=list(errors))
+
+    try:
+        if args.bundle:
+            write_bundle(args.bundle, compile_template(template_content), bundled)
+        elif exporter is not None:
+            report_qr_stats(exporter.finish(output), args.qr_dir, output)
+    except OSError as e:
+        target = f"bundle '{args.bundle}'" if args.bundle else f"QR codes to '{args.qr_dir}'"
+        output.error('error', f"Error writing {target}: {e}", error=str(e))
+        return 1
+
+    if args.bundle:
+        output.summary(
+            'done',
+            f"\nSuccessfully generated {generated_count} configurations in bundle '{args.bundle}'",
+            count=generated_count,
+            bundle=str(args.bundle),
+        )
+    else:
+        output.summary(
+            'done',
+            f"\nSuccessfully generated {generated_count} configuration files in '{output_dir}' directory",
+            count=generated_count,
+            directory=str(output_dir),
+        )
+    return 0
 
-        except Exception as e:
-            print(f"Error generating config for {server.get('hostname', 'unknown')}: {e}")
 
-    print(f"\nSuccessfully generated {generated_count} configuration files in '{output_dir}' directory")
+def main(argv=None):
+    args = parse_args(argv)
+    with output_from_args(args) as output, profiler_from_args(args, output):
+        return run(args, output)
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
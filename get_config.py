@@ -0,0 +1,145 @@
+import argparse
+import sys
+from pathlib import Path
+from fetch_vpn_servers import allowed_protocols, cache_name, cached_catalog, fetch_catalog
+from utils.cache_utils import CatalogCache, default_cache_dir
+from utils.config_utils import generate_config
+from utils.index_utils import build_index, load_index, resolve_name, save_index, source_signature
+from utils.output_utils import add_output_arguments, output_from_args
+from utils.stream_utils import unique_servers
+from utils.transport_utils import add_transport_argument, create_transport, report_transfers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Render the WireGuard config of one FastestVPN server')
+    parser.add_argument(
+        'name',
+        help='Server hostname or config filename (with or without .conf), as named by generate_configs.py'
+    )
+    parser.add_argument(
+        '--protocol',
+        action='append',
+        choices=allowed_protocols,
+        help='Protocol catalog to search (repeatable, default: udp, as generate_configs.py)'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=Path,
+        metavar='FILE',
+        help='Write the config to FILE instead of stdout'
+    )
+    parser.add_argument('--cache-dir', type=Path, metavar='DIR',
+                        help=f"Catalog cache directory (default: {default_cache_dir()})")
+    parser.add_argument('--max-age', type=float, default=3600, metavar='SECONDS',
+                        help='Fetch the catalog again when the cached one is older (default: 3600)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Never fetch; use the cached catalog whatever its age')
+    add_transport_argument(parser)
+    add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def load_catalog(protocols, cache, args, output):
+    """Return the cached catalog, fetching protocols only when missing or older than --max-age."""
+    if args.offline:
+        catalog = {'servers': {}, 'errors': {}}
+        for protocol in protocols:
+            servers = cache.read(cache_name(protocol))
+            if servers is None:
+                raise RuntimeError(f"No cached {protocol} servers in '{cache.directory}'; run once without --offline")
+            catalog['servers'][protocol] = servers
+        return catalog
+
+    def fetch(stale):
+        output.summary('fetch_start', f"Fetching servers for protocols: {', '.join(stale)}", protocols=stale)
+        with create_transport(args.transport) as transport:
+            catalog = fetch_catalog(stale, transport)
+        report_transfers(transport, output)
+        return catalog
+
+    return cached_catalog(protocols, cache, fetch=fetch)
+
+
+def catalog_signature(cache, protocols):
+    """Return the signature of the cached server lists, or None if one is missing."""
+    signatures = [source_signature(cache.path(cache_name(protocol))) for protocol in protocols]
+    return None if None in signatures else signatures
+
+
+def catalog_servers(catalog, protocols):
+    """Yield the servers of each protocol in turn, as generate_configs.py reads them."""
+    for protocol in protocols:
+        yield from catalog['servers'].get(protocol, [])
+
+
+def index_path_for(cache, protocols):
+    return cache.directory / f"index-{'-'.join(protocols)}.json"
+
+
+def find_server(protocols, cache, args, output):
+    """Return the server named by ``args.name`` and its config filename.
+
+    The filename index is rebuilt only when the cached catalog changed.
+    Raises RuntimeError when a protocol could not be fetched and KeyError
+    when no server matches.
+    """
+    index_path = index_path_for(cache, protocols)
+
+    # A catalog replaced while it is read gets an index next time
+    before = catalog_signature(cache, protocols)
+    catalog = load_catalog(protocols, cache, args, output)
+    signature = catalog_signature(cache, protocols)
+    # Failed protocols are never cached, so the next run fetches them again;
+    # looking the name up in what is left could give a wrong answer
+    if catalog['errors']:
+        raise RuntimeError('; '.join(f"fetching {protocol} servers failed: {error}"
+                                     for protocol, error in catalog['errors'].items()))
+
+    index = load_index(index_path, signature) if signature == before else None
+    if index is None:
+        index = build_index(unique_servers(catalog_servers(catalog, protocols)))
+        if signature is not None and signature == before:
+            save_index(index_path, signature, index)
+
+    filename = resolve_name(index, args.name)
+    hostname = index[filename]
+    server = next(server for server in catalog_servers(catalog, protocols) if server['hostname'] == hostname)
+    return filename, server
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with output_from_args(args) as output:
+        # stdout is reserved for the config
+        output.stream = sys.stderr
+
+        template_path = Path('fastestvpn.conf')
+        if not template_path.exists():
+            output.error('error', f"Error: Template file '{template_path}' not found!", path=str(template_path))
+            return 1
+
+        protocols = [protocol for protocol in allowed_protocols if protocol in (args.protocol or ['udp'])]
+        cache = CatalogCache(args.cache_dir or default_cache_dir(), max_age=args.max_age)
+
+        try:
+            filename, server = find_server(protocols, cache, args, output)
+        except KeyError:
+            output.error('not_found', f"No server named '{args.name}' in the {', '.join(protocols)} catalog", name=args.name)
+            return 1
+        except Exception as e:
+            output.error('error', f"Error: {e}", error=str(e))
+            return 1
+
+        config = generate_config(template_path.read_text(), server)
+        if args.output:
+            args.output.write_text(config)
+            output.summary('written', f"Wrote {filename} ({server['hostname']}) to {args.output}",
+                           filename=filename, hostname=server['hostname'], path=str(args.output))
+        else:
+            sys.stdout.write(config)
+            sys.stdout.flush()
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
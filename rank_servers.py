@@ -0,0 +1,83 @@
+import argparse
+import math
+import sys
+from pathlib import Path
+from utils.output_utils import add_output_arguments, output_from_args
+from utils.ranking_utils import ProbeHistory, read_samples
+from utils.stream_utils import read_ndjson
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Record probe samples and rank servers by latency and loss')
+    parser.add_argument(
+        'history',
+        type=Path,
+        help='Probe history file (.npz), created on first --record'
+    )
+    parser.add_argument(
+        '--record',
+        action='store_true',
+        help='Read samples as NDJSON from stdin: {"hostname": ..., "rtt_ms": 12.3} (null for a lost probe)'
+    )
+    parser.add_argument(
+        '--capacity',
+        type=int,
+        default=1000,
+        help='Samples kept per server in a new history (default: 1000)'
+    )
+    parser.add_argument(
+        '--alpha',
+        type=float,
+        default=0.1,
+        help='EWMA weight of the newest sample (default: 0.1)'
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=20,
+        help='Number of servers to list (default: 20)'
+    )
+    add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def json_fields(values):
+    """Return one server's statistics as valid JSON: integer counts and None for undefined values."""
+    fields = {key: value if math.isfinite(value) else None for key, value in values.items()}
+    fields['samples'] = int(values['samples'])
+    fields['received'] = int(values['received'])
+    return fields
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with output_from_args(args) as output:
+        try:
+            history = ProbeHistory.load(args.history, args.capacity)
+            if args.record:
+                hostnames, rtts = read_samples(read_ndjson(sys.stdin))
+                history.record_many(hostnames, rtts)
+                history.save(args.history)
+                output.summary('recorded', f"Recorded {len(hostnames)} samples", count=len(hostnames))
+        except (OSError, ValueError, RuntimeError) as e:
+            output.error('error', f"Error: {e}", error=str(e))
+            return 1
+
+        stats = history.summary(args.alpha)
+        ranked = sorted(range(len(history)), key=lambda row: stats['score'][row])[:args.limit]
+
+        output.summary('header', f"{'hostname':<36}{'p50':>8}{'p95':>8}{'ewma':>8}{'avail':>7}{'score':>9}")
+        for row in ranked:
+            values = {key: float(column[row]) for key, column in stats.items()}
+            output.summary(
+                'server',
+                f"{history.hostnames[row]:<36}{values['p50']:>8.1f}{values['p95']:>8.1f}{values['ewma']:>8.1f}"
+                f"{values['availability']:>7.0%}{values['score']:>9.1f}",
+                hostname=history.hostnames[row],
+                **json_fields(values),
+            )
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
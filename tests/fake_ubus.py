@@ -0,0 +1,141 @@
+"""Local stand-in for an OpenWrt router's ubus JSON-RPC endpoint."""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UBUS_STATUS_OK = 0
+UBUS_STATUS_INVALID_ARGUMENT = 2
+UBUS_STATUS_NOT_FOUND = 4
+UBUS_STATUS_PERMISSION_DENIED = 6
+
+
+class ActivityTracker:
+    """Tracks requests in flight across several fake routers."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.current -= 1
+
+
+class FakeRouter:
+    """Threaded HTTP/1.1 server implementing session.login, file.md5 and file.write.
+
+    ``delay`` is added to every call to simulate a slow router. With
+    ``fail_writes`` every file.write is denied, and with ``broken`` every
+    request answers HTTP 500. Written files are kept in ``files`` and the
+    ``mode`` they were written with (an integer, as rpcd requires) in ``modes``.
+    """
+
+    def __init__(self, password='secret', delay=0.0, fail_writes=False, broken=False, tracker=None):
+        self.password = password
+        self.delay = delay
+        self.fail_writes = fail_writes
+        self.broken = broken
+        self.tracker = tracker or ActivityTracker()
+        self.files = {}
+        self.modes = {}
+        self.calls = []
+        self.connections = 0
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def handle(self, request):
+        """Return the JSON-RPC response for one request."""
+        session_id, obj, method, params = request['params']
+        with self._lock:
+            self.calls.append(f"{obj}.{method}")
+
+        if (obj, method) == ('session', 'login'):
+            if params.get('password') != self.password:
+                return self._result(request, UBUS_STATUS_PERMISSION_DENIED)
+            new_session = f"{len(self._sessions) + 1:032x}"
+            self._sessions.add(new_session)
+            return self._result(request, UBUS_STATUS_OK, {'ubus_rpc_session': new_session})
+
+        if session_id not in self._sessions:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32002, 'message': 'Access denied'}}
+
+        if (obj, method) == ('file', 'md5'):
+            if params['path'] not in self.files:
+                return self._result(request, UBUS_STATUS_NOT_FOUND)
+            md5 = hashlib.md5(self.files[params['path']].encode()).hexdigest()
+            return self._result(request, UBUS_STATUS_OK, {'md5': md5})
+
+        if (obj, method) == ('file', 'write'):
+            if self.fail_writes:
+                return self._result(request, UBUS_STATUS_PERMISSION_DENIED)
+            mode = params.get('mode')
+            if mode is not None and (not isinstance(mode, int) or isinstance(mode, bool)):
+                return self._result(request, UBUS_STATUS_INVALID_ARGUMENT)
+            self.files[params['path']] = params['data']
+            self.modes[params['path']] = mode
+            return self._result(request, UBUS_STATUS_OK)
+
+        return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32601, 'message': 'Method not found'}}
+
+    def _result(self, request, code, data=None):
+        result = [code] if data is None else [code, data]
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def _handler_class(self):
+        router = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                with router._lock:
+                    router.connections += 1
+                super().setup()
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with router.tracker:
+                    time.sleep(router.delay)
+                    if router.broken:
+                        status, payload = 500, b'internal error'
+                    else:
+                        status, payload = 200, json.dumps(router.handle(json.loads(body))).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -0,0 +1,174 @@
+"""Local stand-in for the FastestVPN support site used by tests and benchmarks."""
+import gzip
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+COUNTRIES = [
+    ('United States', 'us', ['New York', 'Los Angeles', 'Miami']),
+    ('United Kingdom', 'uk', ['London', 'Manchester']),
+    ('Germany', 'de', ['Frankfurt', 'Berlin']),
+    ('Netherlands', 'nl', ['Amsterdam']),
+    ('Canada', 'ca', ['']),
+]
+
+
+def make_servers(count):
+    """Build ``count`` server dicts with unique hostnames."""
+    servers = []
+    for i in range(count):
+        country, code, cities = COUNTRIES[i % len(COUNTRIES)]
+        city = cities[i % len(cities)]
+        servers.append({
+            'country': country,
+            'city': city,
+            'hostname': f"{code}-{i:04d}.jumptoserver.com",
+        })
+    return servers
+
+
+def render_table(servers):
+    """Render servers the way the admin-ajax endpoint does."""
+    rows = ''.join(
+        f"<tr><td>{s['country']}</td><td>{s['city']}</td><td>{s['hostname']}</td></tr>"
+        for s in servers
+    )
+    return f"<table><tr><th>Country</th><th>City</th><th>Hostname</th></tr>{rows}</table>"
+
+
+class FakeUpstream:
+    """Threaded HTTP/1.1 server answering the warmup GET and protocol POSTs.
+
+    ``servers`` maps protocol to its server list (a plain list is used for
+    every protocol). ``latency`` is added to every request and
+    ``connect_latency`` to every new connection, to simulate a distant
+    server. With ``content_encoding`` ('gzip', 'deflate', 'br' or 'zstd'), server tables
+    are compressed for clients that accept it. Received requests are
+    recorded in ``requests`` and their headers, with lowercase names, in
+    ``request_headers``.
+    """
+
+    def __init__(self, servers=None, latency=0.0, connect_latency=0.0, content_encoding=None):
+        if servers is None:
+            servers = make_servers(20)
+        if isinstance(servers, list):
+            servers = {'tcp': servers, 'udp': servers, 'ikev2': servers}
+        self.servers = servers
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.content_encoding = content_encoding
+        self.requests = []
+        self.request_headers = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/wp-admin/admin-ajax.php"
+
+    @property
+    def referer_url(self):
+        return f"{self.base_url}/vpn-servers/"
+
+    def protocol_count(self, protocol):
+        """Number of POSTs received for ``protocol``."""
+        with self._lock:
+            return sum(1 for method, p in self.requests if method == 'POST' and p == protocol)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def respond(self, method, path, body, headers=None):
+        """Return (status, headers, body bytes) for a request."""
+        if method == 'GET':
+            return 200, {'Content-Type': 'text/html', 'Set-Cookie': 'wp=1; Path=/'}, b'<html></html>'
+        protocol = parse_qs(body.decode()).get('protocol', [''])[0]
+        if protocol not in self.servers:
+            return 400, {'Content-Type': 'text/plain'}, b'bad protocol'
+        payload = render_table(self.servers[protocol]).encode()
+        accepted = (headers or {}).get('Accept-Encoding', '')
+        if self.content_encoding and self.content_encoding in accepted:
+            payload = self.encode(payload)
+            return 200, {'Content-Type': 'text/html; charset=utf-8', 'Content-Encoding': self.content_encoding}, payload
+        return 200, {'Content-Type': 'text/html'}, payload
+
+    def encode(self, payload):
+        if self.content_encoding == 'gzip':
+            return gzip.compress(payload)
+        if self.content_encoding == 'br':
+            try:
+                import brotli
+            except ImportError:
+                import brotlicffi as brotli
+            return brotli.compress(payload)
+        if self.content_encoding == 'zstd':
+            try:
+                from compression import zstd
+            except ImportError:
+                import zstandard as zstd
+            return zstd.compress(payload)
+        return zlib.compress(payload)
+
+    def _record(self, method, body, headers=None):
+        protocol = parse_qs(body.decode()).get('protocol', [None])[0] if body else None
+        with self._lock:
+            self.requests.append((method, protocol))
+            self.request_headers.append({k.lower(): v for k, v in (headers or {}).items()})
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                with upstream._lock:
+                    upstream.connections += 1
+                time.sleep(upstream.connect_latency)
+                super().setup()
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                upstream._record(method, body, self.headers)
+                time.sleep(upstream.latency)
+                status, headers, payload = upstream.respond(method, self.path, body, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
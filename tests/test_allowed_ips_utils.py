@@ -0,0 +1,156 @@
+"""Unit tests for allowed_ips_utils module."""
+import ipaddress
+import random
+import pytest
+from utils.allowed_ips_utils import (
+    LAN_RANGES, parse_allowed_ips, split_tunnel_allowed_ips, _split_tunnel_normalized,
+)
+
+
+def reference_split(allowed, excluded):
+    """Compute allowed minus excluded with ipaddress.address_exclude."""
+    result = []
+    for version in (4, 6):
+        remaining = [ipaddress.ip_network(n) for n in allowed if ipaddress.ip_network(n).version == version]
+        holes = [ipaddress.ip_network(n, strict=False) for n in excluded]
+        holes = [n for n in holes if n.version == version]
+        for hole in holes:
+            next_remaining = []
+            for network in remaining:
+                if hole.supernet_of(network):
+                    continue
+                if network.overlaps(hole):
+                    next_remaining.extend(network.address_exclude(hole))
+                else:
+                    next_remaining.append(network)
+            remaining = next_remaining
+        result.extend(str(n) for n in ipaddress.collapse_addresses(remaining))
+    return result
+
+
+class TestParseAllowedIps:
+    """Test suite for parse_allowed_ips function."""
+
+    def test_should_return_networks_from_allowed_ips_line(self):
+        """Should return networks from allowed ips line."""
+        # Given: a template with IPv4 and IPv6 AllowedIPs
+        template = "[Peer]\nAllowedIPs = 0.0.0.0/0, ::/0\nEndpoint = hostname.com"
+
+        # When: parsing the AllowedIPs line
+        result = parse_allowed_ips(template)
+
+        # Then: both networks should be returned
+        assert result == ['0.0.0.0/0', '::/0']
+
+    def test_should_return_empty_list_when_line_missing(self):
+        """Should return empty list when line missing."""
+        # Given/When/Then: a template without AllowedIPs yields no networks
+        assert parse_allowed_ips("[Peer]\nEndpoint = hostname.com") == []
+
+
+class TestSplitTunnelAllowedIps:
+    """Test suite for split_tunnel_allowed_ips function."""
+
+    def test_should_exclude_single_network_from_full_tunnel(self):
+        """Should exclude single network from full tunnel."""
+        # Given: a full IPv4 tunnel and one excluded /8
+        # When: computing the split tunnel
+        result = split_tunnel_allowed_ips(['0.0.0.0/0'], ['10.0.0.0/8'])
+
+        # Then: the result should be the minimal complement
+        assert result == reference_split(['0.0.0.0/0'], ['10.0.0.0/8'])
+        assert len(result) == 8
+
+    def test_should_return_allowed_unchanged_when_nothing_excluded(self):
+        """Should return allowed unchanged when nothing excluded."""
+        # Given/When/Then: no exclusions keep the full tunnel
+        assert split_tunnel_allowed_ips(['0.0.0.0/0', '::/0'], []) == ['0.0.0.0/0', '::/0']
+
+    def test_should_raise_value_error_when_everything_excluded(self):
+        """Should raise value error when everything excluded."""
+        # Given/When/Then: excluding the whole space leaves nothing to route
+        with pytest.raises(ValueError, match='exclusions cover every allowed network'):
+            split_tunnel_allowed_ips(['0.0.0.0/0'], ['0.0.0.0/1', '128.0.0.0/1'])
+
+    def test_should_raise_value_error_when_nothing_allowed(self):
+        """Should raise value error when nothing allowed."""
+        # Given/When/Then: a template without AllowedIPs has nothing to split
+        with pytest.raises(ValueError, match='exclusions cover every allowed network'):
+            split_tunnel_allowed_ips([], ['10.0.0.0/8'])
+
+    def test_should_handle_ipv4_and_ipv6_together(self):
+        """Should handle ipv4 and ipv6 together."""
+        # Given: a dual-stack tunnel and LAN exclusions
+        allowed = ['0.0.0.0/0', '::/0']
+
+        # When: excluding the LAN ranges
+        result = split_tunnel_allowed_ips(allowed, LAN_RANGES)
+
+        # Then: it should match ipaddress for both families
+        assert result == reference_split(allowed, LAN_RANGES)
+        assert any(':' in network for network in result)
+
+    def test_should_ignore_ipv6_exclusions_when_only_ipv4_allowed(self):
+        """Should ignore ipv6 exclusions when only ipv4 allowed."""
+        # Given/When: an IPv4-only tunnel with an IPv6 exclusion
+        result = split_tunnel_allowed_ips(['0.0.0.0/0'], ['fc00::/7'])
+
+        # Then: the IPv4 tunnel should be unchanged and no IPv6 added
+        assert result == ['0.0.0.0/0']
+
+    def test_should_merge_overlapping_and_adjacent_exclusions(self):
+        """Should merge overlapping and adjacent exclusions."""
+        # Given: overlapping and adjacent excluded ranges
+        excluded = ['192.168.0.0/24', '192.168.1.0/24', '192.168.0.128/25', '192.168.0.0/23']
+
+        # When: computing the split tunnel
+        result = split_tunnel_allowed_ips(['192.168.0.0/16'], excluded)
+
+        # Then: it should match ipaddress
+        assert result == reference_split(['192.168.0.0/16'], excluded)
+
+    def test_should_accept_host_bits_in_excluded_networks(self):
+        """Should accept host bits in excluded networks."""
+        # Given/When: an exclusion written with host bits set
+        result = split_tunnel_allowed_ips(['10.0.0.0/8'], ['10.1.2.3/16'])
+
+        # Then: it should be treated as its network
+        assert result == reference_split(['10.0.0.0/8'], ['10.1.0.0/16'])
+
+    def test_should_raise_value_error_when_network_invalid(self):
+        """Should raise value error when network invalid."""
+        # Given/When/Then: an invalid network is rejected
+        with pytest.raises(ValueError):
+            split_tunnel_allowed_ips(['0.0.0.0/0'], ['not-a-network'])
+
+    def test_should_reuse_cached_result_for_equal_exclusion_sets(self):
+        """Should reuse cached result for equal exclusion sets."""
+        # Given: the same exclusion set spelled in two orders
+        _split_tunnel_normalized.cache_clear()
+
+        # When: computing the split tunnel for both
+        first = split_tunnel_allowed_ips(['0.0.0.0/0'], ['10.0.0.0/8', '192.168.0.0/16'])
+        second = split_tunnel_allowed_ips(['0.0.0.0/0'], ['192.168.0.0/16', '10.0.0.0/8'])
+
+        # Then: the normalized computation should run only once
+        assert first == second
+        assert _split_tunnel_normalized.cache_info().misses == 1
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_should_match_ipaddress_for_random_exclusions(self, seed):
+        """Should match ipaddress for random exclusions."""
+        # Given: random IPv4 and IPv6 exclusions
+        rng = random.Random(seed)
+        excluded = []
+        for _ in range(rng.randint(1, 30)):
+            if rng.random() < 0.5:
+                excluded.append(str(ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(4, 32)), strict=False)))
+            else:
+                excluded.append(str(ipaddress.IPv6Network((rng.getrandbits(128), rng.randint(4, 128)), strict=False)))
+        allowed = ['0.0.0.0/0', '::/0']
+
+        # When: computing the split tunnel
+        result = split_tunnel_allowed_ips(allowed, excluded)
+
+        # Then: it should match the ipaddress reference
+        assert result == reference_split(allowed, excluded)
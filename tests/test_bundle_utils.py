@@ -0,0 +1,100 @@
+"""Unit tests for bundle_utils module."""
+import pytest
+from utils.bundle_utils import Bundle, encode_bundle, main, write_bundle
+
+PARTS = ['[Peer]\nEndpoint = ', ':51820\n']
+
+
+@pytest.fixture
+def entries():
+    """Provide (filename, hostname) entries, including a non-default filename."""
+    return [
+        ('uk-london.conf', 'uk-london.jumptoserver.com'),
+        ('uk-london-stream.conf', 'uk-london-stream.jumptoserver.com'),
+        ('united-kingdom-uk-dbl.conf', 'uk-dbl.jumptoserver.com'),
+        ('es-01-2.conf', 'es-01.example.com'),
+    ]
+
+
+class TestBundle:
+    """Test suite for encoding and decoding bundles."""
+
+    def test_should_round_trip_every_entry(self, entries):
+        """Should round trip every entry."""
+        # Given: an encoded bundle
+        bundle = Bundle(encode_bundle(PARTS, entries))
+
+        # When/Then: every config should render with its hostname
+        assert sorted(bundle.names()) == sorted(filename for filename, _ in entries)
+        for filename, hostname in entries:
+            assert bundle.render(filename) == f"[Peer]\nEndpoint = {hostname}:51820\n"
+
+    def test_should_resolve_hostname_and_name_without_extension(self, entries):
+        """Should resolve hostname and name without extension."""
+        # Given: an encoded bundle
+        bundle = Bundle(encode_bundle(PARTS, entries))
+
+        # When/Then: configs can be looked up by hostname or bare name
+        assert bundle.resolve('uk-dbl.jumptoserver.com') == 'united-kingdom-uk-dbl.conf'
+        assert bundle.resolve('uk-london') == 'uk-london.conf'
+        with pytest.raises(KeyError):
+            bundle.resolve('missing')
+
+    def test_should_be_smaller_than_configs(self, entries):
+        """Should be smaller than configs."""
+        # Given: many servers sharing a long template
+        parts = ['[Interface]\nPrivateKey = ' + 'k' * 44 + '\n\n[Peer]\nEndpoint = ', ':51820\n']
+        many = [(f"us-{i:04d}.conf", f"us-{i:04d}.jumptoserver.com") for i in range(500)]
+
+        # When: encoding them
+        data = encode_bundle(parts, many)
+
+        # Then: the bundle should be much smaller than the configs it holds
+        assert len(data) * 20 < sum(len(hostname.join(parts)) for _, hostname in many)
+
+    def test_should_reject_other_files(self):
+        """Should reject other files."""
+        # Given/When/Then: data without the magic header is rejected
+        with pytest.raises(ValueError):
+            Bundle(b'PK\x03\x04')
+
+
+class TestExpander:
+    """Test suite for the command line expander."""
+
+    def test_should_expand_all_configs(self, tmp_path, entries):
+        """Should expand all configs."""
+        # Given: a bundle file
+        write_bundle(tmp_path / 'configs.fvb', PARTS, entries)
+
+        # When: expanding it
+        code = main([str(tmp_path / 'configs.fvb'), '--all', '-o', str(tmp_path / 'out')])
+
+        # Then: one file per entry should be written
+        assert code == 0
+        assert sorted(p.name for p in (tmp_path / 'out').iterdir()) == sorted(f for f, _ in entries)
+        assert (tmp_path / 'out' / 'es-01-2.conf').read_text() == '[Peer]\nEndpoint = es-01.example.com:51820\n'
+
+    def test_should_print_one_config(self, tmp_path, entries, capsys):
+        """Should print one config."""
+        # Given: a bundle file
+        write_bundle(tmp_path / 'configs.fvb', PARTS, entries)
+
+        # When: printing a config by name
+        code = main([str(tmp_path / 'configs.fvb'), 'uk-london'])
+
+        # Then: only that config should be printed
+        assert code == 0
+        assert capsys.readouterr().out == '[Peer]\nEndpoint = uk-london.jumptoserver.com:51820\n'
+
+    def test_should_fail_for_unknown_config(self, tmp_path, entries, capsys):
+        """Should fail for unknown config."""
+        # Given: a bundle file
+        write_bundle(tmp_path / 'configs.fvb', PARTS, entries)
+
+        # When: asking for a missing config
+        code = main([str(tmp_path / 'configs.fvb'), 'nope'])
+
+        # Then: an error should be reported
+        assert code == 1
+        assert 'no config named' in capsys.readouterr().err
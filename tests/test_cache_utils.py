@@ -0,0 +1,270 @@
+"""Unit tests for cache_utils module, including multi-process single-flight."""
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import pytest
+import fetch_vpn_servers
+from fetch_all_protocols import fetch_all_protocols
+from tests.fake_upstream import FakeUpstream, make_servers
+from utils.cache_utils import CatalogCache, FileLock
+from utils.output_utils import Output
+
+
+def hold_lock(path, ready):
+    """Child process: take the lock, signal readiness and wait to be killed."""
+    lock = FileLock(path)
+    assert lock.try_acquire()
+    ready.set()
+    time.sleep(60)
+
+
+def fetch_in_process(upstream_url, referer_url, cache_dir, barrier, results):
+    """Child process: fetch all protocols through the shared cache."""
+    fetch_vpn_servers.url = upstream_url
+    fetch_vpn_servers.referer_url = referer_url
+    barrier.wait()
+    servers = fetch_all_protocols(Output(stream=io.StringIO()), cache=CatalogCache(cache_dir))
+    results.put(servers)
+
+
+def fetch_catalog_in_process(upstream_url, referer_url, cache_dir, barrier, results, protocols):
+    """Child process: fetch some protocols through the shared cache."""
+    fetch_vpn_servers.url = upstream_url
+    fetch_vpn_servers.referer_url = referer_url
+    barrier.wait()
+    results.put(fetch_vpn_servers.cached_catalog(protocols, CatalogCache(cache_dir)))
+
+
+class TestFileLock:
+    """Test suite for FileLock class."""
+
+    def test_should_be_exclusive_until_released(self, tmp_path):
+        """Should be exclusive until released."""
+        # Given: a held lock
+        first = FileLock(tmp_path / 'catalog.lock')
+        second = FileLock(tmp_path / 'catalog.lock')
+        assert first.try_acquire()
+
+        # When/Then: a second holder cannot take it until it is released
+        assert not second.try_acquire()
+        first.release()
+        assert second.try_acquire()
+        second.release()
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason='uses SIGKILL')
+    def test_should_recover_lock_when_owner_process_crashes(self, tmp_path):
+        """Should recover lock when owner process crashes."""
+        # Given: a lock held by another process
+        context = multiprocessing.get_context('spawn')
+        ready = context.Event()
+        process = context.Process(target=hold_lock, args=(str(tmp_path / 'catalog.lock'), ready))
+        process.start()
+        assert ready.wait(30)
+        lock = FileLock(tmp_path / 'catalog.lock')
+        assert not lock.try_acquire()
+
+        # When: the owner is killed without releasing the lock
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+        # Then: the lock should be free again
+        assert lock.try_acquire()
+        lock.release()
+
+
+class TestCatalogCache:
+    """Test suite for CatalogCache class."""
+
+    def test_should_publish_refreshed_value(self, tmp_path):
+        """Should publish refreshed value."""
+        # Given: an empty cache
+        cache = CatalogCache(tmp_path)
+
+        # When: getting a value
+        value = cache.get('catalog', lambda: {'servers': [1, 2]})
+
+        # Then: the value should be returned and readable by others
+        assert value == {'servers': [1, 2]}
+        assert cache.read('catalog') == {'servers': [1, 2]}
+        assert not list(tmp_path.glob('*.tmp'))
+
+    def test_should_reuse_value_within_max_age(self, tmp_path):
+        """Should reuse value within max age."""
+        # Given: a cache allowing minute-old values and a published value
+        cache = CatalogCache(tmp_path, max_age=60)
+        cache.get('catalog', lambda: 'first')
+
+        # When: getting the value again
+        value = cache.get('catalog', lambda: 'second')
+
+        # Then: the published value should be reused
+        assert value == 'first'
+
+    def test_should_refresh_when_value_older_than_call(self, tmp_path):
+        """Should refresh when value older than call."""
+        # Given: a cache only sharing concurrent refreshes and a published value
+        cache = CatalogCache(tmp_path, max_age=0)
+        cache.get('catalog', lambda: 'first')
+        time.sleep(0.01)
+
+        # When: getting the value after that refresh finished
+        value = cache.get('catalog', lambda: 'second')
+
+        # Then: a new refresh should run
+        assert value == 'second'
+
+    def test_should_release_lock_when_refresh_fails(self, tmp_path):
+        """Should release lock when refresh fails."""
+        # Given: a refresh that fails
+        cache = CatalogCache(tmp_path)
+
+        def fail():
+            raise RuntimeError('upstream down')
+
+        # When: getting the value
+        with pytest.raises(RuntimeError):
+            cache.get('catalog', fail)
+
+        # Then: nothing should be published and the lock should be free
+        assert cache.read('catalog') is None
+        lock = FileLock(tmp_path / 'catalog.lock')
+        assert lock.try_acquire()
+        lock.release()
+
+    def test_should_refresh_without_lock_after_wait_timeout(self, tmp_path):
+        """Should refresh without lock after wait timeout."""
+        # Given: a lock held by a hung owner
+        lock = FileLock(tmp_path / 'catalog.lock')
+        assert lock.try_acquire()
+        cache = CatalogCache(tmp_path, wait_timeout=0.1, poll_interval=0.01)
+
+        # When: getting the value
+        value = cache.get('catalog', lambda: 'fallback')
+        lock.release()
+
+        # Then: the waiter should refresh on its own
+        assert value == 'fallback'
+
+    def test_should_ignore_corrupt_cache_file(self, tmp_path):
+        """Should ignore corrupt cache file."""
+        # Given: a corrupt cache file
+        cache = CatalogCache(tmp_path, max_age=60)
+        (tmp_path / 'catalog.json').write_text('{not json')
+
+        # When: getting the value
+        value = cache.get('catalog', lambda: 'fresh')
+
+        # Then: it should be refreshed
+        assert value == 'fresh'
+
+
+class TestGetMany:
+    """Test suite for CatalogCache.get_many."""
+
+    def test_should_not_publish_failed_values(self, tmp_path):
+        """Should not publish failed values."""
+        # Given: a refresh where one name fails
+        cache = CatalogCache(tmp_path, max_age=60)
+        error = ValueError('HTTP 500')
+
+        # When: getting both names, then again after the upstream recovered
+        first = cache.get_many(['tcp', 'udp'], lambda names: {'tcp': 'tcp servers', 'udp': error})
+        calls = []
+
+        def recovered(names):
+            calls.append(names)
+            return {name: f"{name} servers" for name in names}
+
+        second = cache.get_many(['tcp', 'udp'], recovered)
+
+        # Then: the failure should be returned once and only that name refreshed again
+        assert first == {'tcp': 'tcp servers', 'udp': error}
+        assert calls == [['udp']]
+        assert second == {'tcp': 'tcp servers', 'udp': 'udp servers'}
+
+    def test_should_refresh_only_names_whose_lock_it_holds(self, tmp_path):
+        """Should refresh only names whose lock it holds."""
+        # Given: another process refreshing the second name
+        lock = FileLock(tmp_path / 'b.lock')
+        assert lock.try_acquire()
+        cache = CatalogCache(tmp_path, wait_timeout=0.2, poll_interval=0.01)
+        calls = []
+
+        def refresh(names):
+            calls.append(names)
+            return {name: name.upper() for name in names}
+
+        # When: getting both names
+        values = cache.get_many(['b', 'a'], refresh)
+        lock.release()
+
+        # Then: the free name is refreshed first, the held one only after the wait timeout
+        assert calls == [['a'], ['b']]
+        assert values == {'a': 'A', 'b': 'B'}
+
+
+class TestSingleFlightAcrossProcesses:
+    """Test suite for single-flight refreshes across processes."""
+
+    def test_should_fetch_each_protocol_once_for_concurrent_processes(self, tmp_path):
+        """Should fetch each protocol once for concurrent processes."""
+        # Given: a slow upstream and several processes starting together
+        processes_count = 4
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(processes_count)
+        results = context.Queue()
+
+        with FakeUpstream(make_servers(10), latency=0.5) as upstream:
+            processes = [
+                context.Process(
+                    target=fetch_in_process,
+                    args=(upstream.url, upstream.referer_url, str(tmp_path), barrier, results),
+                )
+                for _ in range(processes_count)
+            ]
+            for process in processes:
+                process.start()
+
+            # When: every process fetches all protocols through the cache
+            fetched = [results.get(timeout=60) for _ in processes]
+            for process in processes:
+                process.join(timeout=30)
+
+            # Then: upstream should see one warmup and one POST per protocol
+            assert [upstream.protocol_count(p) for p in ('tcp', 'udp', 'ikev2')] == [1, 1, 1]
+            assert upstream.requests.count(('GET', None)) == 1
+
+        # And: every process should get the same catalog
+        assert all(servers == make_servers(10) for servers in fetched)
+
+    def test_should_share_protocols_between_callers_asking_for_different_sets(self, tmp_path):
+        """Should share protocols between callers asking for different sets."""
+        # Given: a slow upstream, and processes wanting udp only or every protocol
+        protocol_sets = [['udp'], ['tcp', 'udp', 'ikev2'], ['udp'], ['tcp', 'udp', 'ikev2']]
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(len(protocol_sets))
+        results = context.Queue()
+
+        with FakeUpstream(make_servers(10), latency=0.5) as upstream:
+            processes = [
+                context.Process(
+                    target=fetch_catalog_in_process,
+                    args=(upstream.url, upstream.referer_url, str(tmp_path), barrier, results, protocols),
+                )
+                for protocols in protocol_sets
+            ]
+            for process in processes:
+                process.start()
+
+            # When: they all start together
+            catalogs = [results.get(timeout=60) for _ in processes]
+            for process in processes:
+                process.join(timeout=30)
+
+            # Then: each protocol should still be fetched once
+            assert [upstream.protocol_count(p) for p in ('tcp', 'udp', 'ikev2')] == [1, 1, 1]
+
+        assert all(catalog['errors'] == {} for catalog in catalogs)
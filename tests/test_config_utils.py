@@ -1,6 +1,6 @@
 """Unit tests for config_utils module."""
 import pytest
-from utils.config_utils import generate_config
+from utils.config_utils import compile_template, generate_config, set_allowed_ips
 
 
 class TestGenerateConfig:
@@ -168,3 +168,53 @@ Endpoint = old-server.com:51820"""
         assert result_line_count == original_line_count
 # Test package
 
+
+
+class TestSetAllowedIps:
+    """Test suite for set_allowed_ips function."""
+
+    def test_should_replace_allowed_ips_line_when_networks_given(self):
+        """Should replace allowed ips line when networks given."""
+        # Given: a template with a full tunnel
+        template = "[Peer]\nAllowedIPs = 0.0.0.0/0\nEndpoint = hostname.com"
+
+        # When: setting split tunnel networks
+        result = set_allowed_ips(template, ['0.0.0.0/5', '8.0.0.0/7'])
+
+        # Then: only the AllowedIPs line should change
+        assert result == "[Peer]\nAllowedIPs = 0.0.0.0/5, 8.0.0.0/7\nEndpoint = hostname.com"
+
+    def test_should_keep_endpoint_replacement_working_after_setting_allowed_ips(self):
+        """Should keep endpoint replacement working after setting allowed ips."""
+        # Given: a template with split tunnel networks applied
+        template = set_allowed_ips("AllowedIPs = 0.0.0.0/0\nEndpoint = hostname.com", ['10.0.0.0/8'])
+
+        # When: generating a config from it
+        result = generate_config(template, {'hostname': 'us-01.jumptoserver.com'})
+
+        # Then: both lines should be set
+        assert result == "AllowedIPs = 10.0.0.0/8\nEndpoint = us-01.jumptoserver.com:51820"
+
+
+class TestCompileTemplate:
+    """Test suite for compile_template function."""
+
+    def test_should_join_to_generated_config(self):
+        """Should join to generated config."""
+        # Given: a compiled template
+        template = "[Peer]\nAllowedIPs = 0.0.0.0/0\nEndpoint = ca-01.jumptoserver.com:51820\n"
+        parts = compile_template(template)
+
+        # When: joining the parts with a hostname
+        result = 'us-01.jumptoserver.com'.join(parts)
+
+        # Then: it should equal the generated config
+        assert result == generate_config(template, {'hostname': 'us-01.jumptoserver.com'})
+
+    def test_should_return_whole_template_when_no_endpoint(self):
+        """Should return whole template when no endpoint."""
+        # Given/When: compiling a template without an Endpoint line
+        parts = compile_template("[Interface]\nAddress = 10.0.0.2/32")
+
+        # Then: there should be no slot
+        assert parts == ["[Interface]\nAddress = 10.0.0.2/32"]
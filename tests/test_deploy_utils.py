@@ -0,0 +1,211 @@
+"""Unit tests for deploy_utils module against local ubus stand-ins."""
+import json
+import time
+import pytest
+from tests.fake_ubus import ActivityTracker, FakeRouter
+from utils.deploy_utils import (
+    UbusClient, UbusError, deploy_router, deploy_routers, load_configs, load_routers, select_configs, summarize,
+)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Provide a directory with three generated configs."""
+    directory = tmp_path / 'output'
+    directory.mkdir()
+    for name in ('es-01', 'uk-london', 'uk-london-stream'):
+        (directory / f"{name}.conf").write_text(f"Endpoint = {name}.jumptoserver.com:51820\n")
+    return directory
+
+
+def router_entry(router, name='router', **extra):
+    """Build an inventory entry for a fake router."""
+    return {'name': name, 'url': router.url, 'username': 'root', 'password': 'secret', **extra}
+
+
+class TestUbusClient:
+    """Test suite for UbusClient class."""
+
+    def test_should_login_and_write_then_report_md5(self):
+        """Should login and write then report md5."""
+        # Given: a router and a logged in client
+        with FakeRouter() as router, UbusClient(router.url, 'root', 'secret') as client:
+            client.login()
+
+            # When: writing a file
+            client.write('/etc/wireguard/a.conf', 'A')
+
+            # Then: its MD5 should be reported and missing files give None
+            assert client.md5('/etc/wireguard/a.conf') == '7fc56270e7a70fa81a5935b72eacbe29'
+            assert client.md5('/etc/wireguard/missing.conf') is None
+
+    def test_should_raise_ubus_error_when_password_wrong(self):
+        """Should raise ubus error when password wrong."""
+        # Given: a client with a wrong password
+        with FakeRouter() as router, UbusClient(router.url, 'root', 'wrong') as client:
+            # When/Then: login fails with the ubus status
+            with pytest.raises(UbusError) as error:
+                client.login()
+            assert error.value.code == 6
+
+    def test_should_reuse_one_connection_for_all_calls(self):
+        """Should reuse one connection for all calls."""
+        # Given: a logged in client
+        with FakeRouter() as router, UbusClient(router.url, 'root', 'secret') as client:
+            client.login()
+
+            # When: making several calls
+            for i in range(5):
+                client.write(f"/tmp/{i}.conf", str(i))
+
+            # Then: a single keep-alive connection should be used
+            assert router.connections == 1
+
+
+class TestLoadRouters:
+    """Test suite for load_routers function."""
+
+    def test_should_resolve_password_from_environment(self, tmp_path, monkeypatch):
+        """Should resolve password from environment."""
+        # Given: an inventory referring to an environment variable
+        monkeypatch.setenv('ROUTER_PASSWORD', 'from-env')
+        path = tmp_path / 'routers.json'
+        path.write_text(json.dumps([{'name': 'a', 'url': 'http://a', 'username': 'root',
+                                     'password_env': 'ROUTER_PASSWORD'}]))
+
+        # When: loading routers
+        routers = load_routers(path)
+
+        # Then: the password should be read from the environment
+        assert routers[0]['password'] == 'from-env'
+
+    def test_should_raise_value_error_when_keys_missing(self, tmp_path):
+        """Should raise value error when keys missing."""
+        # Given: an entry without url
+        path = tmp_path / 'routers.json'
+        path.write_text(json.dumps([{'name': 'a', 'username': 'root', 'password': 'x'}]))
+
+        # When/Then: loading fails
+        with pytest.raises(ValueError, match='missing: url'):
+            load_routers(path)
+
+
+class TestSelectConfigs:
+    """Test suite for select_configs function."""
+
+    def test_should_select_configs_matching_patterns(self, config_dir):
+        """Should select configs matching patterns."""
+        # Given: all configs loaded
+        configs = load_configs(config_dir)
+
+        # When: selecting UK configs
+        result = select_configs(configs, ['uk-*'])
+
+        # Then: only UK configs should be selected
+        assert sorted(result) == ['uk-london-stream.conf', 'uk-london.conf']
+
+
+class TestDeployRouter:
+    """Test suite for deploy_router function."""
+
+    def test_should_push_new_configs_then_skip_unchanged(self, config_dir):
+        """Should push new configs then skip unchanged."""
+        # Given: an empty router
+        configs = load_configs(config_dir)
+        with FakeRouter() as router:
+            # When: deploying twice, with one config changed in between
+            first = deploy_router(router_entry(router), configs)
+            configs['es-01.conf'] = ('changed', 'not-a-real-md5')
+            second = deploy_router(router_entry(router), configs)
+
+        # Then: everything is pushed first, and only the change the second time
+        assert sorted(first['pushed']) == ['es-01.conf', 'uk-london-stream.conf', 'uk-london.conf']
+        assert second['pushed'] == ['es-01.conf']
+        assert sorted(second['unchanged']) == ['uk-london-stream.conf', 'uk-london.conf']
+        assert router.files['/etc/wireguard/es-01.conf'] == 'changed'
+
+    def test_should_write_configs_readable_by_owner_only(self, config_dir):
+        """Should write configs readable by owner only."""
+        # Given: an empty router
+        with FakeRouter() as router:
+            # When: deploying the configs
+            deploy_router(router_entry(router), load_configs(config_dir))
+
+        # Then: every file should be created with mode 0600, keeping the private key private
+        assert len(router.modes) == 3
+        assert set(router.modes.values()) == {0o600}
+
+    def test_should_not_write_when_dry_run(self, config_dir):
+        """Should not write when dry run."""
+        # Given: an empty router
+        with FakeRouter() as router:
+            # When: deploying in dry-run mode
+            report = deploy_router(router_entry(router), load_configs(config_dir), dry_run=True)
+
+        # Then: configs are reported but not written
+        assert len(report['pushed']) == 3
+        assert 'file.write' not in router.calls
+
+    def test_should_report_failed_writes_per_file(self, config_dir):
+        """Should report failed writes per file."""
+        # Given: a router denying writes
+        with FakeRouter(fail_writes=True) as router:
+            # When: deploying
+            report = deploy_router(router_entry(router, configs=['es-*']), load_configs(config_dir))
+
+        # Then: the file should be reported as failed
+        assert list(report['failed']) == ['es-01.conf']
+        assert report['error'] is None
+
+    def test_should_report_router_error_when_unreachable(self, config_dir):
+        """Should report router error when unreachable."""
+        # Given: a router answering HTTP 500
+        with FakeRouter(broken=True) as router:
+            # When: deploying
+            report = deploy_router(router_entry(router), load_configs(config_dir))
+
+        # Then: the router error should be reported
+        assert '500' in report['error']
+        assert report['pushed'] == []
+
+
+class TestDeployRouters:
+    """Test suite for deploy_routers function."""
+
+    def test_should_deploy_slow_routers_concurrently_within_bound(self, config_dir):
+        """Should deploy slow routers concurrently within bound."""
+        # Given: six slow routers sharing an activity tracker
+        tracker = ActivityTracker()
+        routers = [FakeRouter(delay=0.05, tracker=tracker).start() for _ in range(6)]
+        try:
+            inventory = [router_entry(r, name=f"r{i}") for i, r in enumerate(routers)]
+
+            # When: deploying with at most three routers in flight
+            started = time.monotonic()
+            reports = deploy_routers(inventory, config_dir, max_workers=3)
+            elapsed = time.monotonic() - started
+        finally:
+            for router in routers:
+                router.stop()
+
+        # Then: reports keep inventory order, and concurrency stays bounded
+        assert [r['router'] for r in reports] == [f"r{i}" for i in range(6)]
+        assert tracker.peak == 3
+        # 7 calls per router take 0.35s, so six routers in series would take 2.1s
+        assert elapsed < 1.5
+
+    def test_should_isolate_failing_router_and_summarize(self, config_dir):
+        """Should isolate failing router and summarize."""
+        # Given: a healthy and a broken router
+        with FakeRouter() as healthy, FakeRouter(broken=True) as broken:
+            inventory = [router_entry(healthy, name='healthy'), router_entry(broken, name='broken')]
+            seen = []
+
+            # When: deploying to both
+            reports = deploy_routers(inventory, config_dir, on_report=lambda r: seen.append(r['router']))
+
+        # Then: the healthy router is deployed and totals reflect the failure
+        assert sorted(seen) == ['broken', 'healthy']
+        assert summarize(reports) == {
+            'routers': 2, 'routers_failed': 1, 'pushed': 3, 'unchanged': 0, 'failed': 0,
+        }
@@ -0,0 +1,172 @@
+"""Unit tests for encoding_utils module."""
+import gzip
+import sys
+import zlib
+import pytest
+from utils.encoding_utils import (
+    BodyDecoder, accept_encoding, content_charset, decodable_encodings, make_decoder, summarize_transfers,
+)
+
+TEXT = 'Ελλάδα – Zürich – 東京\n' * 200
+
+
+def compress(encoding, data):
+    if encoding == 'gzip':
+        return gzip.compress(data)
+    if encoding == 'deflate':
+        return zlib.compress(data)
+    if encoding == 'br':
+        try:
+            import brotli
+        except ImportError:
+            brotli = pytest.importorskip('brotlicffi')
+        return brotli.compress(data)
+    zstd = pytest.importorskip('zstandard')
+    return zstd.compress(data)
+
+
+def feed_in_pieces(decoder, data, size=7):
+    return ''.join(decoder.feed(data[i:i + size]) for i in range(0, len(data), size)) + decoder.finish()
+
+
+class TestNegotiation:
+    """Test suite for accept_encoding and decodable_encodings."""
+
+    def test_should_always_offer_zlib_encodings(self, monkeypatch):
+        """Should always offer zlib encodings."""
+        # Given: no brotli or zstd module is installed
+        for name in ('brotli', 'brotlicffi', 'zstandard', 'compression.zstd'):
+            monkeypatch.setitem(sys.modules, name, None)
+
+        # When/Then: only gzip and deflate should be offered
+        assert decodable_encodings() == ['gzip', 'deflate']
+        assert accept_encoding() == 'gzip, deflate'
+
+    def test_should_offer_br_when_either_brotli_module_installed(self, monkeypatch):
+        """Should offer br when either brotli module installed."""
+        # Given: only brotlicffi is available
+        pytest.importorskip('brotlicffi')
+        monkeypatch.setitem(sys.modules, 'brotli', None)
+
+        # When/Then: br should be offered
+        assert 'br' in decodable_encodings()
+
+    def test_should_raise_for_encoding_without_module(self, monkeypatch):
+        """Should raise for encoding without module."""
+        # Given: no zstd module is installed
+        for name in ('zstandard', 'compression.zstd'):
+            monkeypatch.setitem(sys.modules, name, None)
+
+        # When/Then: a zstd decoder cannot be made
+        with pytest.raises(ValueError, match="Unsupported Content-Encoding 'zstd'"):
+            make_decoder('zstd')
+
+    def test_should_raise_for_unknown_encoding(self):
+        """Should raise for unknown encoding."""
+        # Given/When/Then: an unknown encoding is rejected
+        with pytest.raises(ValueError, match="Unsupported Content-Encoding 'compress'"):
+            BodyDecoder('compress')
+
+
+class TestBodyDecoder:
+    """Test suite for BodyDecoder class."""
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'deflate', 'br', 'zstd'])
+    def test_should_decode_body_fed_in_small_pieces(self, encoding):
+        """Should decode body fed in small pieces."""
+        # Given: a compressed UTF-8 body and a decoder for it
+        data = compress(encoding, TEXT.encode())
+        if encoding not in decodable_encodings():
+            pytest.skip(f"no {encoding} module installed")
+        decoder = BodyDecoder(encoding.upper())
+
+        # When: feeding it a few bytes at a time, splitting characters
+        text = feed_in_pieces(decoder, data)
+
+        # Then: the text and both byte counts should be exact
+        assert text == TEXT
+        assert decoder.wire_bytes == len(data)
+        assert decoder.body_bytes == len(TEXT.encode())
+        assert decoder.encoding == encoding
+
+    def test_should_decode_raw_deflate(self):
+        """Should decode raw deflate."""
+        # Given: a deflate body without the zlib header
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = compressor.compress(TEXT.encode()) + compressor.flush()
+
+        # When: decoding it
+        text = feed_in_pieces(BodyDecoder('deflate'), data)
+
+        # Then: the text should be restored
+        assert text == TEXT
+
+    def test_should_undo_stacked_encodings_in_reverse_order(self):
+        """Should undo stacked encodings in reverse order."""
+        # Given: a body deflated and then gzipped
+        data = gzip.compress(zlib.compress(TEXT.encode()))
+
+        # When: decoding it
+        decoder = BodyDecoder('deflate, gzip')
+        text = feed_in_pieces(decoder, data)
+
+        # Then: both layers should be removed
+        assert text == TEXT
+        assert decoder.encoding == 'deflate, gzip'
+
+    def test_should_pass_identity_through_with_charset(self):
+        """Should pass identity through with charset."""
+        # Given: an uncompressed latin-1 body
+        data = 'Zürich'.encode('latin-1')
+
+        # When: decoding it with its charset
+        decoder = BodyDecoder(None, 'iso-8859-1')
+        text = feed_in_pieces(decoder, data, size=1)
+
+        # Then: the text should be decoded and both counts match
+        assert text == 'Zürich'
+        assert decoder.encoding == 'identity'
+        assert decoder.wire_bytes == decoder.body_bytes == len(data)
+
+    def test_should_return_transfer_record(self):
+        """Should return transfer record."""
+        # Given: a decoder that decoded a gzip body
+        decoder = BodyDecoder('gzip')
+        feed_in_pieces(decoder, gzip.compress(b'abc'))
+
+        # When: recording the transfer
+        record = decoder.record('POST', 'http://example/')
+
+        # Then: it should hold the request and byte counts
+        assert record == {
+            'method': 'POST', 'url': 'http://example/', 'encoding': 'gzip',
+            'wire_bytes': len(gzip.compress(b'abc')), 'body_bytes': 3,
+        }
+
+
+class TestHelpers:
+    """Test suite for content_charset and summarize_transfers."""
+
+    @pytest.mark.parametrize('content_type,expected', [
+        ('text/html; charset=ISO-8859-1', 'ISO-8859-1'),
+        ('text/html; charset="utf-8"', 'utf-8'),
+        ('text/html', 'utf-8'),
+        (None, 'utf-8'),
+    ])
+    def test_should_parse_charset(self, content_type, expected):
+        """Should parse charset."""
+        # Given/When/Then: the charset parameter is returned, or UTF-8
+        assert content_charset(content_type) == expected
+
+    def test_should_sum_transfers(self):
+        """Should sum transfers."""
+        # Given: two transfer records
+        transfers = [{'wire_bytes': 10, 'body_bytes': 40}, {'wire_bytes': 30, 'body_bytes': 60}]
+
+        # When/Then: totals and the compression ratio are returned
+        assert summarize_transfers(transfers) == {'requests': 2, 'wire_bytes': 40, 'body_bytes': 100, 'ratio': 0.4}
+
+    def test_should_use_ratio_one_without_body(self):
+        """Should use ratio one without body."""
+        # Given/When/Then: no transfers give a neutral ratio
+        assert summarize_transfers([])['ratio'] == 1.0
@@ -0,0 +1,237 @@
+"""Tests for fetch_vpn_servers and fetch_all_protocols against a local stand-in."""
+import io
+import sys
+import pytest
+import fetch_vpn_servers
+from fetch_all_protocols import fetch_all_protocols, iter_all_protocols
+from tests.fake_upstream import FakeUpstream, make_servers
+from utils.cache_utils import CatalogCache
+from utils.filter_utils import ServerFilter
+from utils.output_utils import Output
+from utils.transport_utils import UrllibTransport
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Provide a running stand-in with the module URLs pointed at it."""
+    servers = {
+        'tcp': make_servers(3),
+        'udp': make_servers(5),
+        'ikev2': make_servers(2),
+    }
+    with FakeUpstream(servers) as upstream:
+        monkeypatch.setattr(fetch_vpn_servers, 'url', upstream.url)
+        monkeypatch.setattr(fetch_vpn_servers, 'referer_url', upstream.referer_url)
+        yield upstream
+
+
+class TestFetchVpnServers:
+    """Test suite for fetch_vpn_servers function."""
+
+    def test_should_parse_servers_when_fetching_protocol(self, upstream):
+        """Should parse servers when fetching protocol."""
+        # Given: a stand-in serving five udp servers
+        # When: fetching udp servers
+        servers = fetch_vpn_servers.fetch_vpn_servers('udp')
+
+        # Then: all rows should be parsed into server dicts
+        assert servers == make_servers(5)
+
+    def test_should_warm_up_before_posting_when_no_transport_given(self, upstream):
+        """Should warm up before posting when no transport given."""
+        # Given/When: fetching without a transport
+        fetch_vpn_servers.fetch_vpn_servers('tcp')
+
+        # Then: a warmup GET should precede the POST
+        assert upstream.requests == [('GET', None), ('POST', 'tcp')]
+
+    def test_should_yield_servers_lazily_when_iterating(self, upstream):
+        """Should yield servers lazily when iterating."""
+        # Given: a server iterator for udp
+        servers = fetch_vpn_servers.iter_vpn_servers('udp')
+
+        # When: taking the first server
+        first = next(servers)
+        servers.close()
+
+        # Then: it should be the first table row
+        assert first == make_servers(5)[0]
+
+    def test_should_raise_value_error_when_protocol_invalid(self):
+        """Should raise value error when protocol invalid."""
+        # Given/When/Then: an invalid protocol is rejected before any request
+        with pytest.raises(ValueError, match="Invalid protocol 'ftp'"):
+            fetch_vpn_servers.fetch_vpn_servers('ftp')
+
+
+class TestServerTableParser:
+    """Test suite for the incremental standard-library row parser."""
+
+    DOCUMENT = (
+        '<table><tr><th>Country</th></tr>'
+        '<tr><td> United &amp; Kingdom </td><td>Lon<b>don</b></td><td>uk-london.jumptoserver.com</td></tr>'
+        '<tr>\n<td>\n Spain\n</td><td></td><td>es-01.jumptoserver.com</td></tr>'
+        '<tr><td>only one cell</td></tr></table>'
+    )
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 10000])
+    def test_should_match_beautifulsoup_for_any_chunking(self, chunk_size):
+        """Should match beautifulsoup for any chunking."""
+        pytest.importorskip('bs4')
+        # Given: the document split into chunks
+        chunks = (self.DOCUMENT[i:i + chunk_size] for i in range(0, len(self.DOCUMENT), chunk_size))
+
+        # When: parsing the chunks incrementally
+        servers = list(fetch_vpn_servers.iter_servers(chunks))
+
+        # Then: the servers should equal the BeautifulSoup result
+        assert servers == list(fetch_vpn_servers.iter_servers(self.DOCUMENT))
+        assert servers[0] == {'country': 'United & Kingdom', 'city': 'London', 'hostname': 'uk-london.jumptoserver.com'}
+
+    def test_should_parse_text_without_beautifulsoup(self, monkeypatch):
+        """Should parse text without beautifulsoup."""
+        # Given: BeautifulSoup is not installed
+        monkeypatch.setitem(sys.modules, 'bs4', None)
+
+        # When: parsing a response text
+        servers = fetch_vpn_servers.parse_servers(self.DOCUMENT)
+
+        # Then: the standard-library parser should be used
+        assert [s['hostname'] for s in servers] == ['uk-london.jumptoserver.com', 'es-01.jumptoserver.com']
+
+    def test_should_yield_rows_while_chunks_arrive(self):
+        """Should yield rows while chunks arrive."""
+        # Given: chunks recording how many were consumed
+        consumed = []
+
+        def chunks():
+            for i, chunk in enumerate(['<table><tr><td>a</td><td>b</td><td>c</td></tr>', '<tr>', '</table>']):
+                consumed.append(i)
+                yield chunk
+
+        # When: taking the first row
+        first = next(fetch_vpn_servers.iter_table_rows(chunks()))
+
+        # Then: only the first chunk should have been read
+        assert first == ['a', 'b', 'c']
+        assert consumed == [0]
+
+
+class TestUrllibTransportFetch:
+    """Test suite for fetching through the standard-library transport."""
+
+    def test_should_fetch_all_protocols_with_streaming_transport(self, upstream):
+        """Should fetch all protocols with streaming transport."""
+        # Given: a urllib transport
+        with UrllibTransport() as transport:
+            # When: fetching all protocols
+            servers = fetch_all_protocols(Output(stream=io.StringIO()), transport)
+
+        # Then: the result should match the other transports
+        assert servers == make_servers(5)
+        assert upstream.requests.count(('GET', None)) == 1
+
+    def test_should_report_error_for_failed_protocol(self, upstream):
+        """Should report error for failed protocol."""
+        # Given: a stand-in without ikev2 servers
+        del upstream.servers['ikev2']
+        output = Output(stream=io.StringIO())
+
+        # When: fetching all protocols
+        with UrllibTransport() as transport:
+            servers = fetch_all_protocols(output, transport)
+        output.flush()
+
+        # Then: the other protocols should still be returned
+        assert servers == make_servers(5)
+        assert 'Error fetching ikev2 servers' in output.stream.getvalue()
+
+
+class TestFetchAllProtocols:
+    """Test suite for fetch_all_protocols function."""
+
+    def test_should_warm_up_once_and_post_each_protocol_once(self, upstream):
+        """Should warm up once and post each protocol once."""
+        # Given/When: fetching all protocols
+        fetch_all_protocols(Output(stream=io.StringIO()))
+
+        # Then: one warmup and one POST per protocol should reach upstream
+        assert sorted(upstream.requests, key=str) == sorted(
+            [('GET', None), ('POST', 'tcp'), ('POST', 'udp'), ('POST', 'ikev2')], key=str
+        )
+
+    def test_should_deduplicate_servers_by_hostname(self, upstream):
+        """Should deduplicate servers by hostname."""
+        # Given/When: fetching protocols with overlapping server lists
+        servers = fetch_all_protocols(Output(stream=io.StringIO()))
+
+        # Then: each hostname should appear once
+        assert servers == make_servers(5)
+
+    def test_should_yield_same_servers_as_fetch_when_iterating(self, upstream):
+        """Should yield same servers as fetch when iterating."""
+        # Given/When: iterating all protocols
+        servers = list(iter_all_protocols(Output(stream=io.StringIO())))
+
+        # Then: the result should match the deduplicated list
+        assert servers == make_servers(5)
+
+    def test_should_not_fetch_protocols_excluded_by_filter(self, upstream):
+        """Should not fetch protocols excluded by filter."""
+        # Given: a filter limited to tcp
+        server_filter = ServerFilter(protocols=['tcp'])
+
+        # When: fetching all protocols
+        servers = fetch_all_protocols(Output(stream=io.StringIO()), server_filter=server_filter)
+
+        # Then: only tcp should be requested
+        assert servers == make_servers(3)
+        assert upstream.requests == [('GET', None), ('POST', 'tcp')]
+
+    def test_should_prune_rows_in_parser_and_report_count(self, upstream):
+        """Should prune rows in parser and report count."""
+        # Given: a country filter and an output capturing events
+        server_filter = ServerFilter(countries=['Germany'])
+        output = Output(stream=io.StringIO())
+
+        # When: fetching all protocols
+        servers = fetch_all_protocols(output, server_filter=server_filter)
+
+        # Then: only German servers remain and pruned rows are reported
+        assert servers == [s for s in make_servers(5) if s['country'] == 'Germany']
+        assert server_filter.pruned == 8
+        assert f"Rows pruned by filters: {server_filter.pruned}" in output.stream.getvalue()
+
+
+class TestCachedCatalog:
+    """Test suite for cached_catalog function."""
+
+    def test_should_fetch_failed_protocol_again_after_upstream_recovers(self, upstream, tmp_path):
+        """Should fetch failed protocol again after upstream recovers."""
+        # Given: an upstream failing for udp and a cache reusing hour-old catalogs
+        udp_servers = upstream.servers.pop('udp')
+        cache = CatalogCache(tmp_path, max_age=3600)
+        first = fetch_vpn_servers.cached_catalog(['tcp', 'udp'], cache)
+
+        # When: the upstream recovers and the catalog is requested again
+        upstream.servers['udp'] = udp_servers
+        second = fetch_vpn_servers.cached_catalog(['tcp', 'udp'], cache)
+
+        # Then: the failure should not have been cached, unlike the tcp servers
+        assert list(first['errors']) == ['udp']
+        assert second == {'servers': {'tcp': make_servers(3), 'udp': make_servers(5)}, 'errors': {}}
+        assert upstream.protocol_count('udp') == 2
+        assert upstream.protocol_count('tcp') == 1
+
+    def test_should_not_publish_empty_server_list(self, upstream, tmp_path):
+        """Should not publish empty server list."""
+        # Given: an upstream returning an empty udp table
+        upstream.servers['udp'] = []
+        cache = CatalogCache(tmp_path, max_age=3600)
+
+        # When: fetching the catalog
+        catalog = fetch_vpn_servers.cached_catalog(['udp'], cache)
+
+        # Then: it should be reported as an error and not cached
+        assert catalog['errors'] == {'udp': 'No udp servers found'}
+        assert cache.read(fetch_vpn_servers.cache_name('udp')) is None
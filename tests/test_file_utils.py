@@ -0,0 +1,53 @@
+"""Unit tests for file_utils module."""
+import os
+import pytest
+from utils.file_utils import atomic_write
+
+
+class TestAtomicWrite:
+    """Test suite for atomic_write function."""
+
+    def test_should_replace_file_on_success(self, tmp_path):
+        """Should replace file on success."""
+        # Given: an existing file
+        path = tmp_path / 'catalog.json'
+        path.write_text('old')
+
+        # When: writing it atomically
+        with atomic_write(path) as f:
+            f.write('new')
+
+        # Then: it should hold the new content and no temporary file remain
+        assert path.read_text() == 'new'
+        assert os.listdir(tmp_path) == ['catalog.json']
+
+    def test_should_keep_old_file_and_remove_temporary_on_error(self, tmp_path):
+        """Should keep old file and remove temporary on error."""
+        # Given: an existing file
+        path = tmp_path / 'catalog.json'
+        path.write_text('old')
+
+        # When: the write fails halfway
+        with pytest.raises(RuntimeError):
+            with atomic_write(path) as f:
+                f.write('partial')
+                raise RuntimeError('disk full')
+
+        # Then: the old content should be intact and nothing left behind
+        assert path.read_text() == 'old'
+        assert os.listdir(tmp_path) == ['catalog.json']
+
+    def test_should_give_concurrent_writers_their_own_temporary_file(self, tmp_path):
+        """Should give concurrent writers their own temporary file."""
+        # Given: two writers of the same file open at once
+        path = tmp_path / 'history.npz'
+        with atomic_write(path, 'wb') as first:
+            with atomic_write(path, 'wb') as second:
+                # When/Then: each writes to a separate temporary file
+                assert len([name for name in os.listdir(tmp_path) if name.endswith('.tmp')]) == 2
+                first.write(b'first')
+                second.write(b'second')
+
+        # And: the last writer to finish wins, with no partial mix
+        assert path.read_bytes() == b'first'
+        assert os.listdir(tmp_path) == ['history.npz']
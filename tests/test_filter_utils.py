@@ -0,0 +1,131 @@
+"""Unit tests for filter_utils module."""
+import argparse
+import pytest
+from utils.filter_utils import ServerFilter, add_filter_arguments, filter_from_args, filter_servers
+
+
+class TestServerFilter:
+    """Test suite for ServerFilter class."""
+
+    def test_should_accept_everything_when_no_criteria(self):
+        """Should accept everything when no criteria."""
+        # Given: a filter without criteria
+        server_filter = ServerFilter()
+
+        # When/Then: any row is accepted and nothing is pruned
+        assert server_filter.accepts('Spain', '', 'es-01.jumptoserver.com')
+        assert server_filter.pruned == 0
+        assert not server_filter.filters_rows
+
+    def test_should_match_country_case_insensitively(self):
+        """Should match country case insensitively."""
+        # Given: a country filter
+        server_filter = ServerFilter(countries=['united kingdom'])
+
+        # When/Then: matching and non-matching countries
+        assert server_filter.accepts('United Kingdom', 'London', 'uk-london.jumptoserver.com')
+        assert not server_filter.accepts('Spain', '', 'es-01.jumptoserver.com')
+        assert server_filter.pruned == 1
+
+    def test_should_match_city_regex(self):
+        """Should match city regex."""
+        # Given: a city regex filter
+        server_filter = ServerFilter(city='^(london|manchester)$')
+
+        # When/Then: the regex is searched case-insensitively
+        assert server_filter.accepts('United Kingdom', 'London', 'uk-london.jumptoserver.com')
+        assert not server_filter.accepts('United Kingdom', 'Glasgow', 'uk-glasgow.jumptoserver.com')
+
+    @pytest.mark.parametrize("tags,hostname,expected", [
+        (['stream'], 'uk-london-stream.jumptoserver.com', True),
+        (['stream'], 'uk-london.jumptoserver.com', False),
+        (['uk', 'stream'], 'uk-stream.jumptoserver.com', True),
+        (['uk', 'stream'], 'us-stream.jumptoserver.com', False),
+        (['p2p'], 'nl-amsterdam-01-p2p.jumptoserver.com', True),
+        (['jumptoserver'], 'us-01.jumptoserver.com', False),
+    ])
+    def test_should_require_every_tag_in_hostname_prefix(self, tags, hostname, expected):
+        """Should require every tag in hostname prefix."""
+        # Given: a tag filter
+        server_filter = ServerFilter(tags=tags)
+
+        # When: checking a hostname
+        result = server_filter.accepts('Country', 'City', hostname)
+
+        # Then: all tags must be dash-separated parts of the prefix
+        assert result == expected
+
+    def test_should_limit_protocols_to_fetch(self):
+        """Should limit protocols to fetch."""
+        # Given: a protocol filter
+        server_filter = ServerFilter(protocols=['udp'])
+
+        # When: selecting protocols to fetch
+        result = server_filter.protocols_to_fetch(['tcp', 'udp', 'ikev2'])
+
+        # Then: only matching protocols should be fetched
+        assert result == ['udp']
+
+    def test_should_fetch_all_protocols_when_not_limited(self):
+        """Should fetch all protocols when not limited."""
+        # Given/When/Then: no protocol filter keeps all protocols
+        assert ServerFilter().protocols_to_fetch(['tcp', 'udp']) == ['tcp', 'udp']
+
+
+class TestFilterServers:
+    """Test suite for filter_servers function."""
+
+    def test_should_yield_accepted_servers_and_count_pruned(self):
+        """Should yield accepted servers and count pruned."""
+        # Given: servers and a country filter
+        servers = [
+            {'country': 'Spain', 'city': '', 'hostname': 'es-01.jumptoserver.com'},
+            {'country': 'Brazil', 'city': '', 'hostname': 'br-01.jumptoserver.com'},
+        ]
+        server_filter = ServerFilter(countries=['Brazil'])
+
+        # When: filtering
+        result = list(filter_servers(servers, server_filter))
+
+        # Then: only Brazil should remain
+        assert result == servers[1:]
+        assert server_filter.pruned == 1
+
+
+class TestFilterArguments:
+    """Test suite for filter argument helpers."""
+
+    @pytest.fixture
+    def parser(self):
+        """Provide a parser with the filter options."""
+        parser = argparse.ArgumentParser()
+        add_filter_arguments(parser, protocols=['tcp', 'udp'])
+        return parser
+
+    def test_should_build_filter_from_arguments(self, parser):
+        """Should build filter from arguments."""
+        # Given: filter options on the command line
+        args = parser.parse_args(['--country', 'Germany', '--city', 'berlin', '--tag', 'p2p', '--protocol', 'tcp'])
+
+        # When: building the filter
+        server_filter = filter_from_args(args)
+
+        # Then: every criterion should be set
+        assert server_filter.countries == {'germany'}
+        assert server_filter.city.search('Berlin')
+        assert server_filter.tags == {'p2p'}
+        assert server_filter.protocols == ['tcp']
+
+    def test_should_use_default_protocols_when_not_given(self, parser):
+        """Should use default protocols when not given."""
+        # Given/When: no --protocol with a default
+        server_filter = filter_from_args(parser.parse_args([]), default_protocols=['udp'])
+
+        # Then: the default should be used
+        assert server_filter.protocols == ['udp']
+
+    def test_should_reject_invalid_city_regex(self, parser):
+        """Should reject invalid city regex."""
+        # Given/When/Then: an invalid regex is an argument error
+        with pytest.raises(SystemExit):
+            parser.parse_args(['--city', '('])
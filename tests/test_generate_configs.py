@@ -0,0 +1,423 @@
+"""Tests for the generate_configs pipeline stages."""
+import io
+import json
+import socket
+import pytest
+import fetch_vpn_servers
+import generate_configs
+from generate_configs import excluded_networks, main, parse_args, render_configs, write_configs
+from tests.fake_upstream import FakeUpstream, make_servers
+from utils.bundle_utils import Bundle
+from utils.output_utils import Output
+from utils.ranking_utils import ProbeHistory
+
+TEMPLATE = """[Interface]
+PrivateKey = your-private-key
+
+[Peer]
+AllowedIPs = 0.0.0.0/0
+Endpoint = hostname.com"""
+
+
+@pytest.fixture
+def output():
+    """Provide an output writing to memory."""
+    return Output(stream=io.StringIO())
+
+
+class TestRenderConfigs:
+    """Test suite for render_configs function."""
+
+    def test_should_number_duplicate_filenames(self, output):
+        """Should number duplicate filenames."""
+        # Given: two servers mapping to the same filename
+        servers = [
+            {'country': 'Spain', 'city': '', 'hostname': 'es-01.jumptoserver.com'},
+            {'country': 'Spain', 'city': '', 'hostname': 'es-01.example.com'},
+        ]
+
+        # When: rendering configs
+        filenames = [filename for filename, _, _ in render_configs(TEMPLATE, servers, output)]
+
+        # Then: the second file should get a counter suffix
+        assert filenames == ['es-01.conf', 'es-01-2.conf']
+
+    def test_should_render_lazily(self, output):
+        """Should render lazily."""
+        # Given: a generator recording how many servers were consumed
+        consumed = []
+
+        def servers():
+            for i in range(3):
+                consumed.append(i)
+                yield {'country': 'Spain', 'city': '', 'hostname': f"es-0{i}.jumptoserver.com"}
+
+        # When: taking the first rendered config
+        filename, content, _ = next(render_configs(TEMPLATE, servers(), output))
+
+        # Then: only the first server should have been consumed
+        assert consumed == [0]
+        assert filename == 'es-00.conf'
+        assert 'Endpoint = es-00.jumptoserver.com:51820' in content
+
+    def test_should_skip_and_report_server_without_hostname(self, output):
+        """Should skip and report server without hostname."""
+        # Given: a server missing its hostname
+        servers = [{'country': 'Spain'}, {'country': 'Spain', 'city': '', 'hostname': 'es-01.jumptoserver.com'}]
+
+        # When: rendering configs
+        result = list(render_configs(TEMPLATE, servers, output))
+        output.flush()
+
+        # Then: the bad server should be reported and skipped
+        assert [filename for filename, _, _ in result] == ['es-01.conf']
+        assert 'Error generating config for unknown' in output.stream.getvalue()
+
+
+class TestWriteConfigs:
+    """Test suite for write_configs function."""
+
+    def test_should_write_files_and_return_count(self, tmp_path, output):
+        """Should write files and return count."""
+        # Given: two rendered configs
+        configs = [
+            ('a.conf', 'A', {'hostname': 'a'}),
+            ('b.conf', 'B', {'hostname': 'b'}),
+        ]
+
+        # When: writing them
+        count = write_configs(iter(configs), tmp_path, output)
+
+        # Then: both files should exist with their content
+        assert count == 2
+        assert (tmp_path / 'a.conf').read_text() == 'A'
+        assert (tmp_path / 'b.conf').read_text() == 'B'
+
+    def test_should_show_final_progress_update(self, tmp_path):
+        """Should show final progress update."""
+        # Given: an output whose progress interval outlasts the run
+        progress_stream = io.StringIO()
+        output = Output(stream=io.StringIO(), progress=True, progress_stream=progress_stream,
+                        progress_interval=60.0, clock=lambda: 0.0)
+        configs = [(f"{name}.conf", name, {'hostname': name}) for name in 'abc']
+
+        # When: writing configs without a known total
+        write_configs(iter(configs), tmp_path, output)
+
+        # Then: the final count should be shown and the line terminated
+        assert progress_stream.getvalue() == '\r1\r3/3 (100%)\n'
+
+
+class TestMainStdin:
+    """Test suite for main reading NDJSON from stdin."""
+
+    def test_should_generate_configs_from_ndjson_stdin(self, tmp_path, monkeypatch, capsys):
+        """Should generate configs from ndjson stdin."""
+        # Given: a template and NDJSON servers on stdin
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        servers = [
+            {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.jumptoserver.com'},
+            {'country': 'Brazil', 'city': '', 'hostname': 'br-cf-dbl.jumptoserver.com'},
+        ]
+        monkeypatch.setattr('sys.stdin', io.StringIO(''.join(json.dumps(s) + '\n' for s in servers)))
+
+        # When: running the generator with --stdin
+        main(['--stdin'])
+
+        # Then: one config per server should be written
+        assert sorted(p.name for p in (tmp_path / 'output').iterdir()) == ['brazil-br-cf-dbl.conf', 'es-01.conf']
+        assert 'Successfully generated 2 configuration files' in capsys.readouterr().out
+
+    def test_should_reject_protocol_with_stdin(self, capsys):
+        """Should reject protocol with stdin."""
+        # Given/When/Then: servers read from stdin cannot be filtered by protocol
+        with pytest.raises(SystemExit):
+            parse_args(['--stdin', '--protocol', 'tcp'])
+        assert '--protocol cannot be combined with --stdin' in capsys.readouterr().err
+
+
+class TestMainOutput:
+    """Test suite for main closing its output."""
+
+    def test_should_flush_messages_when_run_is_interrupted(self, monkeypatch, capsys):
+        """Should flush messages when run is interrupted."""
+        # Given: a run interrupted after buffering a message
+        def interrupted(args, output):
+            output.summary('fetch_start', 'Fetching VPN servers...')
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(generate_configs, 'run', interrupted)
+
+        # When: running main
+        with pytest.raises(KeyboardInterrupt):
+            main([])
+
+        # Then: the buffered message should still be written
+        assert 'Fetching VPN servers...' in capsys.readouterr().out
+
+
+class TestExcludedNetworks:
+    """Test suite for excluded_networks function."""
+
+    def test_should_split_comma_separated_and_repeated_options(self):
+        """Should split comma separated and repeated options."""
+        # Given: repeated and comma-separated --exclude options
+        args = parse_args(['--exclude', '10.0.0.0/8, 192.168.0.0/16', '--exclude', 'fc00::/7'])
+
+        # When: collecting excluded networks
+        result = excluded_networks(args)
+
+        # Then: all networks should be listed
+        assert result == ['10.0.0.0/8', '192.168.0.0/16', 'fc00::/7']
+
+    def test_should_include_lan_ranges_when_exclude_lan(self):
+        """Should include lan ranges when exclude lan."""
+        # Given/When: --exclude-lan is passed
+        result = excluded_networks(parse_args(['--exclude-lan']))
+
+        # Then: private ranges should be excluded
+        assert '192.168.0.0/16' in result
+        assert 'fc00::/7' in result
+
+    def test_should_write_split_tunnel_allowed_ips(self, tmp_path, monkeypatch):
+        """Should write split tunnel allowed ips."""
+        # Given: a template and one server on stdin
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: generating with an excluded network
+        main(['--stdin', '-q', '--exclude', '128.0.0.0/1'])
+
+        # Then: the config should only route the remaining half
+        assert 'AllowedIPs = 0.0.0.0/1\n' in (tmp_path / 'output' / 'es-01.conf').read_text()
+
+    def test_should_stop_when_exclusions_cover_everything(self, tmp_path, monkeypatch, capsys):
+        """Should stop when exclusions cover everything."""
+        # Given: a template and one server on stdin
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: excluding the whole allowed network
+        main(['--stdin', '--exclude', '0.0.0.0/0'])
+
+        # Then: nothing should be written and the error reported
+        assert not (tmp_path / 'output').exists()
+        assert 'exclusions cover every allowed network' in capsys.readouterr().out
+
+    def test_should_stop_when_template_has_no_allowed_ips(self, tmp_path, monkeypatch, capsys):
+        """Should stop when template has no allowed ips."""
+        # Given: a template without an AllowedIPs line
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE.replace('AllowedIPs = 0.0.0.0/0\n', ''))
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: generating with an excluded network
+        main(['--stdin', '--exclude', '10.0.0.0/8'])
+
+        # Then: nothing should be written and the error reported
+        out = capsys.readouterr().out
+        assert not (tmp_path / 'output').exists()
+        assert 'has no AllowedIPs line' in out
+        assert 'AllowedIPs: 0 networks' not in out
+
+
+class TestMainBundle:
+    """Test suite for main writing a bundle."""
+
+    def test_should_write_bundle_matching_plain_configs(self, tmp_path, monkeypatch):
+        """Should write bundle matching plain configs."""
+        # Given: a template and NDJSON servers, including a duplicate filename
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        servers = [
+            {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.jumptoserver.com'},
+            {'country': 'Brazil', 'city': '', 'hostname': 'br-cf-dbl.jumptoserver.com'},
+            {'country': 'Spain', 'city': '', 'hostname': 'es-01.example.com'},
+        ]
+        stdin = ''.join(json.dumps(s) + '\n' for s in servers)
+
+        # When: generating both plain files and a bundle
+        monkeypatch.setattr('sys.stdin', io.StringIO(stdin))
+        main(['--stdin', '-q'])
+        monkeypatch.setattr('sys.stdin', io.StringIO(stdin))
+        main(['--stdin', '-q', '--bundle', 'configs.fvb'])
+
+        # Then: expanding the bundle should reproduce every plain file
+        bundle = Bundle.load(tmp_path / 'configs.fvb')
+        plain = {p.name: p.read_text() for p in (tmp_path / 'output').iterdir()}
+        assert {name: bundle.render(name) for name in bundle.names()} == plain
+
+    def test_should_reject_bundle_in_missing_directory(self, tmp_path, capsys):
+        """Should reject bundle in missing directory."""
+        # Given/When/Then: the bundle could never be written after the download
+        with pytest.raises(SystemExit):
+            parse_args(['--bundle', str(tmp_path / 'missing' / 'configs.fvb')])
+        assert 'does not exist' in capsys.readouterr().err
+
+    def test_should_report_bundle_write_error_apart_from_reading(self, tmp_path, monkeypatch, capsys):
+        """Should report bundle write error apart from reading."""
+        # Given: a bundle path that is a directory
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        (tmp_path / 'configs.fvb').mkdir()
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: generating the bundle
+        code = main(['--stdin', '--bundle', 'configs.fvb'])
+
+        # Then: the write should fail under its own message
+        out = capsys.readouterr().out
+        assert code == 1
+        assert "Error writing bundle 'configs.fvb'" in out
+        assert 'Error reading servers' not in out
+        assert 'Successfully generated' not in out
+
+
+class TestMainProfile:
+    """Test suite for main with --profile."""
+
+    def test_should_write_profile_files(self, tmp_path, monkeypatch):
+        """Should write profile files."""
+        # Given: a template and one server on stdin
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: generating with profiling enabled
+        main(['--stdin', '-q', '--profile', 'run'])
+
+        # Then: the profile should cover the generator
+        assert (tmp_path / 'output' / 'es-01.conf').exists()
+        assert 'write_configs (generate_configs.py' in (tmp_path / 'run.collapsed').read_text()
+        assert (tmp_path / 'run.pstats').stat().st_size > 0
+
+
+class TestMainHistory:
+    """Test suite for main ranking servers by probe history."""
+
+    def test_should_only_write_top_servers_per_country(self, tmp_path, monkeypatch):
+        """Should only write top servers per country."""
+        pytest.importorskip('numpy')
+
+        # Given: three Spanish servers, one of them fastest
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        history = ProbeHistory(capacity=4)
+        history.record_many(['es-01.x', 'es-02.x', 'es-03.x'], [80, 15, None])
+        history.save(tmp_path / 'history.npz')
+        servers = [{'country': 'Spain', 'city': '', 'hostname': f"es-0{i}.x"} for i in (1, 2, 3)]
+        monkeypatch.setattr('sys.stdin', io.StringIO(''.join(json.dumps(s) + '\n' for s in servers)))
+
+        # When: generating the top server per country
+        main(['--stdin', '-q', '--history', 'history.npz', '--top', '1'])
+
+        # Then: only the fastest server should be written
+        assert [p.name for p in (tmp_path / 'output').iterdir()] == ['es-02.conf']
+
+    def test_should_require_history_for_top(self):
+        """Should require history for top."""
+        # Given/When/Then: --top without --history is rejected
+        with pytest.raises(SystemExit):
+            parse_args(['--top', '3'])
+
+
+class TestMainQr:
+    """Test suite for main exporting QR codes."""
+
+    def test_should_write_qr_code_per_config(self, tmp_path, monkeypatch, capsys):
+        """Should write qr code per config."""
+        pytest.importorskip('segno')
+
+        # Given: a template and two servers on stdin
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        servers = [{'country': 'Spain', 'city': '', 'hostname': f"es-0{i}.x"} for i in (1, 2)]
+        stdin = ''.join(json.dumps(s) + '\n' for s in servers)
+
+        # When: generating twice with QR export
+        for _ in range(2):
+            monkeypatch.setattr('sys.stdin', io.StringIO(stdin))
+            main(['--stdin', '--qr', 'svg', '--qr-workers', '2'])
+
+        # Then: QR codes and an index should be written, and reused on the second run
+        qr_dir = tmp_path / 'output' / 'qr'
+        assert sorted(p.name for p in qr_dir.glob('*.svg')) == ['es-01.svg', 'es-02.svg']
+        assert (qr_dir / 'index.html').exists()
+        assert 'cache hit rate 100%' in capsys.readouterr().out
+
+    def test_should_report_qr_write_error_apart_from_reading(self, tmp_path, monkeypatch, capsys):
+        """Should report qr write error apart from reading."""
+        pytest.importorskip('segno')
+
+        # Given: a QR directory path that is a file
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        (tmp_path / 'qr').write_text('')
+        monkeypatch.setattr('sys.stdin', io.StringIO('{"country": "Spain", "city": "", "hostname": "es-01.x"}\n'))
+
+        # When: generating with QR export
+        code = main(['--stdin', '--qr', 'svg', '--qr-dir', 'qr', '--qr-workers', '1'])
+
+        # Then: the configs should be written and the QR failure reported on its own
+        out = capsys.readouterr().out
+        assert code == 1
+        assert (tmp_path / 'output' / 'es-01.conf').exists()
+        assert "Error writing QR codes to 'qr'" in out
+        assert 'Error reading servers' not in out
+
+    def test_should_reject_qr_with_bundle(self):
+        """Should reject qr with bundle."""
+        # Given/When/Then: QR export needs individual configs
+        with pytest.raises(SystemExit):
+            parse_args(['--qr', 'png', '--bundle', 'configs.fvb'])
+
+
+def unused_url():
+    """Return a local URL that refuses connections."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+class TestMainFetchErrors:
+    """Test suite for main when protocols cannot be fetched."""
+
+    def test_should_report_failure_when_upstream_unreachable(self, tmp_path, monkeypatch, capsys):
+        """Should report failure when upstream unreachable."""
+        # Given: a template and an upstream refusing connections
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        monkeypatch.setattr(fetch_vpn_servers, 'url', unused_url())
+        monkeypatch.setattr(fetch_vpn_servers, 'referer_url', unused_url())
+
+        # When: generating configs
+        code = main(['--transport', 'urllib'])
+
+        # Then: the run should fail without claiming success
+        out = capsys.readouterr().out
+        assert code == 1
+        assert 'Failed to fetch servers for udp' in out
+        assert 'Successfully generated' not in out
+
+    def test_should_flag_partial_failure(self, tmp_path, monkeypatch, capsys):
+        """Should flag partial failure."""
+        # Given: a stand-in upstream serving tcp but failing udp
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+        with FakeUpstream({'tcp': make_servers(3)}) as upstream:
+            monkeypatch.setattr(fetch_vpn_servers, 'url', upstream.url)
+            monkeypatch.setattr(fetch_vpn_servers, 'referer_url', upstream.referer_url)
+
+            # When: generating configs for both protocols
+            code = main(['--protocol', 'tcp', '--protocol', 'udp', '--transport', 'urllib'])
+
+        # Then: the tcp configs should be written and the udp failure flagged
+        out = capsys.readouterr().out
+        assert code == 0
+        assert len(list((tmp_path / 'output').iterdir())) == 3
+        assert 'Warning: failed to fetch servers for udp' in out
+        assert 'Successfully generated 3 configuration files' in out
@@ -0,0 +1,148 @@
+"""Tests for rendering one config on demand."""
+import pytest
+import fetch_vpn_servers
+import get_config
+from fetch_vpn_servers import cache_name
+from get_config import main
+from tests.fake_upstream import FakeUpstream, make_servers
+from utils.cache_utils import CatalogCache
+
+TEMPLATE = """[Interface]
+PrivateKey = your-private-key
+
+[Peer]
+AllowedIPs = 0.0.0.0/0
+Endpoint = hostname.com"""
+
+SERVERS = [
+    {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.jumptoserver.com'},
+    {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.example.com'},
+    {'country': 'Brazil', 'city': '', 'hostname': 'br-cf-dbl.jumptoserver.com'},
+]
+
+
+def config_for(hostname):
+    return TEMPLATE.replace('hostname.com', f"{hostname}:51820")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Provide a directory holding the template, with a fresh cached udp catalog."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'fastestvpn.conf').write_text(TEMPLATE)
+    cache = CatalogCache(tmp_path / 'cache')
+    cache.get(cache_name('udp'), lambda: SERVERS)
+    return tmp_path
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fail the test if a transport is created."""
+    def create_transport(name=None):
+        raise AssertionError('network used')
+    monkeypatch.setattr(get_config, 'create_transport', create_transport)
+
+
+class TestMainCached:
+    """Test suite for main with a fresh cached catalog."""
+
+    @pytest.mark.parametrize('name,hostname', [
+        ('es-01', 'es-01.jumptoserver.com'),
+        ('es-01-2.conf', 'es-01.example.com'),
+        ('br-cf-dbl.jumptoserver.com', 'br-cf-dbl.jumptoserver.com'),
+    ])
+    def test_should_print_config_without_network(self, workdir, offline, capsys, name, hostname):
+        """Should print config without network."""
+        # Given: a fresh cached catalog
+        # When: getting one config by filename, stem or hostname
+        code = main([name, '--cache-dir', str(workdir / 'cache')])
+
+        # Then: only that config should be printed to stdout
+        assert code == 0
+        assert capsys.readouterr().out == config_for(hostname)
+
+    def test_should_write_config_to_file(self, workdir, offline, capsys):
+        """Should write config to file."""
+        # Given: a fresh cached catalog
+        # When: getting one config into a file
+        code = main(['es-01-2', '--cache-dir', str(workdir / 'cache'), '-o', 'es.conf'])
+
+        # Then: the file should hold the config and stdout stay empty
+        assert code == 0
+        assert (workdir / 'es.conf').read_text() == config_for('es-01.example.com')
+        captured = capsys.readouterr()
+        assert captured.out == ''
+        assert 'Wrote es-01-2.conf (es-01.example.com)' in captured.err
+
+    def test_should_reuse_index_until_catalog_changes(self, workdir, offline, monkeypatch, capsys):
+        """Should reuse index until catalog changes."""
+        # Given: a first lookup that built the filename index
+        main(['es-01', '--cache-dir', str(workdir / 'cache')])
+        assert (workdir / 'cache' / 'index-udp.json').exists()
+
+        # When: looking up again with index building disabled
+        monkeypatch.setattr(get_config, 'build_index', None)
+        code = main(['es-01-2', '--cache-dir', str(workdir / 'cache')])
+
+        # Then: the saved index should be used
+        assert code == 0
+        assert capsys.readouterr().out.endswith(config_for('es-01.example.com'))
+
+    def test_should_fail_when_name_unknown(self, workdir, offline, capsys):
+        """Should fail when name unknown."""
+        # Given/When: getting a server that is not in the catalog
+        code = main(['xx-99', '--cache-dir', str(workdir / 'cache')])
+
+        # Then: an error should be reported
+        assert code == 1
+        assert "No server named 'xx-99' in the udp catalog" in capsys.readouterr().err
+
+    def test_should_fail_offline_without_cached_catalog(self, workdir, offline, capsys):
+        """Should fail offline without cached catalog."""
+        # Given/When: getting a config offline from an empty cache
+        code = main(['es-01', '--cache-dir', str(workdir / 'empty'), '--offline'])
+
+        # Then: an error should be reported
+        assert code == 1
+        assert 'No cached udp servers' in capsys.readouterr().err
+
+
+class TestMainRefresh:
+    """Test suite for main when the cached catalog is stale."""
+
+    def test_should_fetch_catalog_when_stale(self, workdir, monkeypatch, capsys):
+        """Should fetch catalog when stale."""
+        # Given: a stand-in upstream and a catalog older than --max-age
+        with FakeUpstream(make_servers(5)) as upstream:
+            monkeypatch.setattr(fetch_vpn_servers, 'url', upstream.url)
+            monkeypatch.setattr(fetch_vpn_servers, 'referer_url', upstream.referer_url)
+
+            # When: getting a config that only the fetched catalog holds
+            code = main(['us-0000', '--cache-dir', str(workdir / 'cache'), '--max-age', '0', '--transport', 'urllib'])
+
+        # Then: the catalog should be fetched once and the config printed
+        assert code == 0
+        assert upstream.protocol_count('udp') == 1
+        assert capsys.readouterr().out == config_for('us-0000.jumptoserver.com')
+
+    def test_should_fetch_again_after_failed_refresh(self, workdir, monkeypatch, capsys):
+        """Should fetch again after failed refresh."""
+        # Given: a stand-in upstream failing for udp and no cached catalog
+        with FakeUpstream({'tcp': make_servers(5)}) as upstream:
+            monkeypatch.setattr(fetch_vpn_servers, 'url', upstream.url)
+            monkeypatch.setattr(fetch_vpn_servers, 'referer_url', upstream.referer_url)
+            cache_dir = str(workdir / 'empty')
+            first = main(['us-0000', '--cache-dir', cache_dir, '--transport', 'urllib'])
+            first_err = capsys.readouterr().err
+
+            # When: the upstream recovers within --max-age
+            upstream.servers['udp'] = make_servers(5)
+            second = main(['us-0000', '--cache-dir', cache_dir, '--transport', 'urllib'])
+
+        # Then: the failure should be reported, not cached, and the index built only from good data
+        assert first == 1
+        assert 'fetching udp servers failed' in first_err
+        assert 'No server named' not in first_err
+        assert second == 0
+        assert upstream.protocol_count('udp') == 2
+        assert capsys.readouterr().out == config_for('us-0000.jumptoserver.com')
@@ -0,0 +1,69 @@
+"""Unit tests for index_utils module."""
+import pytest
+from utils.index_utils import build_index, load_index, resolve_name, save_index, source_signature
+
+SERVERS = [
+    {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.jumptoserver.com'},
+    {'country': 'Spain', 'city': 'Madrid', 'hostname': 'es-01.example.com'},
+    {'country': 'Brazil', 'city': '', 'hostname': 'br-cf-dbl.jumptoserver.com'},
+]
+
+
+class TestBuildIndex:
+    """Test suite for build_index and resolve_name."""
+
+    def test_should_name_files_like_generate_configs(self):
+        """Should name files like generate configs."""
+        # Given/When: an index of servers with a duplicate prefix
+        index = build_index(SERVERS)
+
+        # Then: duplicates should be numbered and -dbl servers prefixed
+        assert index == {
+            'es-01.conf': 'es-01.jumptoserver.com',
+            'es-01-2.conf': 'es-01.example.com',
+            'brazil-br-cf-dbl.conf': 'br-cf-dbl.jumptoserver.com',
+        }
+
+    def test_should_resolve_filename_stem_or_hostname(self):
+        """Should resolve filename stem or hostname."""
+        # Given: an index
+        index = build_index(SERVERS)
+
+        # When/Then: configs can be looked up by filename, stem or hostname
+        assert resolve_name(index, 'es-01-2.conf') == 'es-01-2.conf'
+        assert resolve_name(index, 'brazil-br-cf-dbl') == 'brazil-br-cf-dbl.conf'
+        assert resolve_name(index, 'es-01.example.com') == 'es-01-2.conf'
+        with pytest.raises(KeyError):
+            resolve_name(index, 'missing')
+
+
+class TestSavedIndex:
+    """Test suite for saving and loading indexes."""
+
+    def test_should_load_index_saved_for_same_source(self, tmp_path):
+        """Should load index saved for same source."""
+        # Given: an index saved for a source file
+        source = tmp_path / 'catalog.json'
+        source.write_text('{}')
+        save_index(tmp_path / 'index.json', source_signature(source), {'a.conf': 'a.example.com'})
+
+        # When/Then: it loads while the source is unchanged
+        assert load_index(tmp_path / 'index.json', source_signature(source)) == {'a.conf': 'a.example.com'}
+
+    def test_should_treat_index_as_outdated_when_source_replaced(self, tmp_path):
+        """Should treat index as outdated when source replaced."""
+        # Given: an index saved for a source file that is then replaced
+        source = tmp_path / 'catalog.json'
+        source.write_text('{}')
+        save_index(tmp_path / 'index.json', source_signature(source), {'a.conf': 'a.example.com'})
+        source.write_text('{"servers": {}}')
+
+        # When/Then: the index is no longer returned
+        assert load_index(tmp_path / 'index.json', source_signature(source)) is None
+
+    def test_should_return_none_when_missing(self, tmp_path):
+        """Should return none when missing."""
+        # Given/When/Then: no source or no index gives None
+        assert source_signature(tmp_path / 'missing.json') is None
+        assert load_index(tmp_path / 'index.json', None) is None
+        assert load_index(tmp_path / 'index.json', [1, 2]) is None
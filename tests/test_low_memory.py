@@ -0,0 +1,124 @@
+"""Tests for the standard-library, low-memory mode and its memory budget.
+
+The budgets are documented in the README: a full refresh of 2000 servers
+per protocol, generating every config, must stay under ``HEAP_BUDGET`` of
+Python allocations (measured with tracemalloc) and ``RSS_BUDGET`` of peak
+resident memory for the whole process.
+"""
+import json
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+import pytest
+from fetch_vpn_servers import iter_servers
+from tests.fake_upstream import FakeUpstream, make_servers
+
+HEAP_BUDGET = 6 * 2**20
+RSS_BUDGET = 40 * 2**20
+SERVERS = 2000
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs generate_configs in a fresh interpreter where third-party packages
+# cannot be imported, and prints its memory use as JSON
+CHILD = '''
+import sys
+for name in ('requests', 'bs4', 'numpy', 'httpx', 'segno', 'brotli', 'brotlicffi', 'zstandard'):
+    sys.modules[name] = None
+sys.path.insert(0, sys.argv[1])
+
+import json, os, tracemalloc
+import fetch_vpn_servers, generate_configs
+
+fetch_vpn_servers.url, fetch_vpn_servers.referer_url = sys.argv[2], sys.argv[3]
+tracemalloc.start()
+generate_configs.main(['-q', '--protocol', 'tcp', '--protocol', 'udp', '--protocol', 'ikev2'])
+heap_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+def rss_peak():
+    # VmHWM starts over at exec; ru_maxrss would include the forked parent
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+print(json.dumps({
+    'heap_peak': heap_peak,
+    'rss_peak': rss_peak(),
+    'configs': len(os.listdir('output')),
+    'third_party': sorted(name for name, module in sys.modules.items()
+                          if module is not None and name.split('.')[0] in ('requests', 'bs4', 'numpy', 'httpx')),
+}))
+'''
+
+
+@pytest.fixture(scope='module')
+def refresh(tmp_path_factory):
+    """Run a full refresh in a stdlib-only child process and return its report."""
+    workdir = tmp_path_factory.mktemp('refresh')
+    (workdir / 'fastestvpn.conf').write_text(
+        "[Interface]\nPrivateKey = key\n\n[Peer]\nAllowedIPs = 0.0.0.0/0\nEndpoint = ca-01.jumptoserver.com:51820\n"
+    )
+    with FakeUpstream(make_servers(SERVERS), content_encoding='gzip') as upstream:
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, str(ROOT), upstream.url, upstream.referer_url],
+            cwd=workdir, capture_output=True, text=True, timeout=120,
+        )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+class TestStdlibRefresh:
+    """Test suite for a full refresh without third-party packages."""
+
+    def test_should_generate_all_configs_without_third_party_packages(self, refresh):
+        """Should generate all configs without third party packages."""
+        # Given/When: a refresh where third-party packages cannot be imported
+        # Then: every config should be written using the standard library only
+        assert refresh['configs'] == SERVERS
+        assert refresh['third_party'] == []
+
+    def test_should_stay_within_heap_budget(self, refresh):
+        """Should stay within heap budget."""
+        # Given/When/Then: Python allocations should peak below the budget
+        assert refresh['heap_peak'] < HEAP_BUDGET
+
+    def test_should_stay_within_rss_budget(self, refresh):
+        """Should stay within rss budget."""
+        if refresh['rss_peak'] is None:
+            pytest.skip('peak RSS is not available on this platform')
+        # Given/When/Then: the whole process should peak below the budget
+        assert refresh['rss_peak'] < RSS_BUDGET
+
+
+class TestStreamingParserMemory:
+    """Test suite for memory use of the incremental parser."""
+
+    def test_should_not_grow_with_response_size(self):
+        """Should not grow with response size."""
+        # Given: a large response produced chunk by chunk
+        def chunks():
+            yield '<table>'
+            for i in range(5000):
+                yield f"<tr><td>Spain</td><td>Madrid</td><td>es-{i:05d}.jumptoserver.com</td></tr>"
+            yield '</table>'
+
+        # When: parsing it while discarding servers
+        tracemalloc.start()
+        count = sum(1 for _ in iter_servers(chunks()))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # Then: memory should stay far below the size of the response (~330 KiB)
+        assert count == 5000
+        assert peak < 64 * 2**10
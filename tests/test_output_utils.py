@@ -0,0 +1,218 @@
+"""Unit tests for output_utils module."""
+import argparse
+import io
+import json
+import pytest
+from utils.output_utils import Output, add_output_arguments, output_from_args, QUIET, SUMMARY, VERBOSE
+
+
+class FakeClock:
+    """Manually advanced clock for progress rate limiting."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOutput:
+    """Test suite for Output class."""
+
+    @pytest.fixture
+    def stream(self):
+        """Provide an in-memory output stream."""
+        return io.StringIO()
+
+    def test_should_print_summary_and_hide_verbose_when_summary_level(self, stream):
+        """Should print summary and hide verbose when summary level."""
+        # Given: an output at summary level
+        output = Output(level='summary', stream=stream)
+
+        # When: emitting summary and verbose messages
+        output.summary('done', 'Summary line')
+        output.verbose('generated', 'Verbose line')
+        output.close()
+
+        # Then: only the summary line should be written
+        assert stream.getvalue() == 'Summary line\n'
+
+    def test_should_print_verbose_when_verbose_level(self, stream):
+        """Should print verbose when verbose level."""
+        # Given: an output at verbose level
+        output = Output(level=VERBOSE, stream=stream)
+
+        # When: emitting a verbose message
+        output.verbose('generated', 'Verbose line')
+        output.close()
+
+        # Then: the verbose line should be written
+        assert stream.getvalue() == 'Verbose line\n'
+
+    def test_should_only_print_errors_when_quiet_level(self, stream):
+        """Should only print errors when quiet level."""
+        # Given: an output at quiet level
+        output = Output(level=QUIET, stream=stream)
+
+        # When: emitting summary and error messages
+        output.summary('done', 'Summary line')
+        output.error('error', 'Error line')
+        output.close()
+
+        # Then: only the error should be written
+        assert stream.getvalue() == 'Error line\n'
+
+    def test_should_write_json_lines_when_json_mode(self, stream):
+        """Should write json lines when json mode."""
+        # Given: an output in JSON-lines mode
+        output = Output(level=SUMMARY, json_lines=True, stream=stream)
+
+        # When: emitting events with extra fields
+        output.summary('fetch_done', 'Found 2 servers', count=2)
+        output.summary('server', hostname='us-01.jumptoserver.com')
+        output.close()
+
+        # Then: each event should be one JSON object per line
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {'event': 'fetch_done', 'message': 'Found 2 servers', 'count': 2},
+            {'event': 'server', 'hostname': 'us-01.jumptoserver.com'},
+        ]
+
+    def test_should_skip_fields_only_event_when_text_mode(self, stream):
+        """Should skip fields only event when text mode."""
+        # Given: an output in text mode
+        output = Output(stream=stream)
+
+        # When: emitting an event without a message
+        output.summary('server', hostname='us-01.jumptoserver.com')
+        output.close()
+
+        # Then: nothing should be written
+        assert stream.getvalue() == ''
+
+    def test_should_buffer_writes_until_flushed(self, stream):
+        """Should buffer writes until flushed."""
+        # Given: an output with a large buffer
+        output = Output(stream=stream, buffer_size=1024)
+
+        # When: emitting a message without flushing
+        output.summary('done', 'Buffered line')
+
+        # Then: nothing should reach the stream until flush
+        assert stream.getvalue() == ''
+        output.flush()
+        assert stream.getvalue() == 'Buffered line\n'
+
+    def test_should_flush_when_buffer_size_exceeded(self, stream):
+        """Should flush when buffer size exceeded."""
+        # Given: an output with a tiny buffer
+        output = Output(stream=stream, buffer_size=10)
+
+        # When: emitting a message longer than the buffer
+        output.summary('done', 'A line longer than ten characters')
+
+        # Then: the message should be written immediately
+        assert stream.getvalue() == 'A line longer than ten characters\n'
+
+    def test_should_flush_on_context_exit(self, stream):
+        """Should flush on context exit."""
+        # Given/When: an output used as a context manager
+        with Output(stream=stream) as output:
+            output.summary('done', 'Line')
+
+        # Then: the buffer should be flushed
+        assert stream.getvalue() == 'Line\n'
+
+
+class TestOutputProgress:
+    """Test suite for Output progress indicator."""
+
+    def test_should_not_show_progress_when_disabled(self):
+        """Should not show progress when disabled."""
+        # Given: an output without progress
+        progress_stream = io.StringIO()
+        output = Output(stream=io.StringIO(), progress_stream=progress_stream)
+
+        # When: reporting progress
+        output.progress(1, 10)
+
+        # Then: nothing should be written
+        assert progress_stream.getvalue() == ''
+
+    def test_should_rate_limit_progress_updates(self):
+        """Should rate limit progress updates."""
+        # Given: an output with progress limited to one update per second
+        progress_stream = io.StringIO()
+        clock = FakeClock()
+        output = Output(stream=io.StringIO(), progress=True, progress_stream=progress_stream,
+                        progress_interval=1.0, clock=clock)
+
+        # When: reporting many updates within the interval, then one after it
+        for done in range(1, 50):
+            output.progress(done, 100)
+        clock.now = 1.5
+        output.progress(50, 100)
+
+        # Then: only the first and the post-interval updates should be shown
+        assert progress_stream.getvalue() == '\r1/100 (1%)\r50/100 (50%)'
+
+    def test_should_always_show_final_progress_update(self):
+        """Should always show final progress update."""
+        # Given: an output with a long progress interval
+        progress_stream = io.StringIO()
+        output = Output(stream=io.StringIO(), progress=True, progress_stream=progress_stream,
+                        progress_interval=60.0, clock=FakeClock())
+
+        # When: reporting the first and final updates back to back
+        output.progress(1, 2)
+        output.progress(2, 2)
+
+        # Then: the final update should be shown and the line terminated
+        assert progress_stream.getvalue() == '\r1/2 (50%)\r2/2 (100%)\n'
+
+    def test_should_emit_progress_events_when_json_mode(self):
+        """Should emit progress events when json mode."""
+        # Given: an output in JSON-lines mode with progress
+        stream = io.StringIO()
+        output = Output(json_lines=True, stream=stream, progress=True, clock=FakeClock())
+
+        # When: reporting the final update
+        output.progress(3, 3)
+        output.close()
+
+        # Then: a progress event should be written to the main stream
+        assert json.loads(stream.getvalue()) == {'event': 'progress', 'done': 3, 'total': 3}
+
+
+class TestOutputArguments:
+    """Test suite for output argument helpers."""
+
+    @pytest.fixture
+    def parser(self):
+        """Provide a parser with the output options."""
+        parser = argparse.ArgumentParser()
+        add_output_arguments(parser)
+        return parser
+
+    @pytest.mark.parametrize("argv,expected_level", [
+        ([], SUMMARY),
+        (['-q'], QUIET),
+        (['--verbose'], VERBOSE),
+    ])
+    def test_should_map_flags_to_levels(self, parser, argv, expected_level):
+        """Should map flags to levels."""
+        # Given: parsed command line flags
+        args = parser.parse_args(argv)
+
+        # When: building an output
+        output = output_from_args(args)
+
+        # Then: the level should match the flag
+        assert output.level == expected_level
+
+    def test_should_reject_quiet_and_verbose_together(self, parser):
+        """Should reject quiet and verbose together."""
+        # Given/When/Then: both level flags are rejected
+        with pytest.raises(SystemExit):
+            parser.parse_args(['-q', '-v'])
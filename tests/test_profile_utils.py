@@ -0,0 +1,156 @@
+"""Unit tests for profile_utils module."""
+import argparse
+import cProfile
+import contextlib
+import io
+import pstats
+import time
+from utils.output_utils import Output
+from utils.profile_utils import (
+    CProfileProfiler,
+    SamplingProfiler,
+    add_profile_arguments,
+    collapsed_stacks,
+    profiler_from_args,
+    write_collapsed,
+)
+
+
+def busy(seconds):
+    """Spin for the given wall-clock time."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def outer():
+    busy(0.02)
+    inner()
+
+
+def inner():
+    busy(0.03)
+
+
+def read_collapsed(path):
+    """Return {stack: count} from a collapsed stacks file."""
+    counts = {}
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        counts[stack] = int(count)
+    return counts
+
+
+def parse(argv):
+    parser = argparse.ArgumentParser()
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+class TestCollapsedStacks:
+    """Test suite for collapsed_stacks function."""
+
+    def test_should_attribute_self_time_to_full_call_path(self):
+        """Should attribute self time to full call path."""
+        # Given: a profile of outer() calling inner()
+        with cProfile.Profile() as profile:
+            outer()
+
+        # When: collapsing the stacks
+        counts = collapsed_stacks(pstats.Stats(profile))
+
+        # Then: the busy loop under inner should be reached through outer
+        inner_stacks = [s for s in counts if 'outer (' in s and 'inner (' in s]
+        assert inner_stacks
+        assert all(s.index('outer (') < s.index('inner (') for s in inner_stacks)
+        # And: total time should roughly match the profiled time
+        assert 30_000 < sum(counts.values()) < 500_000
+
+
+class TestCProfileProfiler:
+    """Test suite for CProfileProfiler class."""
+
+    def test_should_write_pstats_and_collapsed_files(self, tmp_path):
+        """Should write pstats and collapsed files."""
+        # Given: a profiler
+        profiler = CProfileProfiler(tmp_path / 'run')
+
+        # When: profiling a workload
+        with profiler:
+            outer()
+
+        # Then: both files should be readable
+        stats = pstats.Stats(str(tmp_path / 'run.pstats'))
+        assert any(name == 'inner' for _, _, name in stats.stats)
+        assert any('inner (' in stack for stack in read_collapsed(tmp_path / 'run.collapsed'))
+
+
+class TestSamplingProfiler:
+    """Test suite for SamplingProfiler class."""
+
+    def test_should_sample_running_function(self, tmp_path):
+        """Should sample running function."""
+        # Given: a sampling profiler
+        profiler = SamplingProfiler(tmp_path / 'run', interval=0.001)
+
+        # When: sampling a busy workload
+        with profiler:
+            busy(0.2)
+
+        # Then: most samples should be in the busy function of the main thread
+        counts = read_collapsed(tmp_path / 'run.collapsed')
+        busy_samples = sum(c for s, c in counts.items() if s.startswith('MainThread;') and 'busy (' in s)
+        assert profiler.samples > 10
+        assert busy_samples > profiler.samples / 2
+        assert not any('sampling-profiler' in stack for stack in counts)
+
+    def test_should_write_periodically_while_running(self, tmp_path):
+        """Should write periodically while running."""
+        # Given: a profiler rewriting its file often
+        profiler = SamplingProfiler(tmp_path / 'run', interval=0.001, write_interval=0.01)
+
+        # When: the workload is still running
+        with profiler:
+            busy(0.1)
+            written = (tmp_path / 'run.collapsed').exists()
+
+        # Then: the file should already exist
+        assert written
+
+
+class TestWriteCollapsed:
+    """Test suite for write_collapsed function."""
+
+    def test_should_write_one_line_per_stack(self, tmp_path):
+        """Should write one line per stack."""
+        # Given/When: writing two stacks
+        write_collapsed(tmp_path / 'out.collapsed', {'a;b': 3, 'a': 1})
+
+        # Then: each stack should be on its own line
+        assert (tmp_path / 'out.collapsed').read_text() == 'a 1\na;b 3\n'
+
+
+class TestProfilerFromArgs:
+    """Test suite for profiler_from_args function."""
+
+    def test_should_do_nothing_without_profile(self):
+        """Should do nothing without profile."""
+        # Given/When: no --profile option
+        profiler = profiler_from_args(parse([]), Output(stream=io.StringIO()))
+
+        # Then: a no-op context should be returned
+        assert isinstance(profiler, contextlib.nullcontext)
+
+    def test_should_report_written_files(self, tmp_path):
+        """Should report written files."""
+        # Given: sampling mode requested
+        output = Output(stream=io.StringIO())
+        args = parse(['--profile', str(tmp_path / 'run'), '--profile-mode', 'sample', '--sample-interval', '0.001'])
+
+        # When: profiling a workload
+        with profiler_from_args(args, output):
+            busy(0.02)
+        output.flush()
+
+        # Then: the collapsed file should be reported
+        assert f"Profile written to {tmp_path / 'run.collapsed'}" in output.stream.getvalue()
@@ -0,0 +1,123 @@
+"""Unit tests for qr_utils module."""
+import io
+import pytest
+from utils.output_utils import Output
+from utils.qr_utils import QrExporter, content_key, render_qr
+
+segno = pytest.importorskip('segno')
+
+CONFIG = "[Interface]\nPrivateKey = key\n\n[Peer]\nEndpoint = {host}:51820\n"
+
+
+def configs(*hosts):
+    return [(f"{host}.conf", CONFIG.format(host=host), {'hostname': host}) for host in hosts]
+
+
+def export(tmp_path, items, output=None, kind='png'):
+    with QrExporter(tmp_path / 'qr', kind, max_workers=2) as exporter:
+        for filename, content, _ in items:
+            exporter.add(filename, content)
+        return exporter.finish(output)
+
+
+class TestRenderQr:
+    """Test suite for render_qr function."""
+
+    def test_should_encode_content_as_png(self):
+        """Should encode content as png."""
+        # Given/When: rendering a config
+        data = render_qr(CONFIG.format(host='es-01'), 'png')
+
+        # Then: it should equal segno's own rendering
+        expected = io.BytesIO()
+        segno.make(CONFIG.format(host='es-01'), error='l', micro=False).save(expected, kind='png', scale=4, border=4)
+        assert data.startswith(b'\x89PNG')
+        assert data == expected.getvalue()
+
+    def test_should_encode_content_as_svg(self):
+        """Should encode content as svg."""
+        # Given/When/Then: an SVG render is an SVG document
+        assert b'<svg' in render_qr(CONFIG.format(host='es-01'), 'svg')
+
+
+class TestQrExporter:
+    """Test suite for QrExporter class."""
+
+    def test_should_write_images_and_index(self, tmp_path):
+        """Should write images and index."""
+        # Given/When: exporting two configs
+        stats = export(tmp_path, configs('es-01', 'uk-london'))
+
+        # Then: one image per config and an index linking them should be written
+        assert (tmp_path / 'qr' / 'es-01.png').read_bytes() == render_qr(CONFIG.format(host='es-01'))
+        index = (tmp_path / 'qr' / 'index.html').read_text()
+        assert '<a href="es-01.png">' in index and '<a href="uk-london.png">' in index
+        assert stats['rendered'] == 2 and stats['cached'] == 0
+
+    def test_should_not_render_unchanged_configs_again(self, tmp_path):
+        """Should not render unchanged configs again."""
+        # Given: a previous export
+        export(tmp_path, configs('es-01', 'uk-london'))
+
+        # When: exporting again with one config changed
+        stats = export(tmp_path, configs('es-01', 'uk-manchester'))
+
+        # Then: only the changed config should be rendered
+        assert stats['cached'] == 1
+        assert stats['rendered'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_should_not_start_pool_when_everything_cached(self, tmp_path):
+        """Should not start pool when everything cached."""
+        # Given: a previous export
+        export(tmp_path, configs('es-01'))
+
+        # When: exporting the same config under another filename
+        with QrExporter(tmp_path / 'qr', max_workers=2) as exporter:
+            exporter.add('renamed.conf', CONFIG.format(host='es-01'))
+            started = exporter._executor is not None
+            stats = exporter.finish()
+
+        # Then: the cached render should be reused without a process pool
+        assert not started
+        assert stats['hit_rate'] == 1.0
+        assert (tmp_path / 'qr' / 'renamed.png').exists()
+
+    def test_should_render_duplicate_content_once(self, tmp_path):
+        """Should render duplicate content once."""
+        # Given: two filenames with the same content
+        content = CONFIG.format(host='es-01')
+
+        # When: exporting them
+        stats = export(tmp_path, [('a.conf', content, {}), ('b.conf', content, {})])
+
+        # Then: a single render should serve both
+        assert stats['rendered'] == 1
+        assert stats['cached'] == 1
+
+    def test_should_report_and_skip_content_too_large_for_qr(self, tmp_path):
+        """Should report and skip content too large for qr."""
+        # Given: a config too large for any QR code
+        output = Output(stream=io.StringIO())
+        items = configs('es-01') + [('huge.conf', 'x' * 8000, {})]
+
+        # When: exporting
+        stats = export(tmp_path, items, output)
+        output.flush()
+
+        # Then: the failure should be reported and left out of the index
+        assert stats['failed'] == 1
+        assert 'Error rendering QR code for huge.conf' in output.stream.getvalue()
+        assert 'huge' not in (tmp_path / 'qr' / 'index.html').read_text()
+        assert (tmp_path / 'qr' / 'es-01.png').exists()
+
+    def test_should_key_cache_by_format(self):
+        """Should key cache by format."""
+        # Given/When/Then: PNG and SVG renders of one config use different keys
+        assert content_key(CONFIG, 'png', 4) != content_key(CONFIG, 'svg', 4)
+
+    def test_should_reject_unknown_format(self, tmp_path):
+        """Should reject unknown format."""
+        # Given/When/Then: an unknown image format is rejected
+        with pytest.raises(ValueError):
+            QrExporter(tmp_path, 'gif')
@@ -0,0 +1,190 @@
+"""Unit tests for ranking_utils module and the rank_servers script."""
+import io
+import json
+import math
+import pytest
+from utils.ranking_utils import ProbeHistory, read_samples, select_top
+
+np = pytest.importorskip('numpy')
+
+
+def reference_ewma(samples, alpha):
+    """Weighted mean of received samples, newest weighted 1, then (1 - alpha)^age."""
+    weights = [(1 - alpha) ** age for age, value in enumerate(reversed(samples)) if value is not None]
+    values = [value for value in reversed(samples) if value is not None]
+    return sum(w * v for w, v in zip(weights, values)) / sum(weights)
+
+
+class TestProbeHistory:
+    """Test suite for ProbeHistory class."""
+
+    def test_should_match_reference_statistics(self):
+        """Should match reference statistics."""
+        # Given: random samples with losses, wrapping around the ring buffer
+        rng = np.random.default_rng(0)
+        history = ProbeHistory(capacity=50)
+        recorded = {f"host-{i}": [] for i in range(20)}
+        for _ in range(80):
+            hostnames = list(recorded)
+            rtts = [None if rng.random() < 0.2 else float(rng.gamma(4, 10)) for _ in hostnames]
+            history.record_many(hostnames, rtts)
+            for hostname, rtt in zip(hostnames, rtts):
+                recorded[hostname].append(rtt)
+
+        # When: summarizing
+        stats = history.summary(alpha=0.2)
+
+        # Then: every statistic should match a per-host computation over the last 50 samples
+        for row, hostname in enumerate(history.hostnames):
+            window = recorded[hostname][-50:]
+            received = np.array([v for v in window if v is not None], dtype=np.float32)
+            assert stats['availability'][row] == pytest.approx(len(received) / 50)
+            assert stats['p50'][row] == pytest.approx(np.percentile(received, 50), rel=1e-4)
+            assert stats['p95'][row] == pytest.approx(np.percentile(received, 95), rel=1e-4)
+            assert stats['ewma'][row] == pytest.approx(reference_ewma(
+                [None if v is None else float(np.float32(v)) for v in window], 0.2), rel=1e-4)
+
+    def test_should_score_lossy_and_silent_hosts_worse(self):
+        """Should score lossy and silent hosts worse."""
+        # Given: a steady host, a lossy host and a host that never replied
+        history = ProbeHistory(capacity=10)
+        for i in range(10):
+            history.record_many(['steady', 'lossy', 'silent'], [20, None if i % 2 else 20, None])
+
+        # When: scoring
+        scores = history.scores(['steady', 'lossy', 'silent', 'unknown'])
+
+        # Then: loss should double the score and no replies should score inf
+        assert scores[0] == pytest.approx(20)
+        assert scores[1] == pytest.approx(40)
+        assert math.isinf(scores[2]) and math.isinf(scores[3])
+
+    def test_should_record_repeated_hostname_in_order(self):
+        """Should record repeated hostname in order."""
+        # Given: one batch with two samples for the same host
+        history = ProbeHistory(capacity=2)
+
+        # When: recording it
+        history.record_many(['a', 'a', 'a'], [1, 2, 3])
+
+        # Then: the ring should keep the last two samples
+        assert sorted(history.rtt[0].tolist()) == [2, 3]
+        assert history.counts[0] == 3
+
+    def test_should_round_trip_through_file(self, tmp_path):
+        """Should round trip through file."""
+        # Given: a saved history
+        history = ProbeHistory(capacity=4)
+        history.record_many(['a', 'b'], [10, None])
+        history.save(tmp_path / 'history.npz')
+
+        # When: loading it and recording more
+        loaded = ProbeHistory.load(tmp_path / 'history.npz')
+        loaded.record('b', 30)
+
+        # Then: the samples should carry over
+        assert loaded.capacity == 4
+        assert loaded.hostnames == ['a', 'b']
+        assert loaded.summary()['availability'].tolist() == [1.0, 0.5]
+
+    def test_should_load_empty_history_when_file_missing(self, tmp_path):
+        """Should load empty history when file missing."""
+        # Given/When: loading a file that does not exist
+        history = ProbeHistory.load(tmp_path / 'missing.npz', capacity=7)
+
+        # Then: an empty history should be returned
+        assert len(history) == 0
+        assert history.capacity == 7
+
+
+class TestSelectTop:
+    """Test suite for select_top function."""
+
+    @pytest.fixture
+    def history(self):
+        """Provide a history where higher numbers are slower."""
+        history = ProbeHistory(capacity=4)
+        history.record_many(['uk-1', 'uk-2', 'uk-3', 'us-1', 'us-2'], [30, 10, 20, 50, 5])
+        return history
+
+    def test_should_keep_best_servers_per_country(self, history):
+        """Should keep best servers per country."""
+        # Given: servers in two countries, one without history
+        servers = [
+            {'country': 'UK', 'hostname': 'uk-1'},
+            {'country': 'UK', 'hostname': 'uk-new'},
+            {'country': 'UK', 'hostname': 'uk-2'},
+            {'country': 'UK', 'hostname': 'uk-3'},
+            {'country': 'US', 'hostname': 'us-1'},
+            {'country': 'US', 'hostname': 'us-2'},
+        ]
+
+        # When: keeping the top two per country
+        result = select_top(servers, history, per_country=2)
+
+        # Then: the fastest servers of each country should be kept, best first
+        assert [s['hostname'] for s in result] == ['uk-2', 'uk-3', 'us-2', 'us-1']
+
+    def test_should_rank_unknown_servers_last_in_original_order(self, history):
+        """Should rank unknown servers last in original order."""
+        # Given: servers without history around a known one
+        servers = [{'country': 'UK', 'hostname': 'uk-b'}, {'country': 'UK', 'hostname': 'uk-a'},
+                   {'country': 'UK', 'hostname': 'uk-2'}]
+
+        # When: ranking without a limit
+        result = select_top(servers, history)
+
+        # Then: the known server should come first
+        assert [s['hostname'] for s in result] == ['uk-2', 'uk-b', 'uk-a']
+
+
+class TestReadSamples:
+    """Test suite for read_samples function."""
+
+    def test_should_reject_invalid_sample(self):
+        """Should reject invalid sample."""
+        # Given/When/Then: a sample with a non-numeric RTT is rejected
+        with pytest.raises(ValueError):
+            read_samples([{'hostname': 'a', 'rtt_ms': 'fast'}])
+
+
+class TestRankServersScript:
+    """Test suite for the rank_servers script."""
+
+    def test_should_record_samples_and_list_ranking(self, tmp_path, monkeypatch, capsys):
+        """Should record samples and list ranking."""
+        from rank_servers import main
+
+        # Given: samples on stdin
+        samples = [{'hostname': 'slow', 'rtt_ms': 90}, {'hostname': 'fast', 'rtt_ms': 12.5},
+                   {'hostname': 'fast', 'rtt_ms': None}]
+        monkeypatch.setattr('sys.stdin', io.StringIO(''.join(json.dumps(s) + '\n' for s in samples)))
+
+        # When: recording them with JSON output
+        code = main([str(tmp_path / 'history.npz'), '--record', '--json'])
+
+        # Then: the history should be saved and servers listed best first
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert code == 0
+        assert (tmp_path / 'history.npz').exists()
+        assert [e['hostname'] for e in events if e['event'] == 'server'] == ['fast', 'slow']
+
+    def test_should_emit_valid_json_for_host_without_replies(self, tmp_path, monkeypatch, capsys):
+        """Should emit valid json for host without replies."""
+        from rank_servers import main
+
+        # Given: a host whose probes were all lost
+        samples = [{'hostname': 'down', 'rtt_ms': None}, {'hostname': 'down', 'rtt_ms': None}]
+        monkeypatch.setattr('sys.stdin', io.StringIO(''.join(json.dumps(s) + '\n' for s in samples)))
+
+        # When: recording them with JSON output
+        main([str(tmp_path / 'history.npz'), '--record', '--json'])
+
+        # Then: undefined statistics should be null and counts integers
+        lines = capsys.readouterr().out.splitlines()
+        events = [json.loads(line, parse_constant=pytest.fail) for line in lines]
+        server = next(e for e in events if e['event'] == 'server')
+        assert server['samples'] == 2 and isinstance(server['samples'], int)
+        assert server['received'] == 0 and isinstance(server['received'], int)
+        assert server['p50'] is None and server['ewma'] is None and server['score'] is None
+        assert server['availability'] == 0.0
@@ -0,0 +1,103 @@
+"""Unit tests for stream_utils module."""
+import io
+import json
+import pytest
+from utils.stream_utils import unique_servers, read_ndjson, write_ndjson
+
+
+class TestUniqueServers:
+    """Test suite for unique_servers function."""
+
+    def test_should_keep_first_server_for_each_hostname(self):
+        """Should keep first server for each hostname."""
+        # Given: servers with a repeated hostname
+        servers = [
+            {'hostname': 'us-01.jumptoserver.com', 'protocol': 'tcp'},
+            {'hostname': 'uk-01.jumptoserver.com', 'protocol': 'tcp'},
+            {'hostname': 'us-01.jumptoserver.com', 'protocol': 'udp'},
+        ]
+
+        # When: deduplicating
+        result = list(unique_servers(servers))
+
+        # Then: only the first occurrence of each hostname should remain
+        assert result == servers[:2]
+
+    def test_should_consume_input_lazily(self):
+        """Should consume input lazily."""
+        # Given: a generator recording how many servers were consumed
+        consumed = []
+
+        def servers():
+            for i in range(3):
+                consumed.append(i)
+                yield {'hostname': f"us-0{i}.jumptoserver.com"}
+
+        # When: taking only the first unique server
+        next(unique_servers(servers()))
+
+        # Then: only one server should have been consumed
+        assert consumed == [0]
+
+
+class TestReadNdjson:
+    """Test suite for read_ndjson function."""
+
+    def test_should_yield_one_server_per_line(self):
+        """Should yield one server per line."""
+        # Given: NDJSON lines with a blank line
+        lines = io.StringIO('{"hostname": "a"}\n\n{"hostname": "b"}\n')
+
+        # When: reading servers
+        result = list(read_ndjson(lines))
+
+        # Then: each non-empty line should be one server
+        assert result == [{'hostname': 'a'}, {'hostname': 'b'}]
+
+    def test_should_raise_value_error_with_line_number_when_invalid_json(self):
+        """Should raise value error with line number when invalid json."""
+        # Given: an invalid second line
+        lines = ['{"hostname": "a"}', '{not json']
+
+        # When/Then: reading should fail on line 2
+        with pytest.raises(ValueError, match='line 2'):
+            list(read_ndjson(lines))
+
+    def test_should_raise_value_error_when_line_is_not_object(self):
+        """Should raise value error when line is not object."""
+        # Given: a JSON array line
+        lines = ['["a"]']
+
+        # When/Then: reading should reject non-object lines
+        with pytest.raises(ValueError, match='expected an object'):
+            list(read_ndjson(lines))
+
+
+class TestWriteNdjson:
+    """Test suite for write_ndjson function."""
+
+    def test_should_write_one_line_per_server_and_return_count(self):
+        """Should write one line per server and return count."""
+        # Given: two servers and an output stream
+        servers = [{'hostname': 'a'}, {'hostname': 'b'}]
+        stream = io.StringIO()
+
+        # When: writing NDJSON
+        count = write_ndjson(iter(servers), stream)
+
+        # Then: each server should be one JSON line
+        assert count == 2
+        assert [json.loads(line) for line in stream.getvalue().splitlines()] == servers
+
+    def test_should_round_trip_with_read_ndjson(self):
+        """Should round trip with read ndjson."""
+        # Given: servers written as NDJSON
+        servers = [{'country': 'Brazil', 'city': 'São Paulo', 'hostname': 'br-01.jumptoserver.com'}]
+        stream = io.StringIO()
+        write_ndjson(servers, stream)
+
+        # When: reading them back
+        result = list(read_ndjson(io.StringIO(stream.getvalue())))
+
+        # Then: the servers should be unchanged
+        assert result == servers
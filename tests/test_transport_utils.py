@@ -0,0 +1,311 @@
+"""Unit tests for transport_utils module."""
+import argparse
+import io
+import sys
+import pytest
+from tests.fake_upstream import FakeUpstream, make_servers, render_table
+from utils.encoding_utils import accept_encoding
+from utils.output_utils import VERBOSE, Output
+from utils.transport_utils import (
+    RequestsTransport, UrllibTransport, Http2Transport, create_transport, add_transport_argument,
+    report_transfers,
+)
+
+
+@pytest.fixture
+def upstream():
+    """Provide a running local stand-in for the upstream site."""
+    with FakeUpstream(make_servers(3)) as upstream:
+        yield upstream
+
+
+class TestRequestsTransport:
+    """Test suite for RequestsTransport class."""
+
+    def test_should_return_body_text_when_posting(self, upstream):
+        """Should return body text when posting."""
+        # Given: a requests transport
+        with RequestsTransport() as transport:
+            # When: posting a protocol request
+            body = transport.post(upstream.url, {}, {'protocol': 'udp'})
+
+        # Then: the server table should be returned
+        assert 'us-0000.jumptoserver.com' in body
+
+    def test_should_raise_when_status_is_bad(self, upstream):
+        """Should raise when status is bad."""
+        # Given: a requests transport
+        with RequestsTransport() as transport:
+            # When/Then: posting an unknown protocol raises an HTTP error
+            with pytest.raises(Exception):
+                transport.post(upstream.url, {}, {'protocol': 'bogus'})
+
+    def test_should_return_results_in_order_when_posting_many(self, upstream):
+        """Should return results in order when posting many."""
+        # Given: a requests transport
+        with RequestsTransport() as transport:
+            # When: posting a good and a bad payload
+            results = transport.post_many(upstream.url, {}, [{'protocol': 'udp'}, {'protocol': 'bogus'}])
+
+        # Then: the good result is text and the bad one an exception
+        assert 'jumptoserver.com' in results[0]
+        assert isinstance(results[1], Exception)
+
+    def test_should_close_response_when_encoding_unsupported(self):
+        """Should close response when encoding unsupported."""
+        # Given: a streamed response in an encoding that cannot be decoded
+        class Response:
+            headers = {'Content-Encoding': 'compress', 'Content-Type': 'text/html'}
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        response = Response()
+        with RequestsTransport() as transport:
+            # When/Then: reading it fails and the response is closed
+            with pytest.raises(ValueError, match="Unsupported Content-Encoding 'compress'"):
+                list(transport._iter_text('POST', 'http://example/', response))
+        assert response.closed
+
+    def test_should_reuse_connection_across_requests(self, upstream):
+        """Should reuse connection across requests."""
+        # Given: a requests transport
+        with RequestsTransport() as transport:
+            # When: sending a warmup GET and several POSTs
+            transport.get(upstream.referer_url, {})
+            transport.post_many(upstream.url, {}, [{'protocol': p} for p in ('tcp', 'udp', 'ikev2')])
+
+        # Then: a single keep-alive connection should be used
+        assert upstream.connections == 1
+
+
+class TestUrllibTransport:
+    """Test suite for UrllibTransport class."""
+
+    def test_should_send_warmup_cookie_with_later_posts(self, upstream):
+        """Should send warmup cookie with later posts."""
+        # Given: a urllib transport that visited the referer
+        with UrllibTransport() as transport:
+            transport.get(upstream.referer_url, {})
+
+            # When: posting a protocol request
+            body = transport.post(upstream.url, {}, {'protocol': 'udp'})
+
+        # Then: the server table should be returned and the cookie sent back
+        assert 'us-0000.jumptoserver.com' in body
+        assert upstream.request_headers[1]['cookie'] == 'wp=1'
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+    def test_should_decode_compressed_body_in_chunks(self, encoding):
+        """Should decode compressed body in chunks."""
+        # Given: a stand-in compressing a large table
+        with FakeUpstream(make_servers(500), content_encoding=encoding) as upstream:
+            transport = UrllibTransport()
+            transport.chunk_size = 1024
+
+            # When: streaming the response
+            chunks = list(transport.post_chunks(upstream.url, {'Accept-Encoding': 'br'}, {'protocol': 'udp'}))
+
+        # Then: only decodable encodings should be offered and the text rebuilt
+        assert upstream.request_headers[0]['accept-encoding'] == accept_encoding()
+        assert len(chunks) > 1
+        assert ''.join(chunks) == render_table(make_servers(500))
+
+    def test_should_not_send_request_until_chunks_iterated(self, upstream):
+        """Should not send request until chunks iterated."""
+        # Given: a chunk iterator for a POST
+        with UrllibTransport() as transport:
+            chunks = transport.post_chunks(upstream.url, {}, {'protocol': 'udp'})
+
+            # When/Then: nothing is sent before iterating
+            assert upstream.requests == []
+            next(chunks)
+            chunks.close()
+        assert upstream.requests == [('POST', 'udp')]
+
+    def test_should_raise_when_status_is_bad(self, upstream):
+        """Should raise when status is bad."""
+        # Given: a urllib transport
+        with UrllibTransport() as transport:
+            # When/Then: posting an unknown protocol raises an HTTP error
+            with pytest.raises(Exception):
+                transport.post(upstream.url, {}, {'protocol': 'bogus'})
+
+
+class TestHttp2Transport:
+    """Test suite for Http2Transport class."""
+
+    def test_should_return_results_in_order_when_posting_many(self, upstream):
+        """Should return results in order when posting many."""
+        # Given: an http2 transport (falls back to HTTP/1.1 on the local stand-in)
+        pytest.importorskip('httpx')
+        with Http2Transport() as transport:
+            # When: posting several payloads concurrently
+            transport.get(upstream.referer_url, {'Connection': 'keep-alive'})
+            results = transport.post_many(upstream.url, {}, [{'protocol': 'tcp'}, {'protocol': 'bogus'}])
+
+        # Then: results should keep payload order
+        assert 'jumptoserver.com' in results[0]
+        assert isinstance(results[1], Exception)
+
+    def test_should_drop_connection_specific_headers(self):
+        """Should drop connection specific headers."""
+        # Given: an http2 transport
+        pytest.importorskip('httpx')
+        with Http2Transport() as transport:
+            # When: filtering request headers
+            headers = transport._headers({'Connection': 'keep-alive', 'Accept': '*/*'})
+
+        # Then: only end-to-end headers and the negotiated encodings should remain
+        assert headers == {'Accept': '*/*', 'Accept-Encoding': accept_encoding()}
+
+    def test_should_raise_runtime_error_and_close_loop_when_h2_missing(self, monkeypatch):
+        """Should raise runtime error and close loop when h2 missing."""
+        # Given: httpx installed without the h2 package
+        pytest.importorskip('httpx')
+        import asyncio
+        loops = []
+        original = asyncio.new_event_loop
+
+        def new_event_loop():
+            loops.append(original())
+            return loops[-1]
+
+        monkeypatch.setitem(sys.modules, 'h2', None)
+        monkeypatch.setattr(asyncio, 'new_event_loop', new_event_loop)
+
+        # When/Then: creating the transport reports the install hint
+        with pytest.raises(RuntimeError, match=r"pip install 'httpx\[http2\]'"):
+            Http2Transport()
+        assert loops[0].is_closed()
+
+
+class TestCreateTransport:
+    """Test suite for create_transport function."""
+
+    def test_should_create_requests_transport_by_default(self):
+        """Should create requests transport by default."""
+        # Given/When: creating the default transport
+        with create_transport() as transport:
+            # Then: it should be a requests transport
+            assert isinstance(transport, RequestsTransport)
+
+    def test_should_raise_value_error_when_name_unknown(self):
+        """Should raise value error when name unknown."""
+        # Given/When/Then: an unknown transport name is rejected
+        with pytest.raises(ValueError, match="Invalid transport 'ftp'"):
+            create_transport('ftp')
+
+    def test_should_default_transport_argument_to_requests(self):
+        """Should default transport argument to requests."""
+        # Given: a parser with the transport option
+        parser = argparse.ArgumentParser()
+        add_transport_argument(parser)
+
+        # When: parsing no arguments
+        args = parser.parse_args([])
+
+        # Then: the default transport should be requests
+        assert args.transport == 'requests'
+
+    def test_should_default_to_urllib_when_requests_missing(self, monkeypatch):
+        """Should default to urllib when requests missing."""
+        # Given: requests is not installed
+        monkeypatch.setitem(sys.modules, 'requests', None)
+
+        # When: creating the default transport
+        with create_transport() as transport:
+            # Then: the standard-library transport should be used
+            assert isinstance(transport, UrllibTransport)
+
+
+def require_encoding(encoding):
+    """Skip the test when no module for ``encoding`` is installed."""
+    if encoding not in accept_encoding().split(', '):
+        pytest.skip(f"no {encoding} module installed")
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate', 'br', 'zstd'])
+@pytest.mark.parametrize('name', ['requests', 'urllib', 'http2'])
+class TestCompressedTransfers:
+    """Test suite for content encodings across transports."""
+
+    def test_should_decode_body_and_record_bytes(self, name, encoding):
+        """Should decode body and record bytes."""
+        # Given: a stand-in compressing a large table with the encoding
+        require_encoding(encoding)
+        if name == 'http2':
+            pytest.importorskip('httpx')
+        servers = make_servers(300)
+        with FakeUpstream(servers, content_encoding=encoding) as upstream:
+            with create_transport(name) as transport:
+                transport.chunk_size = 1024
+
+                # When: posting a protocol request
+                body = transport.post(upstream.url, {'Accept-Encoding': 'identity'}, {'protocol': 'udp'})
+
+        # Then: the table should be rebuilt and both byte counts recorded
+        assert body == render_table(servers)
+        assert upstream.request_headers[0]['accept-encoding'] == accept_encoding()
+        [transfer] = transport.transfers
+        assert transfer['method'] == 'POST'
+        assert transfer['encoding'] == encoding
+        assert transfer['body_bytes'] == len(body.encode())
+        assert transfer['wire_bytes'] < transfer['body_bytes']
+
+    def test_should_stream_chunks_when_supported(self, name, encoding):
+        """Should stream chunks when supported."""
+        # Given: a transport yielding text while the body downloads
+        require_encoding(encoding)
+        if name == 'http2':
+            pytest.skip('http2 transport reads whole bodies')
+        # Large enough for zstd, which emits whole 128 KiB blocks
+        servers = make_servers(2000)
+        with FakeUpstream(servers, content_encoding=encoding) as upstream:
+            with create_transport(name) as transport:
+                transport.chunk_size = 512
+
+                # When: iterating the chunks of a POST
+                chunks = list(transport.post_chunks(upstream.url, {}, {'protocol': 'udp'}))
+
+        # Then: the body should arrive in several decoded pieces
+        assert len(chunks) > 1
+        assert ''.join(chunks) == render_table(servers)
+
+
+class TestReportTransfers:
+    """Test suite for report_transfers function."""
+
+    def test_should_report_totals_and_each_request(self):
+        """Should report totals and each request."""
+        # Given: a transport with two recorded transfers
+        class Recorded:
+            transfers = [
+                {'method': 'GET', 'url': 'http://a/', 'encoding': 'identity', 'wire_bytes': 100, 'body_bytes': 100},
+                {'method': 'POST', 'url': 'http://a/p', 'encoding': 'gzip', 'wire_bytes': 2048, 'body_bytes': 20480},
+            ]
+        stream = io.StringIO()
+        output = Output(VERBOSE, stream=stream)
+
+        # When: reporting them
+        report_transfers(Recorded(), output)
+        output.flush()
+
+        # Then: each request and the totals should be printed
+        lines = stream.getvalue().splitlines()
+        assert lines[1] == 'POST http://a/p: 2.0 KiB received, 20.0 KiB decoded (gzip)'
+        assert lines[2] == 'Transferred 2.1 KiB for 20.1 KiB of content in 2 requests (10%)'
+
+    def test_should_report_nothing_without_transfers(self):
+        """Should report nothing without transfers."""
+        # Given: a transport that recorded nothing
+        stream = io.StringIO()
+
+        # When: reporting it
+        output = Output(VERBOSE, stream=stream)
+        report_transfers(object(), output)
+        output.flush()
+
+        # Then: nothing should be printed
+        assert stream.getvalue() == ''
@@ -0,0 +1,111 @@
+import ipaddress
+import re
+from functools import lru_cache
+
+# Private, link-local and multicast ranges excluded by --exclude-lan
+LAN_RANGES = (
+    '10.0.0.0/8',
+    '172.16.0.0/12',
+    '192.168.0.0/16',
+    '169.254.0.0/16',
+    '224.0.0.0/4',
+    'fc00::/7',
+    'fe80::/10',
+    'ff00::/8',
+)
+
+
+def parse_allowed_ips(template_content):
+    """Return the networks listed on the template's AllowedIPs line."""
+    match = re.search(r'^AllowedIPs = (.*)$', template_content, re.MULTILINE)
+    if not match:
+        return []
+    return [part.strip() for part in match.group(1).split(',') if part.strip()]
+
+
+def split_tunnel_allowed_ips(allowed, excluded):
+    """Return the minimal CIDR list covering ``allowed`` minus ``excluded``.
+
+    Both arguments are iterables of network strings (IPv4 and IPv6 may be
+    mixed). Excluded ranges outside every allowed network are ignored.
+    Results are cached by input, so repeated calls with the same exclusion
+    set are cheap. Raises ValueError for invalid networks and when nothing
+    is left to route, since an empty AllowedIPs line disables the tunnel.
+    """
+    result = list(_split_tunnel(tuple(allowed), tuple(excluded)))
+    if not result:
+        raise ValueError('exclusions cover every allowed network')
+    return result
+
+
+@lru_cache(maxsize=256)
+def _split_tunnel(allowed, excluded):
+    # Cache on the raw strings first, then on the normalized sets, so that
+    # differently spelled but equal exclusion lists share one computation
+    return _split_tunnel_normalized(_normalize(allowed), _normalize(excluded))
+
+
+def _normalize(networks):
+    return frozenset(ipaddress.ip_network(network.strip(), strict=False) for network in networks)
+
+
+@lru_cache(maxsize=256)
+def _split_tunnel_normalized(allowed, excluded):
+    result = []
+    for version, max_bits, network_class in ((4, 32, ipaddress.IPv4Network), (6, 128, ipaddress.IPv6Network)):
+        base = _merge(_intervals(n for n in allowed if n.version == version))
+        if not base:
+            continue
+        holes = _merge(_intervals(n for n in excluded if n.version == version))
+        for start, end in _subtract(base, holes):
+            for address, prefix in _range_to_cidrs(start, end, max_bits):
+                result.append(str(network_class((address, prefix))))
+    return tuple(result)
+
+
+def _intervals(networks):
+    return [(int(n.network_address), int(n.broadcast_address)) for n in networks]
+
+
+def _merge(intervals):
+    """Merge overlapping or adjacent [start, end] intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _subtract(base, holes):
+    """Subtract sorted, merged ``holes`` from sorted, merged ``base`` in one pass."""
+    result = []
+    first = 0
+    for start, end in base:
+        current = start
+        while first < len(holes) and holes[first][1] < current:
+            first += 1
+        index = first
+        while index < len(holes) and holes[index][0] <= end:
+            hole_start, hole_end = holes[index]
+            if hole_start > current:
+                result.append((current, hole_start - 1))
+            current = max(current, hole_end + 1)
+            index += 1
+        if current <= end:
+            result.append((current, end))
+    return result
+
+
+def _range_to_cidrs(start, end, max_bits):
+    """Yield (address, prefix) blocks exactly covering [start, end]."""
+    while start <= end:
+        # Largest block aligned at start that does not pass end
+        size = start & -start if start else 1 << max_bits
+        remaining = end - start + 1
+        while size > remaining:
+            size >>= 1
+        yield start, max_bits - (size.bit_length() - 1)
+        start += size
@@ -0,0 +1,133 @@
+"""Compact bundle of generated configs, with a standalone expander.
+
+A bundle stores the compiled template once (the text around the Endpoint
+hostname) plus a table with one row per server: the hostname, front-coded
+against the previous row, and the filename when it differs from the
+hostname prefix. The table is zlib-compressed.
+
+This module only uses the standard library, so it can be copied alone to a
+device and run there::
+
+    python3 bundle_utils.py configs.fvb --list
+    python3 bundle_utils.py configs.fvb uk-london.conf
+    python3 bundle_utils.py configs.fvb --all -o /etc/wireguard
+"""
+import argparse
+import json
+import sys
+import zlib
+from pathlib import Path
+
+MAGIC = b'FVB1\n'
+
+
+def default_filename(hostname):
+    return f"{hostname.split('.')[0]}.conf"
+
+
+def encode_bundle(template_parts, entries):
+    """Return bundle bytes for ``(filename, hostname)`` entries.
+
+    ``template_parts`` is the template split at each hostname slot.
+    """
+    rows = sorted(entries, key=lambda entry: entry[1])
+    lines = [json.dumps({'parts': list(template_parts), 'count': len(rows)})]
+    previous = ''
+    for filename, hostname in rows:
+        shared = 0
+        limit = min(len(previous), len(hostname), 255)
+        while shared < limit and previous[shared] == hostname[shared]:
+            shared += 1
+        stored_filename = '' if filename == default_filename(hostname) else filename
+        lines.append(f"{shared}\t{hostname[shared:]}\t{stored_filename}")
+        previous = hostname
+    return MAGIC + zlib.compress('\n'.join(lines).encode(), 9)
+
+
+def write_bundle(path, template_parts, entries):
+    """Write a bundle file and return the number of configs in it."""
+    entries = list(entries)
+    Path(path).write_bytes(encode_bundle(template_parts, entries))
+    return len(entries)
+
+
+class Bundle:
+    """A decoded bundle; configs are rendered on demand."""
+
+    def __init__(self, data):
+        if not data.startswith(MAGIC):
+            raise ValueError('Not a config bundle')
+        lines = zlib.decompress(data[len(MAGIC):]).decode().split('\n')
+        header = json.loads(lines[0])
+        self.parts = header['parts']
+        self.hostnames = {}  # filename -> hostname, in bundle order
+
+        previous = ''
+        for line in lines[1:header['count'] + 1]:
+            shared, rest, filename = line.split('\t')
+            hostname = previous[:int(shared)] + rest
+            self.hostnames[filename or default_filename(hostname)] = hostname
+            previous = hostname
+
+    @classmethod
+    def load(cls, path):
+        return cls(Path(path).read_bytes())
+
+    def names(self):
+        return list(self.hostnames)
+
+    def resolve(self, name):
+        """Return the filename for a filename, filename without .conf, or hostname."""
+        if name in self.hostnames:
+            return name
+        if f"{name}.conf" in self.hostnames:
+            return f"{name}.conf"
+        for filename, hostname in self.hostnames.items():
+            if hostname == name:
+                return filename
+        raise KeyError(name)
+
+    def render(self, name):
+        """Return the config text for a filename or hostname."""
+        return self.hostnames[self.resolve(name)].join(self.parts)
+
+    def expand_all(self, directory):
+        """Write every config into ``directory`` and return how many were written."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for filename, hostname in self.hostnames.items():
+            (directory / filename).write_text(hostname.join(self.parts))
+        return len(self.hostnames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Expand configs from a bundle')
+    parser.add_argument('bundle', type=Path, help='Bundle file')
+    parser.add_argument('name', nargs='?', help='Config filename or hostname to print')
+    parser.add_argument('--list', action='store_true', help='List config filenames')
+    parser.add_argument('--all', action='store_true', help='Write every config to the output directory')
+    parser.add_argument('-o', '--output-dir', type=Path, default=Path('.'), help='Output directory (default: .)')
+    args = parser.parse_args(argv)
+
+    try:
+        bundle = Bundle.load(args.bundle)
+        if args.list:
+            sys.stdout.write(''.join(f"{name}\n" for name in bundle.names()))
+        elif args.all:
+            count = bundle.expand_all(args.output_dir)
+            print(f"Expanded {count} configs into '{args.output_dir}'", file=sys.stderr)
+        elif args.name:
+            sys.stdout.write(bundle.render(args.name))
+        else:
+            parser.error('give a config name, --list or --all')
+    except KeyError as e:
+        print(f"Error: no config named {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, zlib.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from utils.file_utils import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def default_cache_dir():
+    """Return $FASTESTVPN_CACHE_DIR, or a directory under the user cache."""
+    if os.environ.get('FASTESTVPN_CACHE_DIR'):
+        return Path(os.environ['FASTESTVPN_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'fastestvpn-config-generator'
+
+
+class FileLock:
+    """Non-blocking exclusive lock on a file.
+
+    The lock is held through an open file descriptor, so the operating
+    system releases it when the owner exits or crashes; a dead process
+    never leaves a stale lock behind. The owner's pid is written into the
+    file for diagnostics.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+
+    def try_acquire(self):
+        """Acquire the lock if it is free; return whether it was acquired."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+
+class CatalogCache:
+    """Cross-process single-flight cache of JSON values in a directory.
+
+    get() returns a value published by any process no earlier than
+    ``max_age`` seconds before the call started. Otherwise one process
+    takes the lock and refreshes while concurrent callers wait and then
+    reuse its result. If the lock holder hangs for ``wait_timeout``
+    seconds, waiters refresh on their own rather than block forever.
+    get_many() does the same for several values refreshed together.
+    """
+
+    def __init__(self, directory, max_age=0, wait_timeout=120, poll_interval=0.05):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def path(self, name):
+        return self.directory / f"{name}.json"
+
+    def get(self, name, refresh):
+        """Return the cached value for ``name``, calling refresh() in at most one process."""
+        return self.get_many([name], lambda names: {name: refresh()})[name]
+
+    def get_many(self, names, refresh):
+        """Return {name: value} for several names, refreshing the stale ones together.
+
+        ``refresh(stale)`` is called with the names this process holds the
+        locks of and returns {name: value}. A value that is an exception is
+        returned but not published, so the next caller refreshes that name
+        again. Locks are taken in sorted order, stopping at the first one
+        held elsewhere, so callers asking for overlapping names never
+        refresh the same name at once.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        not_before = time.time() - self.max_age
+        deadline = time.monotonic() + self.wait_timeout
+        values = {}
+        pending = sorted(set(names))
+
+        while True:
+            for name in pending:
+                value = self._read(self.path(name), not_before)
+                if value is not None:
+                    values[name] = value
+            pending = [name for name in pending if name not in values]
+            if not pending:
+                return values
+
+            locks = {}
+            for name in pending:
+                lock = FileLock(self.directory / f"{name}.lock")
+                if not lock.try_acquire():
+                    break
+                locks[name] = lock
+            if locks:
+                try:
+                    # Another process may have published while we waited
+                    stale = [name for name in locks if self._read(self.path(name), not_before) is None]
+                    if stale:
+                        values.update(self._refresh(stale, refresh))
+                finally:
+                    for lock in locks.values():
+                        lock.release()
+                continue
+
+            if time.monotonic() >= deadline:
+                values.update(self._refresh(pending, refresh))
+                return values
+            time.sleep(self.poll_interval)
+
+    def read(self, name, max_age=None):
+        """Return the cached value if it is younger than ``max_age`` seconds (any age by default)."""
+        not_before = 0 if max_age is None else time.time() - max_age
+        return self._read(self.path(name), not_before)
+
+    def _refresh(self, names, refresh):
+        results = refresh(names)
+        for name in names:
+            if not isinstance(results[name], Exception):
+                self._publish(self.path(name), results[name])
+        return {name: results[name] for name in names}
+
+    def _read(self, path, not_before):
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('published_at', 0) < not_before:
+            return None
+        return entry.get('value')
+
+    def _publish(self, path, value):
+        # Readers never see a partial catalog
+        with atomic_write(path, fsync=True) as f:
+            json.dump({'published_at': time.time(), 'value': value}, f)
+
+
+def add_cache_arguments(parser):
+    """Add the shared catalog cache options to an argparse parser."""
+    parser.add_argument('--cache', action='store_true',
+                        help='Share server catalogs between concurrent runs through the cache directory')
+    parser.add_argument('--cache-dir', type=Path, metavar='DIR',
+                        help=f"Cache directory, implies --cache (default: {default_cache_dir()})")
+    parser.add_argument('--max-age', type=float, default=0, metavar='SECONDS',
+                        help='Reuse a cached catalog up to this old (default: 0, only share concurrent refreshes)')
+
+
+def cache_from_args(args):
+    """Build a CatalogCache from options added by add_cache_arguments, or None."""
+    if not (args.cache or args.cache_dir):
+        return None
+    return CatalogCache(args.cache_dir or default_cache_dir(), max_age=args.max_age)
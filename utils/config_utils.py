@@ -14,3 +14,20 @@ def generate_config(template_content, server):
     )
 
     return config
+
+def compile_template(template_content):
+    """Split the template at each hostname slot.
+
+    Joining the parts with a hostname gives the same text as
+    generate_config() for that hostname.
+    """
+    slot = '\0'
+    return generate_config(template_content, {'hostname': slot}).split(slot)
+
+def set_allowed_ips(template_content, allowed_ips):
+    """Replace the AllowedIPs line with the given networks."""
+    return re.sub(
+        r'AllowedIPs = .*',
+        lambda match: f"AllowedIPs = {', '.join(allowed_ips)}",
+        template_content
+    )
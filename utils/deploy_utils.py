@@ -0,0 +1,205 @@
+import fnmatch
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# ubus session id used before logging in
+ANONYMOUS_SESSION = '00000000000000000000000000000000'
+
+# ubus status codes (libubus UBUS_STATUS_*)
+UBUS_STATUS_NOT_FOUND = 4
+
+# Configs hold the WireGuard private key: readable by the owner only
+CONFIG_FILE_MODE = 0o600
+
+
+class UbusError(RuntimeError):
+    """A ubus call failed; ``code`` holds the ubus status when known."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class UbusClient:
+    """Client for an OpenWrt router's ubus JSON-RPC API (``/ubus`` via rpcd).
+
+    Calls share one requests session, so they reuse a single keep-alive
+    connection. File calls need the rpcd ``file`` plugin and an ACL that
+    allows ``file.md5`` and ``file.write`` on the target paths.
+    """
+
+    def __init__(self, url, username, password, timeout=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url.rstrip('/') + '/ubus'
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session_id = ANONYMOUS_SESSION
+        self._ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def call(self, obj, method, params=None):
+        """Call ``obj.method`` and return its result data (a dict)."""
+        request = {
+            'jsonrpc': '2.0',
+            'id': next(self._ids),
+            'method': 'call',
+            'params': [self.session_id, obj, method, params or {}],
+        }
+        response = self.session.post(self.url, json=request, timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+
+        if 'error' in body:
+            raise UbusError(f"ubus {obj}.{method}: {body['error'].get('message', 'error')}")
+        code, *data = body['result']
+        if code != 0:
+            raise UbusError(f"ubus {obj}.{method} failed with status {code}", code)
+        return data[0] if data else {}
+
+    def login(self):
+        result = self.call('session', 'login', {'username': self.username, 'password': self.password})
+        self.session_id = result['ubus_rpc_session']
+
+    def md5(self, path):
+        """Return the MD5 of a remote file, or None if it does not exist."""
+        try:
+            return self.call('file', 'md5', {'path': path}).get('md5')
+        except UbusError as e:
+            if e.code == UBUS_STATUS_NOT_FOUND:
+                return None
+            raise
+
+    def write(self, path, data, mode=CONFIG_FILE_MODE):
+        """Write a remote file, created with ``mode`` rather than rpcd's default."""
+        self.call('file', 'write', {'path': path, 'data': data, 'mode': mode})
+
+    def close(self):
+        self.session.close()
+
+
+def load_routers(path):
+    """Load the router inventory from a JSON file.
+
+    The file holds a list of routers, each with ``name``, ``url``,
+    ``username`` and either ``password`` or ``password_env`` (the name of
+    an environment variable). Optional keys are ``configs`` (filenames or
+    glob patterns, default all ``*.conf``) and ``path`` (remote directory,
+    default ``/etc/wireguard``). Raises ValueError for invalid entries.
+    """
+    with open(path) as f:
+        routers = json.load(f)
+    if not isinstance(routers, list):
+        raise ValueError(f"Router inventory '{path}' must be a list")
+
+    for index, router in enumerate(routers):
+        missing = [key for key in ('name', 'url', 'username') if key not in router]
+        if missing:
+            raise ValueError(f"Router {index} is missing: {', '.join(missing)}")
+        if 'password' not in router:
+            if 'password_env' not in router:
+                raise ValueError(f"Router '{router['name']}' needs 'password' or 'password_env'")
+            router['password'] = os.environ.get(router['password_env'], '')
+    return routers
+
+
+def load_configs(config_dir):
+    """Return {filename: (content, md5)} for every config in config_dir."""
+    configs = {}
+    for path in sorted(Path(config_dir).glob('*.conf')):
+        content = path.read_text()
+        configs[path.name] = (content, hashlib.md5(content.encode()).hexdigest())
+    return configs
+
+
+def select_configs(configs, patterns=None):
+    """Return the subset of configs whose filename matches any pattern."""
+    patterns = patterns or ['*.conf']
+    return {
+        filename: config for filename, config in configs.items()
+        if any(fnmatch.fnmatch(filename, pattern) for pattern in patterns)
+    }
+
+
+def deploy_router(router, configs, dry_run=False, timeout=10):
+    """Push changed configs to one router and return its report.
+
+    ``configs`` comes from load_configs() and is narrowed by the router's
+    ``configs`` patterns. Each remote file's MD5 is compared with the local
+    one first, so unchanged configs are not sent. The report is a dict with ``router``,
+    ``pushed``, ``unchanged``, ``failed`` (filename to error), ``error``
+    (set when the router could not be reached or logged into) and
+    ``seconds``.
+    """
+    started = time.monotonic()
+    report = {'router': router['name'], 'pushed': [], 'unchanged': [], 'failed': {}, 'error': None}
+    configs = select_configs(configs, router.get('configs'))
+    remote_dir = router.get('path', '/etc/wireguard').rstrip('/')
+
+    try:
+        with UbusClient(router['url'], router['username'], router['password'], timeout) as client:
+            client.login()
+            for filename, (content, md5) in configs.items():
+                remote_path = f"{remote_dir}/{filename}"
+                try:
+                    if client.md5(remote_path) == md5:
+                        report['unchanged'].append(filename)
+                        continue
+                    if not dry_run:
+                        client.write(remote_path, content)
+                    report['pushed'].append(filename)
+                except UbusError as e:
+                    report['failed'][filename] = str(e)
+    except Exception as e:
+        report['error'] = str(e)
+
+    report['seconds'] = time.monotonic() - started
+    return report
+
+
+def deploy_routers(routers, config_dir, max_workers=8, dry_run=False, timeout=10, on_report=None):
+    """Deploy to all routers with at most ``max_workers`` in flight.
+
+    Configs are read from config_dir once and shared by all routers.
+    Returns the reports in inventory order. ``on_report`` is called in the
+    calling thread with each report as soon as its router finishes.
+    """
+    configs = load_configs(config_dir)
+    reports = [None] * len(routers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(deploy_router, router, configs, dry_run, timeout): index
+            for index, router in enumerate(routers)
+        }
+        for future in as_completed(futures):
+            report = future.result()
+            reports[futures[future]] = report
+            if on_report is not None:
+                on_report(report)
+    return reports
+
+
+def summarize(reports):
+    """Return totals across router reports."""
+    return {
+        'routers': len(reports),
+        'routers_failed': sum(1 for r in reports if r['error'] or r['failed']),
+        'pushed': sum(len(r['pushed']) for r in reports),
+        'unchanged': sum(len(r['unchanged']) for r in reports),
+        'failed': sum(len(r['failed']) for r in reports),
+    }
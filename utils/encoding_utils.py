@@ -0,0 +1,181 @@
+import codecs
+import importlib.util
+import zlib
+
+# Content encodings we can offer, in Accept-Encoding order, with the modules
+# able to decode each one (the first one installed is used)
+ENCODING_MODULES = {
+    'gzip': ['zlib'],
+    'deflate': ['zlib'],
+    'br': ['brotli', 'brotlicffi'],
+    'zstd': ['compression.zstd', 'zstandard'],
+}
+
+
+def _find_module(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _decoder_module(encoding):
+    for name in ENCODING_MODULES[encoding]:
+        if _find_module(name):
+            return name
+    return None
+
+
+def decodable_encodings():
+    """Return the content encodings that can be decoded with the installed modules."""
+    return [encoding for encoding in ENCODING_MODULES if _decoder_module(encoding)]
+
+
+def accept_encoding():
+    """Return an Accept-Encoding value offering only decodable encodings."""
+    return ', '.join(decodable_encodings())
+
+
+def content_charset(content_type, default='utf-8'):
+    """Return the charset parameter of a Content-Type header value."""
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return default
+
+
+class _DeflateDecoder:
+    """Decode 'deflate', accepting both zlib-wrapped and raw streams."""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj()
+        self._started = False
+
+    def decompress(self, data):
+        if not self._started and data:
+            self._started = True
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _ZlibDecoder:
+    def __init__(self, wbits):
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def decompress(self, data):
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self, module):
+        brotli = importlib.import_module(module)
+        self._decompressor = brotli.Decompressor()
+        # brotli calls it process(), brotlicffi decompress()
+        self._process = getattr(self._decompressor, 'process', None) or self._decompressor.decompress
+
+    def decompress(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return b''
+
+
+class _ZstdDecoder:
+    def __init__(self, module):
+        zstd = importlib.import_module(module)
+        if module == 'zstandard':
+            self._decompressor = zstd.ZstdDecompressor().decompressobj()
+        else:
+            self._decompressor = zstd.ZstdDecompressor()
+
+    def decompress(self, data):
+        return self._decompressor.decompress(data) if data else b''
+
+    def flush(self):
+        return b''
+
+
+def make_decoder(encoding):
+    """Return an incremental decoder for one content encoding.
+
+    Raises ValueError when the encoding is unknown or its module is not
+    installed.
+    """
+    encoding = encoding.strip().lower()
+    if encoding == 'gzip' or encoding == 'x-gzip':
+        return _ZlibDecoder(31)
+    if encoding == 'deflate':
+        return _DeflateDecoder()
+    module = _decoder_module(encoding) if encoding in ENCODING_MODULES else None
+    if module is None:
+        raise ValueError(f"Unsupported Content-Encoding '{encoding}'")
+    if encoding == 'br':
+        return _BrotliDecoder(module)
+    return _ZstdDecoder(module)
+
+
+class BodyDecoder:
+    """Turn a response body into text, chunk by chunk.
+
+    Content encodings listed in ``content_encoding`` (the header value,
+    which may name several) are undone in reverse order, then the bytes
+    are decoded with ``charset`` (UTF-8 by default). ``wire_bytes`` and
+    ``body_bytes`` count the bytes received and after decompression.
+    """
+
+    def __init__(self, content_encoding=None, charset=None):
+        encodings = [e.strip().lower() for e in (content_encoding or '').split(',') if e.strip()]
+        self.encoding = ', '.join(encodings) or 'identity'
+        self._decoders = [make_decoder(e) for e in reversed(encodings) if e != 'identity']
+        self._text = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+        self.wire_bytes = 0
+        self.body_bytes = 0
+
+    def feed(self, data):
+        """Decode one received chunk and return the text it completes."""
+        self.wire_bytes += len(data)
+        for decoder in self._decoders:
+            data = decoder.decompress(data)
+        self.body_bytes += len(data)
+        return self._text.decode(data)
+
+    def finish(self):
+        """Return the text left once the body has been received."""
+        data = b''
+        for decoder in self._decoders:
+            data = decoder.decompress(data) + decoder.flush()
+        self.body_bytes += len(data)
+        return self._text.decode(data, final=True)
+
+    def record(self, method, url):
+        """Return the transfer record of the decoded body."""
+        return {
+            'method': method,
+            'url': url,
+            'encoding': self.encoding,
+            'wire_bytes': self.wire_bytes,
+            'body_bytes': self.body_bytes,
+        }
+
+
+def summarize_transfers(transfers):
+    """Return totals across transfer records."""
+    wire_bytes = sum(t['wire_bytes'] for t in transfers)
+    body_bytes = sum(t['body_bytes'] for t in transfers)
+    return {
+        'requests': len(transfers),
+        'wire_bytes': wire_bytes,
+        'body_bytes': body_bytes,
+        'ratio': wire_bytes / body_bytes if body_bytes else 1.0,
+    }
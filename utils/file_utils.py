@@ -0,0 +1,29 @@
+import contextlib
+import os
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', fsync=False):
+    """Open a file that replaces ``path`` once the block completes.
+
+    Data goes to a uniquely named temporary file in the same directory,
+    which is renamed over ``path`` on success and removed on error. Readers
+    see the old file or the new one, never a partial write, and concurrent
+    writers never share a temporary file. With ``fsync`` the data is on
+    disk before the rename.
+    """
+    path = os.fspath(path)
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or '.', prefix=f".{name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
@@ -22,3 +22,38 @@ def generate_filename(server):
         name = sanitize_filename(server['country']) + "-" + name
 
     return f"{name}.conf"
+
+
+def name_configs(servers, output=None):
+    """Yield (filename, server) for each server, numbering duplicate filenames.
+
+    Servers whose filename cannot be generated are reported to ``output``
+    and skipped.
+    """
+    filename_counter = {}  # Track duplicate filenames
+
+    for server in servers:
+        try:
+            # Generate the base filename
+            base_filename = generate_filename(server)
+        except Exception as e:
+            if output is not None:
+                output.error(
+                    'error',
+                    f"Error generating config for {server.get('hostname', 'unknown')}: {e}",
+                    hostname=server.get('hostname'),
+                    error=str(e),
+                )
+            continue
+
+        # Handle duplicate filenames by adding a counter
+        if base_filename in filename_counter:
+            filename_counter[base_filename] += 1
+            # Insert counter before .conf extension
+            name_without_ext = base_filename[:-5]  # Remove .conf
+            filename = f"{name_without_ext}-{filename_counter[base_filename]}.conf"
+        else:
+            filename_counter[base_filename] = 1
+            filename = base_filename
+
+        yield filename, server
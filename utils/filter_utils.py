@@ -0,0 +1,84 @@
+import argparse
+import re
+
+
+class ServerFilter:
+    """Server predicate pushed down into the row parser.
+
+    A row matches when its country is one of ``countries`` (case-insensitive),
+    its city matches the ``city`` regex and its hostname prefix contains every
+    tag in ``tags`` as a dash-separated part (e.g. 'stream' or 'p2p'). Unset
+    criteria match everything. ``protocols`` limits which protocols are
+    fetched at all. Rows rejected by accepts() are counted in ``pruned``.
+    """
+
+    def __init__(self, countries=None, city=None, tags=None, protocols=None):
+        self.countries = {country.casefold() for country in countries} if countries else None
+        if isinstance(city, str):
+            city = re.compile(city, re.IGNORECASE)
+        self.city = city
+        self.tags = {tag.lower() for tag in tags} if tags else None
+        self.protocols = list(protocols) if protocols else None
+        self.pruned = 0
+
+    @property
+    def filters_rows(self):
+        """Whether any row-level criterion is set."""
+        return bool(self.countries or self.city or self.tags)
+
+    def protocols_to_fetch(self, available):
+        """Return the protocols from ``available`` that can match."""
+        if self.protocols is None:
+            return list(available)
+        return [protocol for protocol in available if protocol in self.protocols]
+
+    def accepts(self, country, city, hostname):
+        """Check a row's raw cell values, counting rejected rows."""
+        if (
+            (self.countries is not None and country.casefold() not in self.countries)
+            or (self.city is not None and not self.city.search(city))
+            or (self.tags is not None and not self.tags.issubset(hostname.split('.')[0].lower().split('-')))
+        ):
+            self.pruned += 1
+            return False
+        return True
+
+
+def filter_servers(servers, server_filter):
+    """Yield the server dicts accepted by ``server_filter``."""
+    for server in servers:
+        if server_filter.accepts(server.get('country', ''), server.get('city', ''), server.get('hostname', '')):
+            yield server
+
+
+def _regex(value):
+    try:
+        return re.compile(value, re.IGNORECASE)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"invalid regular expression: {e}")
+
+
+def add_filter_arguments(parser, protocols=None):
+    """Add the shared server filter options to an argparse parser.
+
+    Pass the list of ``protocols`` to also offer a --protocol option.
+    """
+    parser.add_argument('--country', action='append', metavar='NAME',
+                        help='Only servers in this country (repeatable)')
+    parser.add_argument('--city', type=_regex, metavar='REGEX',
+                        help='Only servers whose city matches this regular expression')
+    parser.add_argument('--tag', action='append', metavar='TAG',
+                        help="Only servers whose hostname has this tag, e.g. 'stream' or 'p2p' (repeatable)")
+    if protocols:
+        parser.add_argument('--protocol', action='append', choices=protocols,
+                            help='Only fetch this protocol (repeatable)')
+
+
+def filter_from_args(args, default_protocols=None):
+    """Build a ServerFilter from options added by add_filter_arguments."""
+    return ServerFilter(
+        countries=args.country,
+        city=args.city,
+        tags=args.tag,
+        protocols=getattr(args, 'protocol', None) or default_protocols,
+    )
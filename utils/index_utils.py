@@ -0,0 +1,54 @@
+import json
+import os
+
+from utils.file_utils import atomic_write
+from utils.filename_utils import name_configs
+
+
+def build_index(servers):
+    """Return {config filename: hostname}, named as generate_configs.py names the files."""
+    return {filename: server['hostname'] for filename, server in name_configs(servers)}
+
+
+def resolve_name(index, name):
+    """Return the filename for a filename, filename without .conf, or hostname.
+
+    Raises KeyError when no config matches.
+    """
+    if name in index:
+        return name
+    if f"{name}.conf" in index:
+        return f"{name}.conf"
+    for filename, hostname in index.items():
+        if hostname == name:
+            return filename
+    raise KeyError(name)
+
+
+def source_signature(source):
+    """Return what identifies the current version of a file, or None if it is missing."""
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_index(path, signature):
+    """Return the index saved for the source with ``signature``, or None if missing or outdated."""
+    if signature is None:
+        return None
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get('source') != signature:
+        return None
+    return entry.get('files')
+
+
+def save_index(path, signature, index):
+    """Save an index built from the source with ``signature``, replacing it atomically."""
+    with atomic_write(path) as f:
+        json.dump({'source': signature, 'files': index}, f)
@@ -0,0 +1,145 @@
+import json
+import sys
+import time
+
+QUIET = 0
+SUMMARY = 1
+VERBOSE = 2
+
+LEVELS = {
+    'quiet': QUIET,
+    'summary': SUMMARY,
+    'verbose': VERBOSE,
+}
+
+
+class Output:
+    """Buffered, levelled writer for script output.
+
+    Messages are collected in memory and written to the stream in chunks,
+    so large runs do not pay for one terminal write per line. In JSON-lines
+    mode every message becomes one JSON object per line instead of text.
+    """
+
+    def __init__(self, level=SUMMARY, json_lines=False, stream=None,
+                 progress=False, progress_stream=None, progress_interval=0.2,
+                 buffer_size=65536, clock=time.monotonic):
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.json_lines = json_lines
+        self.stream = stream if stream is not None else sys.stdout
+        self.progress_enabled = progress
+        self.progress_stream = progress_stream if progress_stream is not None else sys.stderr
+        self.progress_interval = progress_interval
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self._buffer = []
+        self._buffered = 0
+        self._last_progress = None
+        self._progress_shown = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def event(self, event, message=None, level=SUMMARY, **fields):
+        """Emit an event if its level is enabled.
+
+        In text mode only ``message`` is written; in JSON-lines mode the
+        event name, message and extra fields are written as one object.
+        """
+        if level > self.level:
+            return
+        if self.json_lines:
+            record = {'event': event}
+            if message is not None:
+                record['message'] = message
+            record.update(fields)
+            self._write(json.dumps(record) + '\n')
+        elif message is not None:
+            self._write(message + '\n')
+
+    def summary(self, event, message=None, **fields):
+        self.event(event, message, SUMMARY, **fields)
+
+    def verbose(self, event, message=None, **fields):
+        self.event(event, message, VERBOSE, **fields)
+
+    def error(self, event, message=None, **fields):
+        """Emit an error; errors are shown even in quiet mode."""
+        self.event(event, message, QUIET, **fields)
+
+    def progress(self, done, total=None):
+        """Update the progress indicator, at most once per interval.
+
+        The final update (``done == total``) is always shown.
+        """
+        if not self.progress_enabled:
+            return
+        now = self.clock()
+        final = total is not None and done >= total
+        if (not final and self._last_progress is not None
+                and now - self._last_progress < self.progress_interval):
+            return
+        self._last_progress = now
+
+        if self.json_lines:
+            self._write(json.dumps({'event': 'progress', 'done': done, 'total': total}) + '\n')
+            return
+
+        if total:
+            line = f"\r{done}/{total} ({done * 100 // total}%)"
+        else:
+            line = f"\r{done}"
+        self.progress_stream.write(line)
+        self.progress_stream.flush()
+        self._progress_shown = True
+        if final:
+            self._end_progress()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        self.stream.flush()
+
+    def close(self):
+        self._end_progress()
+        self.flush()
+
+    def _end_progress(self):
+        if self._progress_shown:
+            self.progress_stream.write('\n')
+            self.progress_stream.flush()
+            self._progress_shown = False
+
+    def _write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+
+def add_output_arguments(parser):
+    """Add the shared output options to an argparse parser."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-q', '--quiet', dest='output_level', action='store_const',
+                       const='quiet', help='Only print errors')
+    group.add_argument('-v', '--verbose', dest='output_level', action='store_const',
+                       const='verbose', help='Print one line per server')
+    parser.set_defaults(output_level='summary')
+    parser.add_argument('--json', dest='json_lines', action='store_true',
+                        help='Print JSON-lines events instead of text')
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a progress indicator on stderr')
+
+
+def output_from_args(args):
+    """Build an Output from options added by add_output_arguments."""
+    return Output(
+        level=args.output_level,
+        json_lines=args.json_lines,
+        progress=args.progress,
+    )
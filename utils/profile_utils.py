@@ -0,0 +1,230 @@
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from utils.file_utils import atomic_write
+
+# Paths with less time than this (in microseconds) are left out of
+# collapsed stacks built from cProfile data
+MIN_STACK_MICROSECONDS = 1
+
+MAX_STACK_DEPTH = 200
+
+
+def frame_label(filename, line, name):
+    """Return the collapsed-stack label of a function."""
+    if filename == '~':  # built-in functions
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def write_collapsed(path, counts):
+    """Write ``{stack: count}`` as collapsed stacks, one ``a;b;c count`` per line.
+
+    The file is replaced atomically, so it can be read while a long run
+    keeps rewriting it.
+    """
+    with atomic_write(path) as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def collapsed_stacks(stats):
+    """Approximate collapsed stacks from a pstats.Stats, in microseconds.
+
+    cProfile only records caller/callee pairs, not full stacks, so each
+    call path gets a share of a function's time proportional to the time
+    spent through each caller. Recursive calls are folded into the first
+    frame of the recursion.
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    counts = Counter()
+
+    def walk(function, labels, on_stack, share):
+        _, _, self_time, cumulative_time, _ = stats.stats[function]
+        labels.append(frame_label(*function))
+        on_stack.add(function)
+
+        microseconds = round(self_time * share * 1e6)
+        if microseconds:
+            counts[';'.join(labels)] += microseconds
+        if len(labels) < MAX_STACK_DEPTH:
+            for callee, edge_time in callees.get(function, ()):
+                callee_time = stats.stats[callee][3]
+                if callee in on_stack or not callee_time:
+                    continue
+                callee_share = share * edge_time / callee_time
+                if callee_time * callee_share * 1e6 >= MIN_STACK_MICROSECONDS:
+                    walk(callee, labels, on_stack, callee_share)
+
+        on_stack.discard(function)
+        labels.pop()
+
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        if not any(caller in stats.stats for caller in callers):
+            walk(function, [], set(), 1.0)
+    return counts
+
+
+class CProfileProfiler:
+    """Deterministic profiler writing ``<prefix>.pstats`` and ``<prefix>.collapsed``.
+
+    Every function call is recorded, which slows the run down noticeably;
+    use SamplingProfiler for long runs.
+    """
+
+    def __init__(self, prefix):
+        # Imported here so scripts run without --profile start faster
+        import cProfile
+
+        self.prefix = str(prefix)
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        """Stop profiling, write the profile files and return their paths."""
+        import pstats
+
+        self.profile.disable()
+        stats_path = f"{self.prefix}.pstats"
+        collapsed_path = f"{self.prefix}.collapsed"
+        self.profile.dump_stats(stats_path)
+        write_collapsed(collapsed_path, collapsed_stacks(pstats.Stats(self.profile)))
+        return [stats_path, collapsed_path]
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock profiler writing ``<prefix>.collapsed``.
+
+    A background thread records the stack of every other thread each
+    ``interval`` seconds; counts are numbers of samples. The file is also
+    rewritten every ``write_interval`` seconds, so a long-running process
+    has an up-to-date profile without being stopped.
+    """
+
+    def __init__(self, prefix, interval=0.005, write_interval=60, clock=time.monotonic):
+        self.prefix = str(prefix)
+        self.interval = interval
+        self.write_interval = write_interval
+        self.clock = clock
+        self.counts = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_names = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def path(self):
+        return f"{self.prefix}.collapsed"
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, write the collapsed stacks and return their path."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        write_collapsed(self.path, self.counts)
+        return [self.path]
+
+    def sample(self):
+        """Record the current stack of every thread except the sampler."""
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            labels.append(self._thread_name(thread_id))
+            self.counts[';'.join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _thread_name(self, thread_id):
+        if thread_id not in self._thread_names:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        return self._thread_names.get(thread_id, f"thread-{thread_id}")
+
+    def _run(self):
+        next_write = self.clock() + self.write_interval
+        while not self._stopped.wait(self.interval):
+            self.sample()
+            if self.clock() >= next_write:
+                write_collapsed(self.path, self.counts)
+                next_write = self.clock() + self.write_interval
+
+
+PROFILERS = {
+    'cprofile': CProfileProfiler,
+    'sample': SamplingProfiler,
+}
+
+
+class _ReportingProfiler:
+    """Run a profiler and report the files it wrote."""
+
+    def __init__(self, profiler, output):
+        self.profiler = profiler
+        self.output = output
+
+    def __enter__(self):
+        self.profiler.start()
+        return self.profiler
+
+    def __exit__(self, exc_type, exc, tb):
+        paths = self.profiler.stop()
+        self.output.summary('profile', f"Profile written to {', '.join(paths)}", paths=paths)
+
+
+def add_profile_arguments(parser):
+    """Add the shared profiling options to an argparse parser."""
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='Profile the run and write PREFIX.pstats and PREFIX.collapsed')
+    parser.add_argument('--profile-mode', choices=list(PROFILERS), default='cprofile',
+                        help='cprofile records every call; sample has low overhead and only '
+                             'writes PREFIX.collapsed (default: cprofile)')
+    parser.add_argument('--sample-interval', type=float, default=0.005, metavar='SECONDS',
+                        help='Seconds between samples in sample mode (default: 0.005)')
+
+
+def profiler_from_args(args, output):
+    """Return a context manager profiling the run per add_profile_arguments options.
+
+    Without --profile it does nothing. Written files are reported to output.
+    """
+    if not args.profile:
+        return contextlib.nullcontext()
+    if args.profile_mode == 'sample':
+        profiler = SamplingProfiler(args.profile, interval=args.sample_interval)
+    else:
+        profiler = CProfileProfiler(args.profile)
+    return _ReportingProfiler(profiler, output)
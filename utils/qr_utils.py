@@ -0,0 +1,164 @@
+import hashlib
+import html
+import io
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from utils.file_utils import atomic_write
+
+QR_KINDS = ['png', 'svg']
+
+# Bump when rendering options change, so cached renders are not reused
+RENDER_VERSION = 1
+
+
+def require_segno():
+    """Return the segno module, or raise RuntimeError with an install hint."""
+    try:
+        import segno
+    except ImportError:
+        raise RuntimeError("QR export requires segno: pip install segno")
+    return segno
+
+
+def render_qr(content, kind='png', scale=4):
+    """Render text as a QR code and return the image bytes (runs in worker processes)."""
+    segno = require_segno()
+    buffer = io.BytesIO()
+    segno.make(content, error='l', micro=False).save(buffer, kind=kind, scale=scale, border=4)
+    return buffer.getvalue()
+
+
+def content_key(content, kind, scale):
+    """Return the cache key of a render: a hash of the content and options."""
+    digest = hashlib.sha256(f"{RENDER_VERSION}:{kind}:{scale}:".encode())
+    digest.update(content.encode())
+    return digest.hexdigest()
+
+
+class QrExporter:
+    """Render a QR code per config on a process pool, with a content-hash cache.
+
+    Configs are submitted with add() (or tap()) as they are generated.
+    Renders are stored in ``cache_dir`` under the hash of the config
+    content, so unchanged configs are never rendered again, even under
+    another filename. finish() writes one image per config plus an
+    ``index.html`` into ``directory`` and returns the stage statistics.
+    The process pool is only started when a render is needed.
+    """
+
+    def __init__(self, directory, kind='png', cache_dir=None, max_workers=None, scale=4, clock=time.monotonic):
+        if kind not in QR_KINDS:
+            raise ValueError(f"Invalid QR format '{kind}'. Must be one of: {', '.join(QR_KINDS)}")
+        self.directory = Path(directory)
+        self.kind = kind
+        self.cache_dir = Path(cache_dir) if cache_dir else self.directory / '.cache'
+        self.max_workers = max_workers
+        self.scale = scale
+        self.clock = clock
+        self.entries = []  # (filename, key) in generation order
+        self.pending = {}  # key -> future
+        self.hits = 0
+        self.misses = 0
+        self._executor = None
+        self._started = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _cache_path(self, key):
+        return self.cache_dir / f"{key}.{self.kind}"
+
+    def add(self, filename, content):
+        """Queue the QR code of one config, rendering it unless cached."""
+        key = content_key(content, self.kind, self.scale)
+        self.entries.append((filename, key))
+        if key in self.pending or self._cache_path(key).exists():
+            self.hits += 1
+            return
+        self.misses += 1
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._started = self.clock()
+        self.pending[key] = self._executor.submit(render_qr, content, self.kind, self.scale)
+
+    def tap(self, configs):
+        """Pass rendered configs through, queueing a QR code for each."""
+        for filename, content, server in configs:
+            self.add(filename, content)
+            yield filename, content, server
+
+    def finish(self, output=None):
+        """Wait for renders, write images and the index, and return statistics.
+
+        Renders that fail are reported to ``output`` and left out of the
+        index. Statistics hold ``configs``, ``cached``, ``rendered``,
+        ``failed``, ``hit_rate``, ``render_seconds`` and ``per_second``
+        (renders per second of pool time).
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+        failed = set()
+        futures = {future: key for key, future in self.pending.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                self._store(key, future.result())
+            except Exception as e:
+                failed.add(key)
+                if output is not None:
+                    filename = next(name for name, entry_key in self.entries if entry_key == key)
+                    output.error('qr_error', f"Error rendering QR code for {filename}: {e}",
+                                 filename=filename, error=str(e))
+        render_seconds = self.clock() - self._started if self._started is not None else 0.0
+        self.close()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        for filename, key in self.entries:
+            if key in failed:
+                continue
+            image = f"{Path(filename).stem}.{self.kind}"
+            shutil.copyfile(self._cache_path(key), self.directory / image)
+            written.append((filename, image))
+        self.write_index(written)
+
+        rendered = len(self.pending) - len(failed)
+        return {
+            'configs': len(self.entries),
+            'cached': self.hits,
+            'rendered': rendered,
+            'failed': sum(1 for _, key in self.entries if key in failed),
+            'hit_rate': self.hits / len(self.entries) if self.entries else 0.0,
+            'render_seconds': render_seconds,
+            'per_second': rendered / render_seconds if render_seconds else 0.0,
+        }
+
+    def _store(self, key, data):
+        # A crashed run never leaves a truncated render in the cache
+        with atomic_write(self._cache_path(key), 'wb') as f:
+            f.write(data)
+
+    def write_index(self, written):
+        """Write index.html linking every (config filename, image) pair."""
+        figures = ''.join(
+            f'<figure><a href="{html.escape(image)}"><img src="{html.escape(image)}" alt="QR code for '
+            f'{html.escape(filename)}" loading="lazy"></a><figcaption>{html.escape(filename)}</figcaption></figure>\n'
+            for filename, image in sorted(written)
+        )
+        (self.directory / 'index.html').write_text(
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            '<title>WireGuard configs</title>\n'
+            '<style>body{font-family:sans-serif;display:flex;flex-wrap:wrap}'
+            'figure{margin:1em;text-align:center}img{width:240px;height:240px}</style>\n'
+            f'</head>\n<body>\n{figures}</body>\n</html>\n'
+        )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
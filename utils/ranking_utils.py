@@ -0,0 +1,203 @@
+import math
+from pathlib import Path
+
+from utils.file_utils import atomic_write
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Ranking servers requires NumPy: pip install numpy")
+    return numpy
+
+
+class ProbeHistory:
+    """Ring buffers of RTT samples per hostname, backed by NumPy arrays.
+
+    Each hostname owns one row holding its last ``capacity`` samples, in
+    milliseconds; a lost probe is stored as NaN. Statistics are computed
+    for all hostnames at once by summary().
+    """
+
+    def __init__(self, capacity=1000):
+        np = _numpy()
+        self.capacity = capacity
+        self.hostnames = []
+        self.index = {}  # hostname -> row
+        self.rtt = np.full((0, capacity), np.nan, dtype=np.float32)
+        self.positions = np.zeros(0, dtype=np.int64)  # next slot to write, per row
+        self.counts = np.zeros(0, dtype=np.int64)  # samples recorded, per row
+
+    def __len__(self):
+        return len(self.hostnames)
+
+    def _row(self, hostname):
+        row = self.index.get(hostname)
+        if row is None:
+            row = len(self.hostnames)
+            if row == len(self.rtt):
+                self._grow(max(16, row * 2))
+            self.hostnames.append(hostname)
+            self.index[hostname] = row
+        return row
+
+    def _grow(self, rows):
+        np = _numpy()
+        added = rows - len(self.rtt)
+        self.rtt = np.vstack([self.rtt, np.full((added, self.capacity), np.nan, dtype=np.float32)])
+        self.positions = np.concatenate([self.positions, np.zeros(added, dtype=np.int64)])
+        self.counts = np.concatenate([self.counts, np.zeros(added, dtype=np.int64)])
+
+    def record(self, hostname, rtt_ms):
+        """Record one sample; ``rtt_ms`` is None for a lost probe."""
+        self.record_many([hostname], [rtt_ms])
+
+    def record_many(self, hostnames, rtts_ms):
+        """Record one sample per hostname; None or NaN marks a lost probe."""
+        np = _numpy()
+        rows = np.array([self._row(hostname) for hostname in hostnames], dtype=np.int64)
+        values = np.array([math.nan if rtt is None else rtt for rtt in rtts_ms], dtype=np.float32)
+        if len(np.unique(rows)) < len(rows):
+            # Several samples for one hostname: write them in order
+            for row, value in zip(rows, values):
+                self._write(np.array([row]), np.array([value]))
+        else:
+            self._write(rows, values)
+
+    def _write(self, rows, values):
+        self.rtt[rows, self.positions[rows]] = values
+        self.positions[rows] = (self.positions[rows] + 1) % self.capacity
+        self.counts[rows] += 1
+
+    def summary(self, alpha=0.1):
+        """Return per-hostname statistics as arrays aligned with ``hostnames``.
+
+        Keys are ``samples`` (probes in the window), ``received``,
+        ``availability`` (received / samples), ``p50``, ``p95`` and
+        ``ewma`` (exponentially weighted mean RTT, most recent weighted by
+        ``alpha``; lost probes are skipped) and ``score``. The score is
+        ``(ewma + p95 - p50) / availability``, so lower is better, jitter
+        and loss are penalized and hostnames without replies score inf.
+        """
+        np = _numpy()
+        count = len(self.hostnames)
+        rtt = self.rtt[:count]
+        positions = self.positions[:count]
+
+        samples = np.minimum(self.counts[:count], self.capacity)
+        replied = ~np.isnan(rtt)
+        received = np.count_nonzero(replied, axis=1)
+        availability = np.divide(received, samples, out=np.zeros(count), where=samples > 0)
+
+        # NaNs sort last, so each row starts with its received samples
+        ordered = np.sort(rtt, axis=1)
+        p50 = self._percentile(ordered, received, 50)
+        p95 = self._percentile(ordered, received, 95)
+
+        # Age of each slot: 0 for the newest sample
+        ages = (positions[:, None].astype(np.int32) - 1 - np.arange(self.capacity, dtype=np.int32)) % self.capacity
+        weights = np.where(replied, ((1 - alpha) ** np.arange(self.capacity, dtype=np.float32))[ages], 0)
+        total_weight = weights.sum(axis=1)
+        ewma = np.divide(
+            (weights * np.nan_to_num(rtt)).sum(axis=1), total_weight,
+            out=np.full(count, np.nan), where=total_weight > 0,
+        )
+
+        score = np.divide(ewma + p95 - p50, availability, out=np.full(count, np.inf), where=received > 0)
+        return {
+            'samples': samples,
+            'received': received,
+            'availability': availability,
+            'p50': p50,
+            'p95': p95,
+            'ewma': ewma,
+            'score': score,
+        }
+
+    @staticmethod
+    def _percentile(ordered, received, q):
+        """Linearly interpolated percentile of the first ``received`` values of each row."""
+        np = _numpy()
+        position = np.maximum(received - 1, 0) * (q / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        low_values = np.take_along_axis(ordered, low[:, None], axis=1)[:, 0]
+        high_values = np.take_along_axis(ordered, high[:, None], axis=1)[:, 0]
+        result = low_values + (high_values - low_values) * (position - low)
+        return np.where(received > 0, result, np.nan)
+
+    def scores(self, hostnames, alpha=0.1):
+        """Return the score of each hostname; unknown hostnames score inf."""
+        np = _numpy()
+        score = self.summary(alpha)['score']
+        rows = np.array([self.index.get(hostname, -1) for hostname in hostnames], dtype=np.int64)
+        return np.where(rows >= 0, score[rows] if len(score) else np.inf, np.inf)
+
+    def save(self, path):
+        """Save the history to a .npz file, replacing it atomically."""
+        np = _numpy()
+        count = len(self.hostnames)
+        with atomic_write(path, 'wb') as f:
+            np.savez(
+                f,
+                hostnames=np.array(self.hostnames, dtype=str),
+                rtt=self.rtt[:count],
+                positions=self.positions[:count],
+                counts=self.counts[:count],
+            )
+
+    @classmethod
+    def load(cls, path, capacity=1000):
+        """Load a history saved by save(); a missing file gives an empty history."""
+        np = _numpy()
+        if not Path(path).exists():
+            return cls(capacity)
+        with np.load(path) as data:
+            history = cls(data['rtt'].shape[1])
+            history.hostnames = [str(hostname) for hostname in data['hostnames']]
+            history.index = {hostname: row for row, hostname in enumerate(history.hostnames)}
+            history.rtt = data['rtt'].astype(np.float32)
+            history.positions = data['positions'].astype(np.int64)
+            history.counts = data['counts'].astype(np.int64)
+        return history
+
+
+def select_top(servers, history, per_country=None, alpha=0.1):
+    """Return servers ordered by score within each country, best first.
+
+    With ``per_country``, only that many servers are kept per country.
+    Servers without probe history rank last, in their original order.
+    """
+    np = _numpy()
+    servers = list(servers)
+    if not servers:
+        return servers
+
+    scores = history.scores([server['hostname'] for server in servers], alpha)
+    _, countries = np.unique([server.get('country', '') for server in servers], return_inverse=True)
+    order = np.lexsort((scores, countries))
+
+    if per_country is not None:
+        grouped = countries[order]
+        rank = np.arange(len(order)) - np.searchsorted(grouped, grouped, side='left')
+        order = order[rank < per_country]
+    return [servers[i] for i in order]
+
+
+def read_samples(records):
+    """Split sample records into (hostnames, rtts_ms).
+
+    Each record is a dict with ``hostname`` and ``rtt_ms`` (a number, or
+    null for a lost probe). Raises ValueError for invalid records.
+    """
+    hostnames = []
+    rtts = []
+    for record in records:
+        hostname = record.get('hostname')
+        rtt = record.get('rtt_ms')
+        if not isinstance(hostname, str) or not (rtt is None or isinstance(rtt, (int, float))):
+            raise ValueError(f"Invalid probe sample: {record}")
+        hostnames.append(hostname)
+        rtts.append(rtt)
+    return hostnames, rtts
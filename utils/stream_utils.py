@@ -0,0 +1,39 @@
+import json
+
+
+def unique_servers(servers):
+    """Yield servers, skipping any hostname already seen."""
+    seen_hostnames = set()
+    for server in servers:
+        hostname = server['hostname']
+        if hostname not in seen_hostnames:
+            seen_hostnames.add(hostname)
+            yield server
+
+
+def read_ndjson(lines):
+    """Yield one server dict per non-empty NDJSON line.
+
+    Raises ValueError with the line number for lines that are not valid JSON
+    objects.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            server = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid NDJSON on line {number}: {e}")
+        if not isinstance(server, dict):
+            raise ValueError(f"Invalid NDJSON on line {number}: expected an object")
+        yield server
+
+
+def write_ndjson(servers, stream):
+    """Write each server as one JSON line and return the number written."""
+    count = 0
+    for server in servers:
+        stream.write(json.dumps(server) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,336 @@
+import importlib.util
+
+from utils.encoding_utils import BodyDecoder, accept_encoding, content_charset, summarize_transfers
+
+
+def negotiated_headers(headers, drop=()):
+    """Return a copy of ``headers`` offering only the decodable content encodings.
+
+    Header names in ``drop`` (lowercase) are left out.
+    """
+    headers = {k: v for k, v in headers.items() if k.lower() not in drop and k.lower() != 'accept-encoding'}
+    headers['Accept-Encoding'] = accept_encoding()
+    return headers
+
+
+class _ChunkedTransport:
+    """Methods shared by the transports that stream bodies with post_chunks().
+
+    Subclasses send requests one at a time and provide post_chunks() and
+    close().
+    """
+
+    chunk_size = 16384
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def post(self, url, headers, data):
+        """Send a form POST and return the response body as text.
+
+        Raises an HTTP error for bad status codes.
+        """
+        return ''.join(self.post_chunks(url, headers, data))
+
+    def post_many(self, url, headers, payloads):
+        """Send one form POST per payload.
+
+        Returns a list in payload order holding either the response text or
+        the exception raised for that request.
+        """
+        results = []
+        for data in payloads:
+            try:
+                results.append(self.post(url, headers, data))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class RequestsTransport(_ChunkedTransport):
+    """HTTP/1.1 transport backed by a requests session (the default).
+
+    Requests made through one transport share cookies and keep-alive
+    connections. Bodies are read undecoded and decompressed here, so
+    post_chunks() can yield text while a response downloads and
+    ``transfers`` records the bytes received per request.
+    """
+
+    name = 'requests'
+
+    def __init__(self, timeout=15):
+        try:
+            import requests
+        except ImportError:
+            raise RuntimeError("The requests transport requires requests: pip install requests")
+
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.transfers = []
+
+    def _send(self, method, url, headers, data=None, check=False):
+        response = self.session.request(
+            method, url, headers=negotiated_headers(headers), data=data, timeout=self.timeout, stream=True
+        )
+        if check:
+            try:
+                response.raise_for_status()
+            except Exception:
+                response.close()
+                raise
+        return response
+
+    def _iter_text(self, method, url, response):
+        try:
+            # Inside the try: an unsupported encoding must still close the response
+            decoder = BodyDecoder(response.headers.get('Content-Encoding'), content_charset(response.headers.get('Content-Type')))
+            for chunk in response.raw.stream(self.chunk_size, decode_content=False):
+                text = decoder.feed(chunk)
+                if text:
+                    yield text
+            text = decoder.finish()
+            if text:
+                yield text
+        finally:
+            response.close()
+        self.transfers.append(decoder.record(method, url))
+
+    def get(self, url, headers):
+        """Send a GET request and return the response body as text."""
+        return ''.join(self._iter_text('GET', url, self._send('GET', url, headers)))
+
+    def post_chunks(self, url, headers, data):
+        """Send a form POST when iterated and yield the body as text chunks.
+
+        Raises an HTTP error for bad status codes.
+        """
+        yield from self._iter_text('POST', url, self._send('POST', url, headers, data, check=True))
+
+    def close(self):
+        self.session.close()
+
+
+class UrllibTransport(_ChunkedTransport):
+    """Standard-library transport for low-memory devices.
+
+    Needs no third-party packages. Cookies are kept between requests, but
+    every request opens a new connection. post_chunks() yields the decoded
+    body in small pieces, so callers can parse a response while it
+    downloads instead of holding it in memory.
+    """
+
+    name = 'urllib'
+
+    def __init__(self, timeout=15):
+        import http.cookiejar
+        import urllib.request
+
+        self.timeout = timeout
+        self._urllib = urllib.request
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.transfers = []
+
+    def _open(self, url, headers, data=None):
+        from urllib.parse import urlencode
+
+        headers = negotiated_headers(headers, drop=('connection',))
+        body = urlencode(data).encode() if data is not None else None
+        return self.opener.open(self._urllib.Request(url, data=body, headers=headers), timeout=self.timeout)
+
+    def _iter_text(self, method, url, response):
+        decoder = BodyDecoder(response.headers.get('Content-Encoding'), response.headers.get_content_charset())
+        while chunk := response.read(self.chunk_size):
+            text = decoder.feed(chunk)
+            if text:
+                yield text
+        text = decoder.finish()
+        if text:
+            yield text
+        self.transfers.append(decoder.record(method, url))
+
+    def get(self, url, headers):
+        """Send a GET request and return the response body as text."""
+        from urllib.error import HTTPError
+
+        try:
+            with self._open(url, headers) as response:
+                return ''.join(self._iter_text('GET', url, response))
+        except HTTPError as e:
+            with e:
+                return ''.join(self._iter_text('GET', url, e))
+
+    def post_chunks(self, url, headers, data):
+        """Send a form POST when iterated and yield the body as text chunks.
+
+        Raises an HTTP error for bad status codes.
+        """
+        with self._open(url, headers, data) as response:
+            yield from self._iter_text('POST', url, response)
+
+    def close(self):
+        self.opener.close()
+
+
+class Http2Transport:
+    """HTTP/2 transport backed by httpx.
+
+    All requests go over a single connection; ``post_many`` sends its
+    requests concurrently as multiplexed streams on that connection.
+    Requires the optional ``httpx[http2]`` dependency.
+    """
+
+    name = 'http2'
+
+    # HTTP/2 forbids connection-specific headers
+    _hop_by_hop_headers = {'connection', 'keep-alive', 'upgrade', 'transfer-encoding'}
+
+    def __init__(self, timeout=15, http1=True):
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("The http2 transport requires httpx: pip install 'httpx[http2]'")
+        import asyncio
+
+        self.timeout = timeout
+        self.transfers = []
+        self._loop = asyncio.new_event_loop()
+        try:
+            # With http1=False, plain http:// URLs use HTTP/2 prior knowledge
+            self.client = self._run(self._create_client(httpx, http1))
+        except ImportError:
+            # httpx installed without the h2 package
+            self._loop.close()
+            raise RuntimeError("The http2 transport requires httpx: pip install 'httpx[http2]'")
+        except BaseException:
+            self._loop.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def _create_client(self, httpx, http1):
+        return httpx.AsyncClient(
+            http1=http1,
+            http2=True,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=1),
+        )
+
+    def _run(self, coroutine):
+        return self._loop.run_until_complete(coroutine)
+
+    def _headers(self, headers):
+        return negotiated_headers(headers, drop=self._hop_by_hop_headers)
+
+    async def _send(self, method, url, headers, data=None, check=False):
+        async with self.client.stream(method, url, headers=self._headers(headers), data=data) as response:
+            if check:
+                response.raise_for_status()
+            decoder = BodyDecoder(response.headers.get('Content-Encoding'), content_charset(response.headers.get('Content-Type')))
+            parts = []
+            async for chunk in response.aiter_raw():
+                parts.append(decoder.feed(chunk))
+            parts.append(decoder.finish())
+        self.transfers.append(decoder.record(method, url))
+        return ''.join(parts)
+
+    async def _post(self, url, headers, data):
+        return await self._send('POST', url, headers, data, check=True)
+
+    def get(self, url, headers):
+        """Send a GET request and return the response body as text."""
+        return self._run(self._send('GET', url, headers))
+
+    def post(self, url, headers, data):
+        """Send a form POST and return the response body as text.
+
+        Raises an HTTP error for bad status codes.
+        """
+        return self._run(self._post(url, headers, data))
+
+    def post_many(self, url, headers, payloads):
+        """Send all form POSTs concurrently over the shared connection.
+
+        Returns a list in payload order holding either the response text or
+        the exception raised for that request.
+        """
+        import asyncio
+
+        async def post_all():
+            return await asyncio.gather(
+                *(self._post(url, headers, data) for data in payloads),
+                return_exceptions=True,
+            )
+
+        return self._run(post_all())
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._run(self.client.aclose())
+        self._loop.close()
+
+
+TRANSPORTS = {
+    RequestsTransport.name: RequestsTransport,
+    UrllibTransport.name: UrllibTransport,
+    Http2Transport.name: Http2Transport,
+}
+
+
+def default_transport():
+    """Return 'requests' when it is installed, else the standard-library 'urllib'."""
+    return RequestsTransport.name if importlib.util.find_spec('requests') else UrllibTransport.name
+
+
+def create_transport(name=None, **kwargs):
+    """Create a transport by name ('requests', 'urllib' or 'http2'); see default_transport()."""
+    name = name or default_transport()
+    if name not in TRANSPORTS:
+        raise ValueError(f"Invalid transport '{name}'. Must be one of: {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[name](**kwargs)
+
+
+def add_transport_argument(parser):
+    """Add the shared --transport option to an argparse parser."""
+    parser.add_argument(
+        '--transport',
+        default=default_transport(),
+        choices=list(TRANSPORTS),
+        help="HTTP transport to use (default: requests, or urllib when requests is not installed)"
+    )
+
+
+def format_bytes(count):
+    """Format a byte count for humans, e.g. '12.3 KiB'."""
+    for unit in ('B', 'KiB', 'MiB'):
+        if count < 1024 or unit == 'MiB':
+            return f"{count} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def report_transfers(transport, output):
+    """Report the bytes a transport received, per request and in total."""
+    transfers = getattr(transport, 'transfers', [])
+    if not transfers:
+        return
+    for transfer in transfers:
+        output.verbose(
+            'transfer',
+            f"{transfer['method']} {transfer['url']}: {format_bytes(transfer['wire_bytes'])} received, "
+            f"{format_bytes(transfer['body_bytes'])} decoded ({transfer['encoding']})",
+            **transfer,
+        )
+    totals = summarize_transfers(transfers)
+    output.summary(
+        'transferred',
+        f"Transferred {format_bytes(totals['wire_bytes'])} for {format_bytes(totals['body_bytes'])} of content "
+        f"in {totals['requests']} requests ({totals['ratio']:.0%})",
+        **totals,
+    )